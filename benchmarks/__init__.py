@@ -0,0 +1,16 @@
+"""Замеры производительности системы тестирования.
+
+Каждый модуль запускается из корня проекта как python -m benchmarks.<имя>:
+
+    suite           - основные операции QuizCore на данных от 10^3 до 10^7 результатов,
+                      замеры с хешем коммита для сравнения между коммитами
+    datagen         - синтетические users.csv, tests.csv, courses.csv и results.csv
+    startup         - время запуска до окна входа
+    responsiveness  - отзывчивость окна во время долгих операций
+    columnar        - колоночная агрегация результатов
+    scaling         - параллельная агрегация по числу процессов
+    mmap_scan       - поиск строк по ключу через mmap
+    result_log      - двоичный журнал результатов
+    sink_stress     - одновременная запись результатов из многих процессов
+    load_test       - нагрузка на server.py
+"""
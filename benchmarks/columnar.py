@@ -0,0 +1,109 @@
+"""Сравнение колоночной агрегации results.csv с построчным циклом.
+
+Запуск из корня проекта:
+
+    python -m benchmarks.columnar --rows 2000000
+
+Генерирует синтетический файл результатов и считает средние баллы по
+студентам, тестам и дням двумя способами: циклом Python по строкам, как
+раньше в view_teacher_stats, и групповыми операциями NumPy над столбцами
+из columnar.load_results. Разбор файла и агрегация замеряются отдельно.
+"""
+import argparse
+import csv
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from columnar import load_results
+
+
+def generate_results(path, rows, students, tests, seed=0):
+    """Синтетический results.csv в формате, который пишет submit_test"""
+    rng = random.Random(seed)
+    start = datetime(2025, 1, 1)
+    with open(path, "w", encoding="utf-8", newline="") as file:
+        writer = csv.writer(file)
+        for _ in range(rows):
+            timestamp = start + timedelta(seconds=rng.randrange(365 * 24 * 3600))
+            writer.writerow([f"student{rng.randrange(students)}", f"Тест{rng.randrange(tests)}",
+                             rng.randrange(11), timestamp.strftime("%Y-%m-%d %H:%M:%S")])
+
+
+def read_rows(path):
+    with open(path, "r", encoding="utf-8", newline="") as file:
+        return [row for row in csv.reader(file) if row]
+
+
+def loop_means(rows, column):
+    """Средние баллы по столбцу построчным циклом, как в view_teacher_stats"""
+    scores = {}
+    for row in rows:
+        try:
+            scores.setdefault(row[column], []).append(int(row[2]))
+        except (ValueError, IndexError):
+            continue
+    return {key: np.mean(values) for key, values in scores.items()}
+
+
+def loop_day_means(rows):
+    scores = {}
+    for row in rows:
+        try:
+            day = datetime.strptime(row[3], "%Y-%m-%d %H:%M:%S").date()
+            scores.setdefault(day, []).append(int(row[2]))
+        except (ValueError, IndexError):
+            continue
+    return {key: np.mean(values) for key, values in scores.items()}
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк колоночной агрегации результатов")
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--students", type=int, default=5000)
+    parser.add_argument("--tests", type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "results.csv")
+        generate_results(path, args.rows, args.students, args.tests)
+
+        rows, read_time = timed(read_rows, path)
+        columns, load_time = timed(load_results, path)
+
+    print(f"Строк: {args.rows}")
+    print(f"Разбор csv.reader в строки:      {read_time:.3f} с")
+    print(f"Разбор в столбцы (load_results): {load_time:.3f} с")
+    print(f"{'Агрегат':<12}{'цикл, с':>10}{'NumPy, с':>10}{'ускорение':>12}")
+
+    cases = [
+        ("студенты", lambda: loop_means(rows, 0), columns.per_student),
+        ("тесты", lambda: loop_means(rows, 1), columns.per_test),
+        ("дни", lambda: loop_day_means(rows), columns.per_day),
+    ]
+    loop_total = read_time
+    columnar_total = load_time
+    for name, loop, vectorized in cases:
+        expected, loop_time = timed(loop)
+        actual, vectorized_time = timed(vectorized)
+        keys = [key.item() if isinstance(key, np.datetime64) else key for key in actual.keys]
+        assert sorted(expected) == sorted(keys)
+        assert all(abs(expected[key] - mean) < 1e-9 for key, mean in zip(keys, actual.mean))
+        loop_total += loop_time
+        columnar_total += vectorized_time
+        print(f"{name:<12}{loop_time:>10.3f}{vectorized_time:>10.4f}{loop_time / vectorized_time:>11.1f}x")
+
+    print(f"{'итого':<12}{loop_total:>10.3f}{columnar_total:>10.3f}{loop_total / columnar_total:>11.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""Синтетические файлы данных заданного размера.
+
+Запуск из корня проекта:
+
+    python -m benchmarks.datagen --rows 1000000 --out data-1m
+
+Пишет users.csv, tests.csv, courses.csv, results.csv и settings.csv в
+формате приложения. Размер задается числом результатов (--rows, от 10^3
+до 10^7); остальные файлы масштабируются от него (scaled_sizes), но любой
+размер можно задать отдельно. Данные зависят только от --seed, поэтому
+замеры на разных коммитах идут на одинаковых файлах.
+
+Правильные ответы - всех видов из grading.py (текст, any:, num:), ответы
+в результатах записываются так же, как их пишет QuizCore.submit. У всех
+пользователей пароль PASSWORD.
+"""
+import argparse
+import csv
+import os
+import random
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+from storage import encode_answers
+from user_directory import hash_password
+
+Sizes = namedtuple("Sizes", "users teachers tests questions courses results")
+
+# Доля правильных ответов в сгенерированных результатах
+CORRECT_RATE = 0.7
+
+PASSWORD = "password"
+# Один хеш на всех и немного итераций: замер входа не должен состоять из KDF
+KDF_ITERATIONS = 1000
+
+
+def scaled_sizes(rows):
+    """Размеры файлов для rows результатов"""
+    return Sizes(users=max(10, rows // 20), teachers=max(1, rows // 100000), tests=max(5, rows // 1000),
+                 questions=10, courses=max(3, rows // 10000), results=rows)
+
+
+def correct_answer(question):
+    """Правильный ответ и то, что вводит студент, для вопроса номер question"""
+    kind = question % 3
+    if kind == 0:
+        return f"Ответ {question}", f"ответ  {question}"
+    if kind == 1:
+        return f"num:{question}.5+-0.1", f"{question},5"
+    return f"any:вариант {question}|option {question}", f"option {question}"
+
+
+def write_csv(path, rows):
+    with open(path, "w", encoding="utf-8", newline="") as file:
+        csv.writer(file).writerows(rows)
+
+
+def generate(data_dir, sizes, seed=0, answers=True):
+    """Пишет файлы данных в каталог data_dir"""
+    os.makedirs(data_dir, exist_ok=True)
+    rng = random.Random(seed)
+    students = [f"student{i}" for i in range(sizes.users)]
+
+    password_hash = hash_password(PASSWORD, KDF_ITERATIONS)
+    write_csv(os.path.join(data_dir, "users.csv"),
+              [["login", "role"]] + [[f"teacher{i}", "teacher", password_hash] for i in range(sizes.teachers)]
+              + [[student, "student", password_hash] for student in students])
+    write_csv(os.path.join(data_dir, "tests.csv"),
+              ([f"Тест{t}", f"Вопрос {q} теста {t}", correct_answer(q)[0]]
+               for t in range(sizes.tests) for q in range(sizes.questions)))
+    # Каждый студент закреплен за одним курсом
+    write_csv(os.path.join(data_dir, "courses.csv"),
+              ([f"Курс{c}"] + students[c::sizes.courses] for c in range(sizes.courses)))
+    write_csv(os.path.join(data_dir, "settings.csv"), [["dpi", "100"]])
+
+    typed = [correct_answer(q)[1] for q in range(sizes.questions)]
+    start = datetime(2025, 1, 1)
+    with open(os.path.join(data_dir, "results.csv"), "w", encoding="utf-8", newline="") as file:
+        writer = csv.writer(file)
+        for _ in range(sizes.results):
+            given = [answer if rng.random() < CORRECT_RATE else "нет" for answer in typed]
+            score = sum(answer != "нет" for answer in given)
+            timestamp = (start + timedelta(seconds=rng.randrange(365 * 24 * 3600))).strftime("%Y-%m-%d %H:%M:%S")
+            row = [rng.choice(students), f"Тест{rng.randrange(sizes.tests)}", score, timestamp]
+            if answers:
+                row.append(encode_answers(given))
+            writer.writerow(row)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Синтетические файлы данных системы тестирования")
+    parser.add_argument("--rows", type=int, default=100000, help="Число результатов")
+    parser.add_argument("--out", required=True, help="Каталог для файлов данных")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-answers", action="store_true", help="Результаты без ответов студентов")
+    for field in Sizes._fields[:-1]:
+        parser.add_argument(f"--{field}", type=int, default=None, help="По умолчанию - от --rows")
+    args = parser.parse_args()
+
+    sizes = scaled_sizes(args.rows)._replace(
+        **{field: getattr(args, field) for field in Sizes._fields[:-1] if getattr(args, field) is not None})
+    generate(args.out, sizes, args.seed, not args.no_answers)
+    print(", ".join(f"{field}: {value}" for field, value in sizes._asdict().items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""Нагрузочный тест сервера: много студентов проходят тесты одновременно.
+
+Запуск из корня проекта:
+
+    python -m benchmarks.load_test --students 200 --rounds 5
+
+Без --url во временном каталоге создаются данные (студенты с паролем
+benchmarks.datagen.PASSWORD, тесты с вопросами) и запускается server.py. Каждый студент в своем потоке входит в
+систему, получает список тестов и вопросы и отправляет ответы - rounds раз.
+По каждой операции печатаются количество запросов и задержки p50, p99 и
+максимальная; в конце проверяется, что сервер записал все результаты.
+"""
+import argparse
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.datagen import KDF_ITERATIONS, PASSWORD
+from client import RemoteCore
+from storage import format_rows
+from user_directory import hash_password
+
+
+def generate_data(data_dir, students, tests, questions):
+    """Пользователи и тесты с вопросами; ответ на вопрос j - число j"""
+    def write(name, rows):
+        with open(os.path.join(data_dir, name), "w", encoding="utf-8", newline="") as file:
+            file.write(format_rows(rows))
+
+    password_hash = hash_password(PASSWORD, KDF_ITERATIONS)
+    write("users.csv", [["login", "role"], ["teacher1", "teacher", password_hash]]
+          + [[f"student{i}", "student", password_hash] for i in range(students)])
+    write("tests.csv", [[f"Тест{t}", f"Вопрос {j} теста {t}", str(j)]
+                        for t in range(tests) for j in range(questions)])
+    for name in ("results.csv", "courses.csv", "settings.csv"):
+        write(name, [])
+
+
+def start_server(data_dir, port):
+    project_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(project_dir, "server.py"), "--port", str(port), "--data-dir", data_dir],
+        stdout=subprocess.PIPE, text=True)
+    process.stdout.readline()  # Сервер начал слушать порт
+    return process
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+class Latencies:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.by_operation = {}
+
+    def timed(self, operation, function, *args):
+        start = time.perf_counter()
+        result = function(*args)
+        elapsed = time.perf_counter() - start
+        with self.lock:
+            self.by_operation.setdefault(operation, []).append(elapsed)
+        return result
+
+
+def student_session(url, student, rounds, latencies, seed):
+    rng = random.Random(seed)
+    core = RemoteCore(url)
+    submitted = 0
+    for _ in range(rounds):
+        if not latencies.timed("login", core.login, student, "student", PASSWORD):
+            raise RuntimeError(f"Не удалось войти: {student}")
+        test_name = rng.choice(latencies.timed("test_names", core.test_names))
+        questions = latencies.timed("questions", core.questions, test_name)
+        # Правильный ответ с вероятностью 1/2
+        answers = [str(j) if rng.random() < 0.5 else "нет" for j in range(len(questions))]
+        latencies.timed("submit", core.submit, student, test_name, answers)
+        submitted += 1
+    return submitted
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Нагрузочный тест сервера системы тестирования")
+    parser.add_argument("--students", type=int, default=200, help="Одновременных студентов")
+    parser.add_argument("--rounds", type=int, default=5, help="Тестов на одного студента")
+    parser.add_argument("--tests", type=int, default=20)
+    parser.add_argument("--questions", type=int, default=10, help="Вопросов в тесте")
+    parser.add_argument("--url", default=None, help="Адрес уже запущенного сервера с данными студентов")
+    parser.add_argument("--port", type=int, default=8766)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        server = None
+        url = args.url
+        if url is None:
+            generate_data(tmp, args.students, args.tests, args.questions)
+            server = start_server(tmp, args.port)
+            url = f"http://127.0.0.1:{args.port}"
+
+        latencies = Latencies()
+        start = time.perf_counter()
+        try:
+            with ThreadPoolExecutor(max_workers=args.students) as pool:
+                sessions = [pool.submit(student_session, url, f"student{i}", args.rounds, latencies, i)
+                            for i in range(args.students)]
+                submitted = sum(session.result() for session in sessions)
+        finally:
+            elapsed = time.perf_counter() - start
+            if server is not None:
+                server.terminate()  # Сервер дописывает буфер результатов и завершается
+                server.wait()
+
+        requests = sum(len(values) for values in latencies.by_operation.values())
+        print(f"Студентов: {args.students}, пройдено тестов: {submitted}, "
+              f"запросов: {requests}, время: {elapsed:.2f} с, {requests / elapsed:.0f} запросов/с")
+        print(f"{'Операция':<12}{'запросов':>10}{'p50, мс':>10}{'p99, мс':>10}{'макс, мс':>10}")
+        for operation, values in latencies.by_operation.items():
+            print(f"{operation:<12}{len(values):>10}{statistics.median(values) * 1000:>10.1f}"
+                  f"{percentile(values, 0.99) * 1000:>10.1f}{max(values) * 1000:>10.1f}")
+
+        if server is not None:
+            with open(os.path.join(tmp, "results.csv"), "rb") as file:
+                written = file.read().count(b"\n")
+            if written != submitted:
+                raise SystemExit(f"Записано результатов {written} из {submitted}")
+            print(f"Все {written} результатов записаны")
+
+
+if __name__ == "__main__":
+    main()
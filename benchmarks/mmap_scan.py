@@ -0,0 +1,71 @@
+"""Выборка строк по ключу через mmap в сравнении с csv.reader.
+
+Запуск из корня проекта:
+
+    python -m benchmarks.mmap_scan --rows 2000000
+
+На синтетическом results.csv замеряется выборка всех результатов одного
+студента: разбором каждой строки csv.reader, как раньше, и поиском ключа в
+байтах отображенного файла (mmap_scan.read_rows). Отдельно замеряется
+перечисление ключей всех строк, на котором строится индекс tests.csv.idx:
+оно не быстрее csv.reader, зато дает смещения строк. Поэтому mmap_scan
+сканирует файл целиком только для индекса, а список тестов
+(TestRepository.test_names) разбирается csv.reader.
+"""
+import argparse
+import csv
+import os
+import tempfile
+import time
+
+from benchmarks.columnar import generate_results
+from mmap_scan import mapped, read_rows, scan_keys
+
+
+def csv_rows(path, key):
+    with open(path, "r", encoding="utf-8", newline="") as file:
+        return [row for row in csv.reader(file) if row and row[0] == key]
+
+
+def csv_keys(path):
+    with open(path, "r", encoding="utf-8", newline="") as file:
+        return [row[0] for row in csv.reader(file) if row]
+
+
+def mmap_keys(path):
+    with mapped(path) as buffer:
+        return [key for key, offset, length in scan_keys(buffer)]
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк выборки строк через mmap")
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--students", type=int, default=5000)
+    parser.add_argument("--tests", type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "results.csv")
+        generate_results(path, args.rows, args.students, args.tests)
+        print(f"Строк: {args.rows}, размер файла: {os.path.getsize(path) / 2 ** 20:.0f} МБ")
+        print(f"{'Операция':<28}{'csv.reader, с':>15}{'mmap, с':>10}{'ускорение':>12}")
+
+        cases = [
+            ("строки одного студента", lambda: csv_rows(path, "student1"), lambda: read_rows(path, "student1")),
+            ("первый столбец всех строк", lambda: csv_keys(path), lambda: mmap_keys(path)),
+        ]
+        for name, slow, fast in cases:
+            expected, slow_time = timed(slow)
+            actual, fast_time = timed(fast)
+            assert actual == expected, name
+            print(f"{name:<28}{slow_time:>15.3f}{fast_time:>10.3f}{slow_time / fast_time:>11.1f}x")
+
+
+if __name__ == "__main__":
+    main()
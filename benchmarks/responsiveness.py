@@ -0,0 +1,136 @@
+"""Отзывчивость окна при медленном хранилище.
+
+Запуск из корня проекта:
+
+    QT_QPA_PLATFORM=offscreen python -m benchmarks.responsiveness --delay 0.5
+
+Хранилище обертывается так, что каждый вызов ждет --delay секунд, как на
+медленном сетевом диске. Таймер Qt отмечает каждый проход цикла событий;
+наибольшая пауза между отметками - время, на которое окно перестает
+отвечать. Операции выполняются сначала прямо в главном потоке, как раньше,
+затем через TaskRunner в пуле потоков. При фоновом выполнении пауза должна
+оставаться порядка периода таймера независимо от задержки хранилища;
+если она больше --max-pause миллисекунд, проверка завершается с ошибкой.
+"""
+import argparse
+import sys
+import time
+
+from PyQt5.QtCore import QThreadPool, QTimer
+from PyQt5.QtWidgets import QApplication
+
+from storage import open_storage
+from workers import TaskRunner
+
+TICK_MS = 10
+
+# Наибольшая допустимая пауза окна при фоновом выполнении, мс
+MAX_PAUSE_MS = 100
+
+OPERATIONS = ["test_names", "students", "course_names", "all_results"]
+
+
+class SlowStorage:
+    """Хранилище, каждый вызов которого занимает не меньше delay секунд"""
+
+    def __init__(self, storage, delay):
+        self.storage = storage
+        self.delay = delay
+
+    def __getattr__(self, name):
+        method = getattr(self.storage, name)
+
+        def slow(*args, **kwargs):
+            time.sleep(self.delay)
+            return method(*args, **kwargs)
+        return slow
+
+
+class LatencyProbe:
+    """Наибольшая пауза между срабатываниями таймера в главном потоке"""
+
+    def __init__(self):
+        self.timer = QTimer()
+        self.timer.setInterval(TICK_MS)
+        self.timer.timeout.connect(self.tick)
+        self.last = None
+        self.worst = 0.0
+
+    def tick(self):
+        now = time.perf_counter()
+        if self.last is not None:
+            self.worst = max(self.worst, now - self.last)
+        self.last = now
+
+    def start(self):
+        self.last = None
+        self.worst = 0.0
+        self.timer.start()
+
+    def stop(self):
+        self.timer.stop()
+        return self.worst
+
+
+def run_blocking(app, storage, probe):
+    """Вызовы хранилища в главном потоке по одному на проход цикла событий"""
+    pending = list(OPERATIONS)
+
+    def step():
+        if pending:
+            getattr(storage, pending.pop(0))()
+            QTimer.singleShot(0, step)
+        else:
+            app.quit()
+
+    probe.start()
+    QTimer.singleShot(0, step)
+    app.exec_()
+    return probe.stop()
+
+
+def run_background(app, storage, probe):
+    """Те же вызовы через TaskRunner; главный поток только получает результаты"""
+    pool = QThreadPool()
+    pool.setMaxThreadCount(1)
+    runner = TaskRunner(pool)
+    remaining = [len(OPERATIONS)]
+
+    def finished(_):
+        remaining[0] -= 1
+        if not remaining[0]:
+            app.quit()
+
+    probe.start()
+    for name in OPERATIONS:
+        runner.run(getattr(storage, name), on_done=finished, on_error=finished)
+    app.exec_()
+    pool.waitForDone()
+    return probe.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Пауза цикла событий при медленном хранилище")
+    parser.add_argument("--delay", type=float, default=0.5, help="Задержка каждого вызова, с")
+    parser.add_argument("--data-dir", default=".", help="Каталог с CSV-файлами")
+    parser.add_argument("--db", default="", help="База SQLite вместо CSV")
+    parser.add_argument("--max-pause", type=float, default=MAX_PAUSE_MS,
+                        help="Наибольшая допустимая пауза окна при фоновом выполнении, мс")
+    args = parser.parse_args()
+
+    app = QApplication(sys.argv)
+    storage = SlowStorage(open_storage(args.data_dir, args.db), args.delay)
+    probe = LatencyProbe()
+
+    blocking = run_blocking(app, storage, probe)
+    background = run_background(app, storage, probe)
+
+    print(f"Вызовов хранилища: {len(OPERATIONS)}, задержка каждого: {args.delay:.3f} с")
+    print(f"Наибольшая пауза окна, главный поток: {blocking * 1000:8.1f} мс")
+    print(f"Наибольшая пауза окна, пул потоков:   {background * 1000:8.1f} мс")
+    if background * 1000 > args.max_pause:
+        raise SystemExit(f"Окно не отвечает дольше порога: {background * 1000:.1f} мс > {args.max_pause:.1f} мс")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""Двоичный журнал результатов в сравнении с results.csv.
+
+Запуск из корня проекта:
+
+    python -m benchmarks.result_log --rows 2000000
+
+Синтетический results.csv переводится в журнал (result_log.py); печатаются
+размеры файлов, время чтения всех результатов (ResultRepository.stream и
+ResultLog.stream), время отчета по студентам и тестам, которым
+считается и статистика (для CSV - параллельно по частям, chunked.py;
+ResultLog.aggregate считает его по номерам имен в NumPy), время загрузки в
+столбцы NumPy (columnar.load_results и load_log) и время чтения случайных
+записей по номеру.
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from benchmarks.columnar import generate_results
+from chunked import parallel_report
+from columnar import load_log, load_results
+from report import Filters, Report
+from result_log import ResultLog, csv_to_log
+from storage import ResultRepository
+
+RANDOM_READS = 10000
+GROUP_BY = ["student", "test"]
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def csv_report(path, group_by):
+    # Так отчет и статистику по results.csv считает CsvStorage.aggregate_results
+    return list(parallel_report(path, Filters(), Report(group_by)).rows())
+
+
+def log_report(log, group_by):
+    return list(log.aggregate(Report(group_by), Filters()).rows())
+
+
+def per_student(columns):
+    stats = columns.per_student()
+    return {key: (count, total) for key, count, total in zip(stats.keys, stats.count.tolist(), stats.total.tolist())}
+
+
+def random_reads(log, count):
+    rng = random.Random(0)
+    size = len(log)
+    return [log[rng.randrange(size)] for _ in range(count)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк двоичного журнала результатов")
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--students", type=int, default=5000)
+    parser.add_argument("--tests", type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, "results.csv")
+        log_path = os.path.join(tmp, "results.bin")
+        generate_results(csv_path, args.rows, args.students, args.tests)
+        _, convert_time = timed(csv_to_log, csv_path, log_path)
+        csv_repository = ResultRepository(csv_path)
+        log = ResultLog(log_path)
+
+        csv_size = os.path.getsize(csv_path)
+        log_size = os.path.getsize(log_path) + os.path.getsize(log_path + ".names")
+        print(f"Строк: {args.rows}, перевод в журнал: {convert_time:.2f} с")
+        print(f"Размер: CSV {csv_size / 2 ** 20:.1f} МБ, журнал {log_size / 2 ** 20:.1f} МБ "
+              f"({csv_size / log_size:.1f}x меньше)")
+        print(f"{'Операция':<28}{'CSV, с':>10}{'журнал, с':>12}{'ускорение':>12}")
+
+        cases = [
+            ("чтение всех результатов", lambda: list(csv_repository.stream()), lambda: list(log.stream())),
+            ("отчет по студентам и тестам", lambda: csv_report(csv_path, GROUP_BY),
+             lambda: log_report(log, GROUP_BY)),
+            ("столбцы NumPy по студентам", lambda: per_student(load_results(csv_path)),
+             lambda: per_student(load_log(log_path))),
+        ]
+        for name, slow, fast in cases:
+            expected, slow_time = timed(slow)
+            actual, fast_time = timed(fast)
+            assert actual == expected, name
+            print(f"{name:<28}{slow_time:>10.3f}{fast_time:>12.3f}{slow_time / fast_time:>11.1f}x")
+
+        _, elapsed = timed(random_reads, log, RANDOM_READS)
+        print(f"{RANDOM_READS} записей по номеру: {elapsed:.3f} с ({elapsed / RANDOM_READS * 1e6:.0f} мкс на запись)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""Масштабирование параллельной агрегации результатов по числу процессов.
+
+Запуск из корня проекта:
+
+    python -m benchmarks.scaling --rows 5000000 --max-workers 8
+
+Генерирует синтетический results.csv и считает агрегаты по студентам и
+тестам через chunked.parallel_report с числом процессов от 1 до
+--max-workers (по умолчанию - число ядер). Для каждого числа процессов
+печатаются время, ускорение относительно одного процесса и
+эффективность; отчеты всех запусков сравниваются с последовательным.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from benchmarks.columnar import generate_results
+from chunked import parallel_report
+from report import Filters, Report
+
+GROUP_BY = ["student", "test"]
+
+
+def run(path, workers):
+    start = time.perf_counter()
+    report = parallel_report(path, Filters(), Report(GROUP_BY), workers=workers)
+    return report, time.perf_counter() - start
+
+
+def snapshot(report):
+    return {key: aggregate.to_list() for key, aggregate in report.groups.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк параллельной агрегации результатов")
+    parser.add_argument("--rows", type=int, default=5_000_000)
+    parser.add_argument("--students", type=int, default=5000)
+    parser.add_argument("--tests", type=int, default=200)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "results.csv")
+        generate_results(path, args.rows, args.students, args.tests)
+        print(f"Строк: {args.rows}, размер файла: {os.path.getsize(path) / 2 ** 20:.0f} МБ, "
+              f"ядер: {os.cpu_count()}")
+
+        expected, base = run(path, 1)
+        expected = snapshot(expected)
+        print(f"{'процессов':>10}{'время, с':>10}{'ускорение':>12}{'эффективность':>15}")
+        print(f"{1:>10}{base:>10.2f}{1.0:>11.2f}x{100.0:>14.0f}%")
+
+        # 2, 4, 8, ... и само максимальное число процессов
+        counts = sorted({2 ** i for i in range(1, args.max_workers.bit_length())} | {args.max_workers} - {1})
+        for workers in counts:
+            report, elapsed = run(path, workers)
+            assert snapshot(report) == expected, f"Отчет при {workers} процессах отличается"
+            speedup = base / elapsed
+            print(f"{workers:>10}{elapsed:>10.2f}{speedup:>11.2f}x{speedup / workers * 100:>14.0f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""Нагрузочная проверка пакетной записи результатов несколькими процессами.
+
+Запуск из корня проекта:
+
+    python -m benchmarks.sink_stress --writers 16 --rows 5000 --kill 4
+
+Каждый процесс-писатель пишет через ResultSink в один общий results.csv
+результаты с номерами по порядку, пачками случайного размера. После
+завершения всех процессов файл проверяется: каждая строка разбирается в
+четыре поля, ни одна строка не потеряна и не повторена, порядок строк
+каждого писателя сохранен.
+
+С --kill часть писателей убивается сигналом SIGKILL посреди работы. Их
+результаты из буфера пропадают, но в файле не должно остаться оборванных
+строк, а записанные строки должны идти без пропусков от первой.
+"""
+import argparse
+import csv
+import multiprocessing
+import os
+import random
+import signal
+import tempfile
+import time
+
+from result_sink import FSYNC_POLICIES, ResultSink
+from storage import ResultRepository
+
+
+def writer(path, number, rows, fsync, seed):
+    rng = random.Random(seed)
+    sink = ResultSink(ResultRepository(path), batch_size=rng.randint(1, 50),
+                      flush_interval=0.01, fsync=fsync)
+    for i in range(rows):
+        sink.add(f"writer{number}", f"Тест, {i}", i % 11, f"2025-01-01 00:00:{i % 60:02d}")
+        if rng.random() < 0.01:
+            time.sleep(0.001)
+    sink.close()
+
+
+def verify(path, writers, rows, killed):
+    """Ошибки в файле результатов; пустой список - файл в порядке"""
+    errors = []
+    seen = {number: [] for number in range(writers)}
+    with open(path, "r", encoding="utf-8", newline="") as file:
+        data = file.read()
+    if data and not data.endswith("\n"):
+        errors.append("Файл заканчивается оборванной строкой")
+
+    for line, row in enumerate(csv.reader(data.splitlines()), 1):
+        if len(row) != 4 or not row[0].startswith("writer") or not row[1].startswith("Тест, "):
+            errors.append(f"Строка {line} повреждена: {row}")
+            continue
+        number, i = int(row[0][len("writer"):]), int(row[1][len("Тест, "):])
+        if int(row[2]) != i % 11:
+            errors.append(f"Строка {line}: неверный балл {row}")
+        seen[number].append(i)
+
+    for number, numbers in seen.items():
+        expected = len(numbers) if number in killed else rows
+        if numbers != list(range(expected)):
+            errors.append(f"Писатель {number}: записано {len(numbers)} строк не по порядку или с пропусками")
+    return errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Параллельная запись результатов несколькими процессами")
+    parser.add_argument("--writers", type=int, default=16)
+    parser.add_argument("--rows", type=int, default=5000, help="Результатов на одного писателя")
+    parser.add_argument("--fsync", default="none", choices=FSYNC_POLICIES)
+    parser.add_argument("--kill", type=int, default=0, help="Сколько писателей убить посреди работы")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "results.csv")
+        processes = [multiprocessing.Process(target=writer, args=(path, number, args.rows, args.fsync, number))
+                     for number in range(args.writers)]
+        start = time.perf_counter()
+        for process in processes:
+            process.start()
+
+        killed = set(random.sample(range(args.writers), min(args.kill, args.writers)))
+        if killed:
+            time.sleep(0.05)
+            for number in killed:
+                os.kill(processes[number].pid, signal.SIGKILL)
+        for process in processes:
+            process.join()
+        elapsed = time.perf_counter() - start
+
+        errors = verify(path, args.writers, args.rows, killed)
+        with open(path, "rb") as file:
+            lines = file.read().count(b"\n")
+
+    print(f"Писателей: {args.writers}, убито: {len(killed)}, строк в файле: {lines}, время: {elapsed:.2f} с")
+    if errors:
+        for error in errors[:20]:
+            print(error)
+        raise SystemExit(f"Ошибок: {len(errors)}")
+    print("Потерянных и поврежденных строк нет")
+
+
+if __name__ == "__main__":
+    main()
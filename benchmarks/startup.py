@@ -0,0 +1,88 @@
+"""Время холодного запуска приложения до окна входа.
+
+Запуск из корня проекта:
+
+    QT_QPA_PLATFORM=offscreen python -m benchmarks.startup --runs 5
+
+Каждый замер - отдельный процесс Python, чтобы импорты не брались из уже
+загруженных модулей. Процесс запускается с -X importtime, создает QuizApp,
+показывает окно входа и сообщает, сколько прошло от старта процесса до
+этого момента. Из вывода importtime берутся суммарное время импорта
+stable_1 и самые долгие модули; отдельно проверяется, что matplotlib и
+numpy при запуске не загружаются.
+
+С --max-ms замер завершается ошибкой, если медианное время до окна входа
+превышает порог; так его можно использовать как проверку на регрессию.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+# Код дочернего процесса: время до показа окна входа и загруженные тяжелые модули
+CHILD = """
+import sys, time
+import stable_1
+app = stable_1.QApplication(sys.argv)
+window = stable_1.QuizApp()
+window.show()
+app.processEvents()
+elapsed = time.time() - float(sys.argv[1])
+heavy = [name for name in ("matplotlib", "numpy") if name in sys.modules]
+print(f"STARTUP {elapsed:.6f} {','.join(heavy)}")
+"""
+
+
+def parse_importtime(stderr):
+    """Строки вывода -X importtime: (модуль, собственное время, суммарное время) в мкс"""
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules.append((name.strip(), int(self_us), int(cumulative_us)))
+    return modules
+
+
+def measure(project_dir):
+    env = dict(os.environ, QT_QPA_PLATFORM=os.environ.get("QT_QPA_PLATFORM", "offscreen"))
+    started = time.time()
+    process = subprocess.run([sys.executable, "-X", "importtime", "-c", CHILD, str(started)],
+                             cwd=project_dir, env=env, capture_output=True, text=True, check=True)
+    line = next(line for line in process.stdout.splitlines() if line.startswith("STARTUP "))
+    _, elapsed, *heavy = line.split(" ")
+    return float(elapsed), [name for name in ",".join(heavy).split(",") if name], parse_importtime(process.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Время запуска до окна входа")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10, help="Сколько самых долгих импортов показать")
+    parser.add_argument("--max-ms", type=float, default=None, help="Порог медианного времени до окна входа")
+    args = parser.parse_args()
+
+    project_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    runs = [measure(project_dir) for _ in range(args.runs)]
+    times = [elapsed * 1000 for elapsed, heavy, modules in runs]
+    median = statistics.median(times)
+    heavy = sorted({name for elapsed, names, modules in runs for name in names})
+    modules = runs[-1][2]
+    app_import = next((cumulative for name, own, cumulative in modules if name == "stable_1"), 0)
+
+    print(f"До окна входа, мс: медиана {median:.1f}, мин {min(times):.1f}, макс {max(times):.1f}")
+    print(f"Импорт stable_1 вместе с зависимостями: {app_import / 1000:.1f} мс")
+    print(f"Тяжелые модули при запуске: {', '.join(heavy) if heavy else 'нет'}")
+    print("Самые долгие импорты (собственное время, мс):")
+    for name, own, cumulative in sorted(modules, key=lambda module: -module[1])[:args.top]:
+        print(f"  {own / 1000:8.1f}  {name}")
+
+    if heavy:
+        raise SystemExit(f"При запуске загружаются {', '.join(heavy)}")
+    if args.max_ms is not None and median > args.max_ms:
+        raise SystemExit(f"Запуск дольше порога: {median:.1f} мс > {args.max_ms:.1f} мс")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""Замер основных операций QuizCore на синтетических данных разного размера.
+
+Запуск из корня проекта:
+
+    python -m benchmarks.suite --rows 1000 100000 10000000 --output bench.jsonl
+    python -m benchmarks.suite --rows 100000 --compare bench.jsonl
+
+Для каждого размера данные генерируются во временном каталоге
+(benchmarks.datagen, один и тот же --seed) или берутся из --data-dir.
+Операции выполняются без окна, как их вызывают слоты QuizApp: вход
+(login), вопросы теста (load_test_questions), проверка ответов (grade, как
+в submit_test), закрепление студентов (enroll, как в
+assign_students_to_course) и статистика преподавателя и студента
+(view_teacher_stats, view_student_stats).
+
+У каждой операции замеряется первый вызов на только что открытом
+хранилище (с чтением файлов) и медиана повторных вызовов. Из счетчиков
+metrics берется, сколько строк и байт прочитано. Каждый замер дописывается в
+--output строкой JSON вместе с хешем коммита, так что файлы разных
+коммитов можно сравнить (--compare печатает отношение времен).
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import tempfile
+import time
+
+import metrics
+from benchmarks.datagen import PASSWORD, generate, scaled_sizes
+from core import QuizCore
+from storage import open_storage
+
+# Сколько повторных вызовов операции замеряется
+REPEATS = 100
+
+# Сколько студентов закрепляется за курсом одним вызовом enroll
+ENROLL_BATCH = 20
+
+
+def git_commit():
+    """Хеш текущего коммита и признак незакоммиченных изменений"""
+    project_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=project_dir, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=project_dir,
+                               capture_output=True, text=True, check=True).stdout.strip() != ""
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+    return commit, dirty
+
+
+def read_names(data_dir):
+    """Студенты, тесты и курсы данных, из которых выбираются аргументы операций"""
+    core = QuizCore(open_storage(data_dir))
+    try:
+        return core.students(), core.test_names(), core.course_names()
+    finally:
+        core.close()
+
+
+def cases(students, tests, courses, rng):
+    """Операции: имя -> функция от QuizCore, выполняющая один вызов"""
+    def login(core):
+        core.login(rng.choice(students), "student", PASSWORD)
+
+    def questions(core):
+        core.questions(rng.choice(tests))
+
+    def grade(core):
+        test_name = rng.choice(tests)
+        core.grade(test_name, ["нет"] * len(core.questions(test_name)))
+
+    def enroll(core):
+        core.enroll(rng.choice(courses), rng.sample(students, min(ENROLL_BATCH, len(students))))
+
+    def teacher_stats(core):
+        core.teacher_stats()
+
+    def student_stats(core):
+        core.student_stats(rng.choice(students))
+
+    return {"login": login, "questions": questions, "grade": grade, "enroll": enroll,
+            "teacher_stats": teacher_stats, "student_stats": student_stats}
+
+
+def measure(data_dir, operation, repeats):
+    """Время первого вызова, медиана повторных и прочитанные строки и байты"""
+    core = QuizCore(open_storage(data_dir))
+    try:
+        before = metrics.metrics.snapshot()["counters"]
+        start = time.perf_counter()
+        operation(core)
+        cold = time.perf_counter() - start
+        warm = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            operation(core)
+            warm.append(time.perf_counter() - start)
+        after = metrics.metrics.snapshot()["counters"]
+    finally:
+        core.close()
+    read = {name: after.get(name, 0) - before.get(name, 0) for name in ("rows_scanned", "bytes_read")}
+    return cold, statistics.median(warm) if warm else None, read
+
+
+def run(data_dir, rows, repeats, seed):
+    students, tests, courses = read_names(data_dir)
+    for case, operation in cases(students, tests, courses, random.Random(seed)).items():
+        cold, warm, read = measure(data_dir, operation, repeats)
+        yield dict({"rows": rows, "case": case, "cold": cold, "warm": warm}, **read)
+
+
+def load_previous(path):
+    """Последние замеры из файла: (rows, case) -> запись"""
+    previous = {}
+    with open(path, encoding="utf-8") as file:
+        for line in file:
+            if line.strip():
+                record = json.loads(line)
+                previous[(record["rows"], record["case"])] = record
+    return previous
+
+
+def ratio(old, new):
+    return f"{old / new:.2f}x" if old and new else "-"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Замер операций QuizCore на синтетических данных")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000, 100000],
+                        help="Размеры данных (число результатов)")
+    parser.add_argument("--repeats", type=int, default=REPEATS)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--data-dir", default=None,
+                        help="Готовые данные benchmarks.datagen вместо генерации (enroll их меняет)")
+    parser.add_argument("--output", default=None, help="Файл JSON Lines, куда дописываются замеры")
+    parser.add_argument("--compare", default=None, help="Файл прежних замеров для сравнения")
+    args = parser.parse_args()
+
+    commit, dirty = git_commit()
+    previous = load_previous(args.compare) if args.compare else {}
+    common = {"commit": commit, "dirty": dirty, "python": platform.python_version(),
+              "time": time.strftime("%Y-%m-%d %H:%M:%S")}
+    print(f"Коммит: {commit or 'неизвестен'}{' (есть изменения)' if dirty else ''}")
+    print(f"{'Строк':>10} {'Операция':<14}{'первый, мс':>12}{'повтор, мс':>12}{'прочитано строк':>17}{'байт':>14}"
+          + (f"{'ускорение первого':>19}{'повтора':>9}" if previous else ""))
+
+    for rows in ([None] if args.data_dir else args.rows):
+        with tempfile.TemporaryDirectory() as tmp:
+            data_dir = args.data_dir
+            if data_dir is None:
+                data_dir = tmp
+                generate(data_dir, scaled_sizes(rows), args.seed)
+            for record in run(data_dir, rows, args.repeats, args.seed):
+                record.update(common)
+                old = previous.get((record["rows"], record["case"]))
+                print(f"{record['rows'] or '-':>10} {record['case']:<14}{record['cold'] * 1000:>12.2f}"
+                      f"{(record['warm'] or 0) * 1000:>12.3f}{record['rows_scanned']:>17}{record['bytes_read']:>14}"
+                      + (f"{ratio(old and old['cold'], record['cold']):>19}"
+                         f"{ratio(old and old['warm'], record['warm']):>9}" if previous else ""))
+                if args.output:
+                    with open(args.output, "a", encoding="utf-8") as file:
+                        file.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,307 @@
+"""Массовый импорт вопросов и пользователей из CSV и JSON Lines.
+
+Входной файл читается построчно и не загружается в память целиком.
+Каждая строка проверяется; повторы отсеиваются по множеству хэшей уже
+имеющихся вопросов (тест и текст вопроса) и логинов, а также строк, уже
+принятых из этого же файла. Принятые строки дописываются в хранилище одной
+операцией, отклоненные - с номером строки и причиной - в отчет CSV.
+
+Форматы: CSV с полями в порядке test,question,answer или
+login,role,password (строка заголовка пропускается), JSON Lines (.jsonl,
+.ndjson) - по одному объекту с теми же ключами в строке - или массив таких
+объектов в .json. Массив тоже читается по частям (JSONDecoder.raw_decode),
+а номер строки в отчете для него - номер элемента; .json, который не
+начинается с "[", читается как JSON Lines.
+
+Пароль пользователя сохраняется хешем (user_directory.hash_password), в
+отчет об отклоненных строках он не попадает. Пользователю без пароля
+паролем станет первый введенный при входе (см. user_directory.py).
+
+    python bulk_import.py questions bank.csv --report rejected.csv
+    python bulk_import.py users roster.jsonl --data-dir .
+"""
+import argparse
+import codecs
+import csv
+import hashlib
+import json
+import os
+import re
+from collections import namedtuple
+
+from storage import open_storage
+from user_directory import hash_password
+
+QUESTION_FIELDS = ["test", "question", "answer"]
+USER_FIELDS = ["login", "role", "password"]
+
+# Поля, значения которых не пишутся в отчет
+SECRET_FIELDS = {"password"}
+ROLES = ("teacher", "student")
+JSON_LINES_EXTENSIONS = (".jsonl", ".ndjson")
+JSON_ARRAY_EXTENSION = ".json"
+
+# Сколько байт массива JSON читается за раз
+JSON_CHUNK = 1024 * 1024
+WHITESPACE = re.compile(r"[ \t\r\n]*")
+
+# Через сколько строк сообщать о ходе импорта
+PROGRESS_STEP = 10000
+
+# Сколько первых отклоненных строк возвращается в итогах для показа в окне
+EXAMPLES = 20
+
+ImportSummary = namedtuple("ImportSummary", "read accepted rejected examples")
+
+
+class Rejected(Exception):
+    """Строка не прошла проверку; текст исключения - причина"""
+
+
+def key_hash(*fields):
+    """64-битный хэш ключа: множество таких чисел занимает меньше памяти, чем строки"""
+    digest = hashlib.blake2b("\x1f".join(fields).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+
+def read_lines(path, progress=None):
+    """Строки файла по одной; progress(прочитано байт, размер файла)"""
+    size = os.path.getsize(path)
+    done = 0
+    with open(path, "rb") as file:
+        for number, line in enumerate(file):
+            done += len(line)
+            if progress is not None and number % PROGRESS_STEP == 0:
+                progress(done, size)
+            yield line.decode("utf-8-sig" if number == 0 else "utf-8")
+
+
+def starts_with_array(path):
+    """Начинается ли файл (после BOM и пробелов) с "[" """
+    with open(path, "r", encoding="utf-8-sig") as file:
+        for line in file:
+            if line.strip():
+                return line.lstrip().startswith("[")
+    return False
+
+
+def read_json_array(path, progress=None):
+    """Элементы массива JSON по одному: (номер элемента, значение, причина отказа или None).
+
+    После синтаксической ошибки разбор останавливается: где начинается
+    следующий элемент, уже не понять.
+    """
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    size = os.path.getsize(path)
+    number = pos = 0
+    buffer = ""
+    state = "start"  # start, first (элемент или "]"), value, next ("," или "]")
+    with open(path, "rb") as file:
+
+        def read_more():
+            """Следующая часть текста файла; пустая строка - конец файла"""
+            data = file.read(JSON_CHUNK)
+            if progress is not None:
+                progress(file.tell(), size)
+            return text_decoder.decode(data, final=not data)
+
+        eof = False
+        while True:
+            pos = WHITESPACE.match(buffer, pos).end()
+            if pos == len(buffer) and not eof:
+                text = read_more()
+                eof = not text
+                buffer, pos = buffer[pos:] + text, 0
+                continue
+            char = buffer[pos:pos + 1]
+            if state == "start":
+                if char != "[":
+                    yield 1, None, "ожидается массив JSON"
+                    return
+                pos += 1
+                state = "first"
+            elif char == "]" and state in ("first", "next"):
+                return
+            elif not char:
+                yield number + 1, None, "массив JSON не закончен"
+                return
+            elif state == "next":
+                if char != ",":
+                    yield number + 1, None, "некорректный JSON"
+                    return
+                pos += 1
+                state = "value"
+            else:
+                try:
+                    value, end = decoder.raw_decode(buffer, pos)
+                except ValueError:
+                    value, end = None, None
+                # Элемент, дошедший до конца прочитанного, может продолжаться дальше
+                if (end is None or end == len(buffer)) and not eof:
+                    text = read_more()
+                    eof = not text
+                    buffer, pos = buffer[pos:] + text, 0
+                    continue
+                if end is None:
+                    yield number + 1, None, "некорректный JSON"
+                    return
+                number += 1
+                pos = end
+                state = "next"
+                yield number, value, None
+
+
+def json_fields(record, fields):
+    return ["" if record.get(field) is None else str(record.get(field)) for field in fields]
+
+
+def read_records(path, fields, progress=None):
+    """Записи файла: (номер строки, список полей, причина отказа или None)"""
+    extension = os.path.splitext(path.lower())[1]
+    if extension == JSON_ARRAY_EXTENSION and starts_with_array(path):
+        for number, record, error in read_json_array(path, progress):
+            if error is None and not isinstance(record, dict):
+                error = "ожидается JSON-объект"
+            yield number, json_fields(record, fields) if error is None else [], error
+        return
+
+    lines = read_lines(path, progress)
+    if extension in JSON_LINES_EXTENSIONS or extension == JSON_ARRAY_EXTENSION:
+        for number, line in enumerate(lines, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                yield number, [line.rstrip("\r\n")], "некорректный JSON"
+                continue
+            if not isinstance(record, dict):
+                yield number, [line.rstrip("\r\n")], "ожидается JSON-объект"
+                continue
+            yield number, json_fields(record, fields), None
+        return
+
+    reader = csv.reader(lines)
+    for row in reader:
+        if not row:
+            continue
+        if reader.line_num == 1 and [value.strip().lower() for value in row] == fields[:len(row)]:
+            continue  # Заголовок, возможно без необязательных последних полей
+        yield reader.line_num, row, None
+
+
+def check_question(row, seen):
+    if len(row) < 3:
+        raise Rejected("ожидается три поля: тест, вопрос, ответ")
+    test, question, answer = (value.strip() for value in row[:3])
+    if not test or not question or not answer:
+        raise Rejected("пустой тест, вопрос или ответ")
+    key = key_hash(test, question)
+    if key in seen:
+        raise Rejected("такой вопрос в тесте уже есть")
+    seen.add(key)
+    return [test, question, answer]
+
+
+def check_user(row, seen):
+    if len(row) < 2:
+        raise Rejected("ожидается два или три поля: логин, роль, пароль")
+    login, role = (value.strip() for value in row[:2])
+    password = row[2] if len(row) > 2 else ""
+    if not login:
+        raise Rejected("пустой логин")
+    if role not in ROLES:
+        raise Rejected(f"неизвестная роль: {role}")
+    key = key_hash(login)
+    if key in seen:
+        raise Rejected("такой логин уже есть")
+    seen.add(key)
+    return [login, role, hash_password(password)] if password else [login, role]
+
+
+class BulkImport:
+    """Проверка строк файла и запись принятых строк в хранилище"""
+
+    def __init__(self, path, fields, check, seen, report_path=None, progress=None):
+        self.path = path
+        self.fields = fields
+        self.check = check
+        self.seen = seen  # Хэши ключей, которые уже есть в хранилище
+        self.report_path = report_path
+        self.progress = progress
+        self.read = self.accepted = self.rejected = 0
+        self.examples = []
+
+    def reject(self, report, number, row, reason):
+        self.rejected += 1
+        if len(self.examples) < EXAMPLES:
+            self.examples.append(f"Строка {number}: {reason}")
+        if report is not None:
+            report.writerow([number, reason] + ["***" if i < len(self.fields) and self.fields[i] in SECRET_FIELDS
+                                                else value for i, value in enumerate(row)])
+
+    def rows(self, report):
+        """Принятые строки; отклоненные записываются в отчет"""
+        for number, row, error in read_records(self.path, self.fields, self.progress):
+            self.read += 1
+            try:
+                if error is not None:
+                    raise Rejected(error)
+                checked = self.check(row, self.seen)
+            except Rejected as e:
+                self.reject(report, number, row, str(e))
+                continue
+            self.accepted += 1
+            yield checked
+
+    def run(self, write):
+        """write(итератор строк) дописывает принятые строки в хранилище"""
+        if self.report_path:
+            with open(self.report_path, "w", encoding="utf-8", newline="") as file:
+                report = csv.writer(file)
+                report.writerow(["строка", "причина"] + self.fields)
+                write(self.rows(report))
+        else:
+            write(self.rows(None))
+        return ImportSummary(self.read, self.accepted, self.rejected, self.examples)
+
+
+def import_questions(storage, path, report_path=None, progress=None):
+    """Импорт вопросов; повтором считается тот же текст вопроса в том же тесте"""
+    # Один проход по всем вопросам мимо кэша вопросов хранилища
+    seen = {key_hash(q.test, q.question) for q in storage.iter_questions()}
+    return BulkImport(path, QUESTION_FIELDS, check_question, seen, report_path, progress).run(
+        storage.add_questions)
+
+
+def import_users(storage, path, report_path=None, progress=None):
+    """Импорт пользователей; повтором считается уже занятый логин"""
+    seen = {key_hash(user.login) for user in storage.all_users()}
+    return BulkImport(path, USER_FIELDS, check_user, seen, report_path, progress).run(storage.add_users)
+
+
+IMPORTS = {"questions": import_questions, "users": import_users}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Массовый импорт вопросов и пользователей")
+    parser.add_argument("kind", choices=sorted(IMPORTS), help="Что импортировать")
+    parser.add_argument("path", help="Файл CSV или JSON Lines")
+    parser.add_argument("--report", default=None, help="Файл отчета об отклоненных строках")
+    parser.add_argument("--data-dir", default=".", help="Каталог с CSV-файлами")
+    parser.add_argument("--db", default=os.environ.get("QUIZ_DB", ""), help="База SQLite вместо CSV")
+    args = parser.parse_args()
+
+    storage = open_storage(args.data_dir, args.db)
+    try:
+        summary = IMPORTS[args.kind](storage, args.path, args.report)
+    finally:
+        storage.close()
+    print(f"Прочитано строк: {summary.read}, принято: {summary.accepted}, отклонено: {summary.rejected}")
+    for example in summary.examples:
+        print(example)
+
+
+if __name__ == "__main__":
+    main()
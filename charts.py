@@ -0,0 +1,203 @@
+"""Отрисовка графиков статистики без интерактивного окна.
+
+Графики рисуются через бэкенд Agg в байты PNG или SVG: их можно показать в
+виджете Qt или записать на диск. Готовые картинки кэшируются по хэшу данных,
+поэтому неизменившаяся статистика повторно не рисуется.
+
+Выгрузка графиков всех студентов:
+
+    python charts.py --out charts --format png
+"""
+import argparse
+import hashlib
+import io
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+
+import matplotlib
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from core import QuizCore
+from storage import open_storage, replace_file
+
+BAR_WIDTH = 0.5
+
+# Сколько последних картинок ChartCache держит в памяти
+MEMORY_IMAGES = 16
+
+
+def new_figure(dpi):
+    figure = Figure(dpi=dpi)
+    FigureCanvasAgg(figure)
+    return figure, figure.add_subplot()
+
+
+def figure_bytes(figure, fmt):
+    buffer = io.BytesIO()
+    figure.tight_layout()
+    figure.savefig(buffer, format=fmt)
+    return buffer.getvalue()
+
+
+def render_teacher_chart(student_means, fmt="png", dpi=100):
+    """Средние баллы студентов: список пар (студент, средний балл)"""
+    figure, ax = new_figure(dpi)
+    students = [student for student, mean in student_means]
+    x = range(len(students))
+
+    # Палитра создается один раз на весь график, а не для каждого столбца
+    colormap = matplotlib.colormaps["hsv"].resampled(max(len(students), 1))
+    ax.bar(x, [mean for student, mean in student_means], BAR_WIDTH,
+           color=[colormap(i) for i in x])  # Разные цвета для каждого студента
+
+    ax.set_ylabel('Средний балл')
+    ax.set_title('Статистика по результатам тестов (средние баллы)')
+    ax.set_xticks(list(x))
+    ax.set_xticklabels(students, rotation=45, ha='right')
+    return figure_bytes(figure, fmt)
+
+
+def render_student_chart(student, test_means, fmt="png", dpi=100):
+    """Средние баллы студента по тестам: список пар (тест, средний балл)"""
+    figure, ax = new_figure(dpi)
+    tests = [test for test, mean in test_means]
+    x = list(range(len(tests)))
+    rects = ax.bar(x, [mean for test, mean in test_means], BAR_WIDTH, label='Средний балл')
+
+    ax.set_ylabel('Баллы')
+    ax.set_title(f'Результаты студента {student}')
+    ax.set_xticks(x)
+    ax.set_xticklabels(tests, rotation=45, ha='right')
+    ax.legend()
+
+    for rect in rects:
+        height = rect.get_height()
+        ax.annotate(f'{height:g}',
+                    xy=(rect.get_x() + rect.get_width() / 2, height),
+                    xytext=(0, 3),
+                    textcoords="offset points",
+                    ha='center', va='bottom')
+    return figure_bytes(figure, fmt)
+
+
+class ChartCache:
+    """Кэш картинок по хэшу данных графика.
+
+    В памяти хранятся max_images последних использованных картинок (старые
+    вытесняются), а если задан каталог - все картинки на диске, так что
+    кэш переживает перезапуск.
+    """
+
+    def __init__(self, directory=None, max_images=MEMORY_IMAGES):
+        self.directory = directory
+        self.max_images = max_images
+        self._images = OrderedDict()
+        self._lock = threading.Lock()  # Графики рисуются в фоновых потоках
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def key(kind, data, fmt, dpi):
+        payload = json.dumps([kind, data, fmt, dpi], ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _path(self, key, fmt):
+        return os.path.join(self.directory, f"{key}.{fmt}")
+
+    def _remember(self, key, image):
+        with self._lock:
+            self._images[key] = image
+            self._images.move_to_end(key)
+            while len(self._images) > self.max_images:
+                self._images.popitem(last=False)
+
+    def get(self, key, fmt):
+        with self._lock:
+            image = self._images.get(key)
+            if image is not None:
+                self._images.move_to_end(key)
+                return image
+        if not self.directory:
+            return None
+        try:
+            with open(self._path(key, fmt), "rb") as file:
+                image = file.read()
+        except FileNotFoundError:
+            return None
+        self._remember(key, image)
+        return image
+
+    def put(self, key, fmt, image):
+        self._remember(key, image)
+        if self.directory:
+            replace_file(self._path(key, fmt), image)
+
+    def teacher_chart(self, student_means, fmt="png", dpi=100):
+        return self._render("teacher", student_means, fmt, dpi,
+                            lambda: render_teacher_chart(student_means, fmt, dpi))
+
+    def student_chart(self, student, test_means, fmt="png", dpi=100):
+        return self._render(["student", student], test_means, fmt, dpi,
+                            lambda: render_student_chart(student, test_means, fmt, dpi))
+
+    def _render(self, kind, data, fmt, dpi, render):
+        key = self.key(kind, data, fmt, dpi)
+        image = self.get(key, fmt)
+        if image is None:
+            image = render()
+            self.put(key, fmt, image)
+        return image
+
+
+def file_name(login):
+    """Имя файла из логина: все, кроме букв, цифр, "-" и ".", заменяется на "_".
+
+    К измененному имени добавляется хэш логина, чтобы разные логины не
+    получили один файл.
+    """
+    name = re.sub(r"[^\w.-]", "_", login)
+    if name != login or name.startswith("."):
+        name = f"{name.lstrip('.')}_{hashlib.sha256(login.encode('utf-8')).hexdigest()[:8]}"
+    return name
+
+
+def export_charts(core, out_dir, fmt="png", dpi=100, cache=None):
+    """Записывает графики всех студентов и общий график в каталог"""
+    cache = cache or ChartCache()
+    os.makedirs(out_dir, exist_ok=True)
+    student_means = core.teacher_stats()
+
+    paths = []
+    charts = [("teacher", lambda: cache.teacher_chart(student_means, fmt, dpi))]
+    for student, mean in student_means:
+        charts.append((f"student_{file_name(student)}", lambda student=student: cache.student_chart(
+            student, core.student_stats(student), fmt, dpi)))
+    for name, chart in charts:
+        path = os.path.join(out_dir, f"{name}.{fmt}")
+        with open(path, "wb") as file:
+            file.write(chart())
+        paths.append(path)
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Выгрузка графиков статистики в файлы")
+    parser.add_argument("--out", default="charts", help="Каталог для графиков")
+    parser.add_argument("--format", default="png", choices=["png", "svg"])
+    parser.add_argument("--dpi", type=int, default=100)
+    parser.add_argument("--data-dir", default=".", help="Каталог с CSV-файлами")
+    parser.add_argument("--db", default=os.environ.get("QUIZ_DB", ""), help="База SQLite вместо CSV")
+    parser.add_argument("--cache", default=None, help="Каталог кэша картинок")
+    args = parser.parse_args()
+
+    core = QuizCore(open_storage(args.data_dir, args.db))
+    paths = export_charts(core, args.out, args.format, args.dpi, ChartCache(args.cache))
+    print(f"Записано графиков: {len(paths)}")
+
+
+if __name__ == "__main__":
+    main()
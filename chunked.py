@@ -0,0 +1,175 @@
+"""Параллельная агрегация большого файла результатов по частям.
+
+Файл делится на диапазоны байт, границы которых сдвинуты на начало
+следующей строки. Каждый диапазон читается потоком (csv.reader поверх
+чтения, которое останавливается на конце диапазона), так что память не
+зависит от размера части, и агрегируется в отдельном процессе (ProcessPoolExecutor), а частичные отчеты складываются в порядке
+частей методом Report.merge. Результат тот же, что у последовательного
+report.build_report:
+
+    report = parallel_report("results.csv", Filters(), Report(["student", "test"]))
+
+Число процессов по умолчанию выбирается по числу ядер и размеру файла;
+небольшой файл считается в текущем процессе без запуска пула.
+"""
+import concurrent.futures
+import csv
+import io
+import multiprocessing
+import os
+
+import metrics
+from report import Report, build_report
+from storage import ResultRepository
+
+# Меньше этого на один процесс файл не делится: запуск процесса дороже разбора
+MIN_CHUNK_BYTES = 8 * 1024 * 1024
+
+# Сколько байт части читается за один раз
+READ_BUFFER = 1024 * 1024
+
+# Частей больше, чем процессов, чтобы процессы не простаивали в конце
+CHUNKS_PER_WORKER = 4
+
+
+def default_workers(size):
+    return max(1, min(os.cpu_count() or 1, size // MIN_CHUNK_BYTES))
+
+
+def count_quotes(file, start, stop):
+    """Число кавычек в байтах файла [start, stop)"""
+    file.seek(start)
+    count = 0
+    while start < stop:
+        data = file.read(min(READ_BUFFER, stop - start))
+        if not data:
+            break
+        count += data.count(b'"')
+        start += len(data)
+    return count
+
+
+def next_row(file, position, quotes):
+    """Начало первой строки после позиции position и число кавычек до него.
+
+    quotes - число кавычек до position. Как и в mmap_scan.find_rows, перевод
+    строки заканчивает строку, только если до него четное число кавычек:
+    иначе он внутри поля в кавычках.
+    """
+    file.seek(position)
+    while True:
+        data = file.read(READ_BUFFER)
+        if not data:
+            return position, quotes
+        i = 0
+        while True:
+            newline = data.find(b"\n", i)
+            if newline < 0:
+                quotes += data.count(b'"', i)
+                break
+            quotes += data.count(b'"', i, newline)
+            i = newline + 1
+            if quotes % 2 == 0:
+                return position + i, quotes
+        position += len(data)
+
+
+def chunk_ranges(path, chunks, end=None):
+    """Диапазоны байт [начало, конец), каждый из которых начинается с новой строки.
+
+    Файл читается один раз по частям: чтобы граница не попала внутрь поля в
+    кавычках, считаются кавычки от начала файла.
+    """
+    if end is None:
+        end = os.path.getsize(path)
+    bounds = [0]
+    position = quotes = 0  # Начало последней найденной строки и кавычек до него
+    with open(path, "rb") as file:
+        for i in range(1, chunks):
+            target = end * i // chunks
+            if target <= bounds[-1]:
+                continue
+            # Граница на самом target, если перед ним кончается строка
+            quotes += count_quotes(file, position, target - 1)
+            position, quotes = next_row(file, target - 1, quotes)
+            if min(position, end) > bounds[-1]:
+                bounds.append(min(position, end))
+    if bounds[-1] < end:
+        bounds.append(end)
+    return list(zip(bounds, bounds[1:]))
+
+
+class BoundedReader(io.RawIOBase):
+    """Не больше length байт файла с его текущей позиции"""
+
+    def __init__(self, file, length):
+        self.file = file
+        self.remaining = length
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        size = min(len(buffer), self.remaining)
+        if size <= 0:
+            return 0
+        count = self.file.readinto(memoryview(buffer)[:size])
+        self.remaining -= count
+        return count
+
+
+def read_chunk(path, start, end):
+    """Результаты из диапазона байт файла; в памяти - не больше READ_BUFFER байт файла"""
+    repository = ResultRepository(path)
+    with open(path, "rb", buffering=0) as file:
+        file.seek(start)
+        text = io.TextIOWrapper(io.BufferedReader(BoundedReader(file, end - start), READ_BUFFER),
+                                encoding="utf-8", newline="")
+        for row in csv.reader(text):
+            if row:
+                yield repository.parse_row(row)
+
+
+def aggregate_chunk(path, start, end, filters, group_by, student_courses):
+    """Частичный отчет по одному диапазону; выполняется в процессе пула"""
+    return build_report(read_chunk(path, start, end), filters, Report(group_by, student_courses))
+
+
+def parallel_report(path, filters, report, workers=None, end=None, progress=None):
+    """Учитывает в report результаты файла до смещения end.
+
+    progress(готово частей, всего частей) вызывается по мере готовности;
+    если он прерывает подсчет исключением, report не меняется.
+    """
+    if end is None:
+        end = os.path.getsize(path)
+    # Части читаются в других процессах, их счетчики сюда не попадают
+    metrics.count("bytes_read", end)
+    workers = workers or default_workers(end)
+    if workers == 1:
+        partial = aggregate_chunk(path, 0, end, filters, report.group_by, report.student_courses)
+        report.merge(partial)
+        return report
+
+    ranges = chunk_ranges(path, workers * CHUNKS_PER_WORKER, end)
+    partials = [None] * len(ranges)
+    # Подсчет может запускаться из фонового потока окна, а fork
+    # многопоточного процесса небезопасен, поэтому процессы порождаются заново
+    context = multiprocessing.get_context("spawn")
+    with concurrent.futures.ProcessPoolExecutor(workers, mp_context=context) as pool:
+        futures = {pool.submit(aggregate_chunk, path, start, stop, filters, report.group_by,
+                               report.student_courses): i
+                   for i, (start, stop) in enumerate(ranges)}
+        try:
+            for done, future in enumerate(concurrent.futures.as_completed(futures), 1):
+                partials[futures[future]] = future.result()
+                if progress is not None:
+                    progress(done, len(ranges))
+        except BaseException:
+            pool.shutdown(cancel_futures=True)
+            raise
+
+    # Части складываются по порядку, чтобы группы шли в порядке первого появления
+    for partial in partials:
+        report.merge(partial)
+    return report
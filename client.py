@@ -0,0 +1,122 @@
+"""Клиент сервера server.py с тем же интерфейсом, что у QuizCore.
+
+Окно Qt работает с сервером через RemoteCore так же, как с локальным
+QuizCore: каждая операция - один POST-запрос с JSON. Ошибки сервера
+поднимаются как исключения; отсутствие файла данных на сервере - как
+FileNotFoundError, чтобы окно показывало те же сообщения.
+
+Токен сеанса, который вернул login, запоминается и передается серверу в
+заголовке Authorization с каждой следующей операцией.
+"""
+import json
+import urllib.error
+import urllib.request
+
+import metrics
+
+TIMEOUT = 30
+
+
+class RemoteError(Exception):
+    """Ошибка, которую вернул сервер"""
+
+
+class RemoteCore:
+    """Операции системы тестирования на сервере по адресу url"""
+
+    def __init__(self, url, timeout=TIMEOUT):
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+        self.token = None  # Токен сеанса после входа
+
+    def _call(self, method, **kwargs):
+        headers = {"Content-Type": "application/json"}
+        if self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+        request = urllib.request.Request(
+            f"{self.url}/api/{method}", data=json.dumps(kwargs, ensure_ascii=False).encode("utf-8"),
+            headers=headers)
+        try:
+            with metrics.span(f"client.{method}"), urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return json.loads(response.read().decode("utf-8"))["result"]
+        except urllib.error.HTTPError as e:
+            try:
+                payload = json.loads(e.read().decode("utf-8"))
+            except ValueError:
+                raise RemoteError(f"Сервер ответил {e.code}") from None
+            if payload.get("type") == "FileNotFoundError":
+                raise FileNotFoundError(payload["error"]) from None
+            raise RemoteError(payload["error"]) from None
+
+    # Пользователи
+    def login(self, login, role, password=""):
+        self.token = self._call("login", login=login, role=role, password=password)
+        return self.token
+
+    def resume(self, token):
+        session = self._call("resume", token=token)
+        if session is not None:
+            self.token = token
+        return session
+
+    def logout(self, token):
+        self._call("logout")
+        if token == self.token:
+            self.token = None
+
+    def students(self):
+        return self._call("students")
+
+    # Тесты
+    def test_names(self):
+        return self._call("test_names")
+
+    def questions(self, test_name):
+        return self._call("questions", test_name=test_name)
+
+    def submit(self, student, test_name, answers):
+        # Студента сервер берет из сеанса
+        return tuple(self._call("submit", test_name=test_name, answers=answers))
+
+    def create_test(self, test_name):
+        self._call("create_test", test_name=test_name)
+
+    def add_question(self, test_name, question, answer):
+        self._call("add_question", test_name=test_name, question=question, answer=answer)
+
+    # Массовый импорт читает файлы на компьютере пользователя, а сервер их не видит
+    def import_questions(self, path, report_path=None, progress=None):
+        raise RemoteError("Импорт доступен только при работе с файлами данных напрямую")
+
+    def import_users(self, path, report_path=None, progress=None):
+        raise RemoteError("Импорт доступен только при работе с файлами данных напрямую")
+
+    # Курсы
+    def course_names(self):
+        return self._call("course_names")
+
+    def course_students(self, course_name):
+        return self._call("course_students", course_name=course_name)
+
+    def create_course(self, course_name):
+        self._call("create_course", course_name=course_name)
+
+    def enroll(self, course_name, students):
+        self._call("enroll", course_name=course_name, students=students)
+
+    # Статистика; ход подсчета на сервере клиенту не передается
+    def teacher_stats(self, progress=None):
+        return self._call("teacher_stats")
+
+    def student_stats(self, student, progress=None):
+        return self._call("student_stats", student=student)
+
+    # Настройки
+    def get_setting(self, key, default=None):
+        return self._call("get_setting", key=key, default=default)
+
+    def set_setting(self, key, value):
+        self._call("set_setting", key=key, value=value)
+
+    def close(self):
+        pass
@@ -0,0 +1,221 @@
+"""Колоночная загрузка results.csv в массивы NumPy для аналитики.
+
+Файл результатов разбирается один раз в столбцы: коды студентов и тестов
+(категории), массив баллов и массив времени datetime64. Агрегаты считаются
+групповыми операциями NumPy (np.bincount, np.minimum.reduceat) без циклов
+Python по строкам:
+
+    columns = load_results("results.csv")  # или load_log("results.bin")
+    per_student = columns.per_student()
+    for name, mean in zip(per_student.keys, per_student.mean):
+        ...
+"""
+import csv
+import gc
+import itertools
+from collections import namedtuple
+
+import numpy as np
+
+# Агрегаты по группам: ключи групп и массивы той же длины
+GroupStats = namedtuple("GroupStats", "keys count total mean min max last")
+
+NAT = np.datetime64("NaT", "s")
+
+
+def encode(values):
+    """Категориальное кодирование: коды строк и список категорий"""
+    categories = {value: code for code, value in enumerate(dict.fromkeys(values))}
+    codes = np.fromiter(map(categories.__getitem__, values), dtype=np.int32, count=len(values))
+    return codes, np.array(list(categories), dtype=object)
+
+
+def parse_scores(values):
+    """Баллы и маска корректных значений; некорректные баллы равны 0"""
+    try:
+        scores = np.fromiter(map(int, values), dtype=np.int64, count=len(values))
+        return scores, np.ones(len(scores), dtype=bool)
+    except ValueError:
+        pass
+    # В файле есть некорректные баллы: отбираем числа по маске
+    text = np.array(values, dtype=str)
+    valid = np.char.isdigit(text)
+    scores = np.zeros(len(text), dtype=np.int64)
+    scores[valid] = text[valid].astype(np.int64)
+    return scores, valid
+
+
+def to_day(date):
+    """Дата вида ГГГГММДД в datetime64; несуществующая дата - NaT"""
+    try:
+        return np.datetime64(f"{date // 10000:04d}-{date // 100 % 100:02d}-{date % 100:02d}", "s")
+    except ValueError:
+        return NAT
+
+
+def parse_timestamps(values):
+    """Время прохождения; пустое или некорректное время - NaT.
+
+    Время в формате "ГГГГ-ММ-ДД ЧЧ:ММ:СС" разбирается арифметикой над
+    байтами: секунды считаются по цифрам, а в datetime64 преобразуются
+    только уникальные даты.
+    """
+    result = np.full(len(values), NAT)
+    try:
+        text = np.array(values, dtype="S19")
+    except UnicodeEncodeError:
+        text = np.array([value if value.isascii() else "" for value in values], dtype="S19")
+    chars = text.view(np.uint8).reshape(-1, 19) if len(text) else np.zeros((0, 19), dtype=np.uint8)
+    digits = chars.astype(np.int64) - ord("0")
+
+    digit_positions = [0, 1, 2, 3, 5, 6, 8, 9, 11, 12, 14, 15, 17, 18]
+    well_formed = np.all((digits[:, digit_positions] >= 0) & (digits[:, digit_positions] <= 9), axis=1)
+    for position, separator in ((4, "-"), (7, "-"), (10, " "), (13, ":"), (16, ":")):
+        well_formed &= chars[:, position] == ord(separator)
+
+    d = digits[well_formed]
+    dates = (d[:, 0] * 1000 + d[:, 1] * 100 + d[:, 2] * 10 + d[:, 3]) * 10000 \
+        + (d[:, 5] * 10 + d[:, 6]) * 100 + d[:, 8] * 10 + d[:, 9]
+    seconds = (d[:, 11] * 10 + d[:, 12]) * 3600 + (d[:, 14] * 10 + d[:, 15]) * 60 + d[:, 17] * 10 + d[:, 18]
+    unique_dates, date_codes = np.unique(dates, return_inverse=True)
+    days = np.array([to_day(date) for date in unique_dates.tolist()], dtype="datetime64[s]")
+    result[well_formed] = days[date_codes.ravel()] + seconds.astype("timedelta64[s]")
+
+    # Остальные значения (другой формат) разбираем по одному
+    for i in np.flatnonzero(~well_formed):
+        try:
+            result[i] = np.datetime64(values[i], "s")
+        except ValueError:
+            continue
+    return result
+
+
+def group_reduce(codes, keys, scores, timestamps):
+    """Агрегаты баллов по кодам групп; группы без строк не возвращаются"""
+    n = len(keys)
+    count = np.bincount(codes, minlength=n)
+    total = np.bincount(codes, weights=scores, minlength=n).astype(np.int64)
+    present = count > 0
+    mean = np.zeros(n)
+    mean[present] = total[present] / count[present]
+
+    minimum = np.zeros(n, dtype=np.int64)
+    maximum = np.zeros(n, dtype=np.int64)
+    last = np.full(n, NAT)
+    if len(codes):
+        order = np.argsort(codes, kind="stable")
+        sorted_codes = codes[order]
+        starts = np.flatnonzero(np.r_[True, sorted_codes[1:] != sorted_codes[:-1]])
+        groups = sorted_codes[starts]
+        minimum[groups] = np.minimum.reduceat(scores[order], starts)
+        maximum[groups] = np.maximum.reduceat(scores[order], starts)
+        # NaT хранится как наименьшее целое и не влияет на максимум
+        last[groups] = np.maximum.reduceat(timestamps[order].view(np.int64), starts).view("datetime64[s]")
+
+    return GroupStats(keys[present], count[present], total[present], mean[present],
+                      minimum[present], maximum[present], last[present])
+
+
+class ResultColumns:
+    """Результаты тестов в виде столбцов"""
+
+    def __init__(self, student_codes, students, test_codes, tests, scores, valid, timestamps):
+        self.student_codes = student_codes
+        self.students = students
+        self.test_codes = test_codes
+        self.tests = tests
+        self.scores = scores
+        self.valid = valid  # Строки с корректными баллами
+        self.timestamps = timestamps
+
+    def __len__(self):
+        return len(self.scores)
+
+    def _reduce(self, codes, keys, mask=None):
+        mask = self.valid if mask is None else self.valid & mask
+        return group_reduce(codes[mask], keys, self.scores[mask], self.timestamps[mask])
+
+    def per_student(self):
+        return self._reduce(self.student_codes, self.students)
+
+    def per_test(self):
+        return self._reduce(self.test_codes, self.tests)
+
+    def per_day(self):
+        """Агрегаты по дням; строки без времени не учитываются"""
+        dated = ~np.isnat(self.timestamps)
+        days, codes = np.unique(self.timestamps[dated].astype("datetime64[D]"), return_inverse=True)
+        full_codes = np.zeros(len(self), dtype=np.int64)
+        full_codes[dated] = codes.ravel()
+        return self._reduce(full_codes, days, dated)
+
+    def for_student(self, student):
+        """Маска строк студента для фильтрации столбцов"""
+        matches = np.flatnonzero(self.students == student)
+        if not len(matches):
+            return np.zeros(len(self), dtype=bool)
+        return self.student_codes == matches[0]
+
+
+def load_results(path):
+    """Разбирает файл результатов в столбцы"""
+    # Разбор создает миллионы мелких списков; сборщик мусора здесь только
+    # тратит время на их обход, поэтому на время разбора он отключается
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        with open(path, "r", encoding="utf-8", newline="") as file:
+            rows = [row for row in csv.reader(file) if row]
+        # Транспонирование строк разной длины; недостающие поля пустые
+        columns = list(itertools.zip_longest(*rows, fillvalue=""))[:4]
+        columns += [("",) * len(rows)] * (4 - len(columns))
+        del rows
+
+        students, tests, scores, timestamps = columns
+        scores, valid = parse_scores(scores)
+        return ResultColumns(*encode(students), *encode(tests), scores, valid, parse_timestamps(timestamps))
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+
+LOG_DTYPE = np.dtype([("student", "<u4"), ("test", "<u4"), ("score", "<i4"), ("time", "<i8")])
+
+
+def read_log(path, end=None):
+    """Записи двоичного журнала результатов до смещения end одним массивом"""
+    from result_log import MAGIC, RECORD, ResultLog
+
+    assert LOG_DTYPE.itemsize == RECORD.size
+    count = len(ResultLog(path)) if end is None else max(0, (end - len(MAGIC)) // RECORD.size)
+    if not count:
+        return np.zeros(0, dtype=LOG_DTYPE)
+    return np.fromfile(path, dtype=LOG_DTYPE, count=count, offset=len(MAGIC))
+
+
+def load_log(path):
+    """Столбцы из двоичного журнала результатов (result_log.py).
+
+    Записи журнала уже имеют фиксированную длину и номера имен вместо
+    строк, поэтому файл читается в массив целиком, без разбора.
+    """
+    from result_log import NO_SCORE, ResultLog
+
+    log = ResultLog(path)
+    log.names.refresh()
+    names = log.names.names
+    records = read_log(path)
+
+    # Одно имя может встречаться в словаре под двумя номерами: берем первый
+    first = {}
+    canonical = np.array([first.setdefault(name, i) for i, name in enumerate(names)], dtype=np.int64)
+
+    def categories(ids):
+        used, codes = np.unique(canonical[ids], return_inverse=True)
+        return codes.ravel().astype(np.int32), np.array([names[i] for i in used.tolist()], dtype=object)
+
+    valid = records["score"] != NO_SCORE
+    scores = np.where(valid, records["score"], 0).astype(np.int64)
+    # Отсутствующее время (NO_TIME) - наименьшее целое, то есть NaT
+    timestamps = records["time"].view("datetime64[s]")
+    return ResultColumns(*categories(records["student"]), *categories(records["test"]), scores, valid, timestamps)
@@ -0,0 +1,140 @@
+"""Операции системы тестирования без интерфейса.
+
+QuizCore собирает над хранилищем все, что раньше делали слоты QuizApp:
+проверку логина и роли, списки тестов и курсов, вопросы, проверку ответов
+и запись результата, закрепление студентов и статистику. Им пользуются
+окно Qt (напрямую или через RemoteCore из client.py) и сервер server.py.
+
+Все значения, которые возвращают методы, - простые списки, строки и числа,
+чтобы их можно было без изменений передать в JSON.
+
+Основные операции замеряются интервалами metrics (core.login и т. д.).
+"""
+from datetime import datetime
+
+import metrics
+from grading import KeyCache
+from stats import ResultStats
+from user_directory import UserDirectory
+
+
+class QuizCore:
+    """Операции системы тестирования над хранилищем CsvStorage или SqliteStorage"""
+
+    def __init__(self, storage):
+        self.storage = storage
+        self.stats = ResultStats(storage)
+        self.keys = KeyCache()  # Разобранные правильные ответы тестов
+        self.users = UserDirectory(storage)  # Проверка паролей и сеансы
+
+    # Пользователи
+    @metrics.timed("core.login")
+    def login(self, login, role, password=""):
+        """Токен сеанса или None, если логин, роль или пароль неверны"""
+        return self.users.authenticate(login, role, password)
+
+    def resume(self, token):
+        """[логин, роль] сеанса или None, если сеанс истек"""
+        return self.users.resume(token)
+
+    def logout(self, token):
+        self.users.logout(token)
+
+    def students(self):
+        return self.storage.students()
+
+    # Тесты
+    @metrics.timed("core.test_list")
+    def test_names(self):
+        return self.storage.test_names()
+
+    @metrics.timed("core.questions")
+    def questions(self, test_name):
+        """Тексты вопросов теста; правильные ответы клиенту не передаются"""
+        questions = self.storage.questions(test_name)
+        self.keys.get(test_name, questions)  # Ключ ответов готов к моменту отправки теста
+        return [q.question for q in questions]
+
+    def answer_key(self, test_name):
+        return self.keys.get(test_name, self.storage.questions(test_name))
+
+    @metrics.timed("core.grade")
+    def grade(self, test_name, answers):
+        """Баллы за ответы на вопросы теста по порядку: (баллы, всего вопросов)"""
+        key = self.answer_key(test_name)
+        return key.grade(answers), len(key)
+
+    @metrics.timed("core.grade")
+    def grade_many(self, test_name, submissions):
+        """Баллы многих попыток одного теста, например при перепроверке"""
+        return self.answer_key(test_name).grade_many(submissions)
+
+    @metrics.timed("core.submit")
+    def submit(self, student, test_name, answers):
+        """Проверяет ответы и записывает результат; возвращает (баллы, всего вопросов).
+
+        Ответов должно быть столько же, сколько вопросов в тесте сейчас: иначе
+        студент видел устаревший тест, и результат не записывается.
+        """
+        key = self.answer_key(test_name)
+        if len(answers) != len(key):
+            raise ValueError(f"Тест '{test_name}' изменился: вопросов {len(key)}, ответов {len(answers)}")
+        score, total = self.grade(test_name, answers)
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        self.storage.add_result(student, test_name, score, timestamp, answers)
+        return score, total
+
+    def create_test(self, test_name):
+        self.storage.create_test(test_name)  # Пустые вопрос и ответ только регистрируют тест
+
+    def add_question(self, test_name, question, answer):
+        self.storage.add_question(test_name, question, answer)
+
+    # Массовый импорт
+    def import_questions(self, path, report_path=None, progress=None):
+        """Импорт вопросов из файла; итоги - словарь с полями ImportSummary"""
+        from bulk_import import import_questions
+        return import_questions(self.storage, path, report_path, progress)._asdict()
+
+    def import_users(self, path, report_path=None, progress=None):
+        from bulk_import import import_users
+        return import_users(self.storage, path, report_path, progress)._asdict()
+
+    # Курсы
+    @metrics.timed("core.course_list")
+    def course_names(self):
+        return self.storage.course_names()
+
+    def course_students(self, course_name):
+        return self.storage.course_students(course_name)
+
+    def create_course(self, course_name):
+        self.storage.create_course(course_name)
+
+    @metrics.timed("core.enroll")
+    def enroll(self, course_name, students):
+        self.storage.enroll(course_name, students)
+
+    # Статистика
+    @metrics.timed("core.stats")
+    def teacher_stats(self, progress=None):
+        """Средние баллы студентов: список пар [студент, средний балл]"""
+        self.stats.refresh(progress)  # Дочитываем только новые результаты
+        return [[student, round(self.stats.student(student).mean, 2)]
+                for student in sorted(self.stats.by_student)]
+
+    @metrics.timed("core.stats")
+    def student_stats(self, student, progress=None):
+        """Средние баллы студента по тестам: список пар [тест, средний балл]"""
+        self.stats.refresh(progress)
+        return [[test, round(aggregate.mean, 2)] for test, aggregate in self.stats.student_tests(student)]
+
+    # Настройки
+    def get_setting(self, key, default=None):
+        return self.storage.get_setting(key, default)
+
+    def set_setting(self, key, value):
+        self.storage.set_setting(key, value)
+
+    def close(self):
+        self.storage.close()
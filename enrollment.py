@@ -0,0 +1,192 @@
+"""Закрепление студентов за курсами с журналом добавлений.
+
+Основной файл courses.csv хранит строки "курс, студент, студент, ...".
+Новые курсы и закрепления не переписывают его, а дописываются в журнал
+courses.csv.journal строками "курс" или "курс, студент". Состав курсов в
+памяти - это основной файл плюс журнал; членство проверяется по множеству,
+поэтому закрепление стоит столько, сколько выбрано студентов.
+
+Журнал переносится в основной файл при уплотнении (compact): новая версия
+courses.csv пишется во временный файл и атомарно заменяет старую, так что
+сбой во время записи не портит данные. Повторное применение журнала после
+сбоя безопасно - дубликаты отбрасываются.
+"""
+import csv
+import io
+import os
+import threading
+
+from storage import Course, append_rows, file_stamp, format_rows, open_locked, replace_file
+
+# После стольких записей в журнале уплотнение запускается в фоне
+COMPACT_THRESHOLD = 1000
+
+
+class EnrollmentStore:
+    """Курсы и закрепленные за ними студенты"""
+
+    def __init__(self, path, journal_path=None, compact_threshold=COMPACT_THRESHOLD):
+        self.path = path
+        self.journal_path = journal_path or path + ".journal"
+        self.compact_threshold = compact_threshold
+        self._lock = threading.RLock()
+        self._compacting = False
+        self._base_stamp = None
+        self._reset()
+
+    def _reset(self):
+        self._students = {}  # курс -> список студентов в порядке закрепления
+        self._members = {}  # курс -> множество студентов
+        self._journal_inode = None
+        self._journal_pos = 0  # Сколько байт журнала уже применено
+        self._journal_rows = 0
+
+    def _apply(self, row):
+        course = row[0]
+        if course not in self._students:
+            self._students[course] = []
+            self._members[course] = set()
+        members = self._members[course]
+        for student in row[1:]:
+            if student and student not in members:
+                members.add(student)
+                self._students[course].append(student)
+
+    def _read_journal(self):
+        """Применяет записи, дописанные в журнал с прошлого чтения"""
+        try:
+            with open(self.journal_path, "rb") as file:
+                stat = os.fstat(file.fileno())
+                size = stat.st_size
+                if self._journal_inode not in (None, stat.st_ino) or size < self._journal_pos:
+                    return False  # Журнал уплотнили в другом процессе
+                self._journal_inode = stat.st_ino
+                file.seek(self._journal_pos)
+                data = file.read(size - self._journal_pos)
+        except FileNotFoundError:
+            return self._journal_pos == 0
+
+        # Неполная последняя строка будет дочитана в следующий раз
+        complete = data[:data.rfind(b"\n") + 1]
+        for row in csv.reader(io.StringIO(complete.decode("utf-8"))):
+            if row:
+                self._apply(row)
+                self._journal_rows += 1
+        self._journal_pos += len(complete)
+        return True
+
+    def _refresh(self):
+        stamp = file_stamp(self.path)
+        if stamp is None:
+            self._base_stamp = None
+            self._reset()
+            raise FileNotFoundError(self.path)
+        if stamp == self._base_stamp and self._read_journal():
+            return
+
+        self._reset()
+        with open(self.path, "r", encoding="utf-8", newline="") as file:
+            for row in csv.reader(file):
+                if row:
+                    self._apply(row)
+        self._base_stamp = stamp
+        self._read_journal()
+
+    def records(self):
+        with self._lock:
+            self._refresh()
+            return [Course(name, list(students)) for name, students in self._students.items()]
+
+    def names(self):
+        with self._lock:
+            self._refresh()
+            return list(self._students)
+
+    def students(self, course_name):
+        with self._lock:
+            self._refresh()
+            return list(self._students.get(course_name, []))
+
+    def is_enrolled(self, course_name, student):
+        with self._lock:
+            self._refresh()
+            return student in self._members.get(course_name, ())
+
+    def create_course(self, course_name):
+        with self._lock:
+            if not os.path.exists(self.path):
+                append_rows(self.path, [])  # Пустой основной файл
+            self._refresh()
+            if course_name in self._students:
+                return
+            append_rows(self.journal_path, [[course_name]])
+            self._refresh()
+        self._maybe_compact()
+
+    def enroll(self, course_name, students):
+        """Закрепляет студентов за курсом, дописывая в журнал только новые пары"""
+        with self._lock:
+            self._refresh()
+            members = self._members.get(course_name, set())
+            new_rows = []
+            seen = set()
+            for student in students:
+                if student not in members and student not in seen:
+                    seen.add(student)
+                    new_rows.append([course_name, student])
+            if course_name not in self._students and not new_rows:
+                new_rows.append([course_name])
+            if not new_rows:
+                return
+            append_rows(self.journal_path, new_rows)
+            self._refresh()  # Применяются только что дописанные строки
+        self._maybe_compact()
+
+    def _maybe_compact(self):
+        with self._lock:
+            if self._compacting or self._journal_rows < self.compact_threshold:
+                return
+            self._compacting = True
+        threading.Thread(target=self._compact_in_background, daemon=True).start()
+
+    def _compact_in_background(self):
+        try:
+            self.compact()
+        except OSError as e:
+            print(f"Не удалось уплотнить журнал курсов: {e}")
+        finally:
+            with self._lock:
+                self._compacting = False
+
+    def compact(self):
+        """Переносит журнал в основной файл и очищает перенесенную часть журнала.
+
+        Все уплотнение идет под блокировкой журнала: ни другой процесс, ни
+        другое уплотнение не допишут и не заменят журнал между его чтением
+        и очисткой.
+        """
+        with self._lock:
+            fd = open_locked(self.journal_path)
+            try:
+                self._refresh()  # Журнал, замененный другим уплотнением, читается заново
+                applied = self._journal_pos
+                rows = [[name] + students for name, students in self._students.items()]
+
+                replace_file(self.path, format_rows(rows).encode("utf-8"))
+
+                # Сохраняем только неполную строку, оставшуюся после сбоя
+                with open(self.journal_path, "rb") as file:
+                    file.seek(applied)
+                    tail = file.read()
+                replace_file(self.journal_path, tail)
+            finally:
+                os.close(fd)
+
+            self._base_stamp = None
+            self._refresh()
+
+if __name__ == "__main__":
+    import sys
+
+    # Уплотнение по требованию: python enrollment.py [courses.csv]
+    EnrollmentStore(sys.argv[1] if len(sys.argv) > 1 else "courses.csv").compact()
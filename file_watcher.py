@@ -0,0 +1,141 @@
+"""Слежение за файлами данных и новые строки в них для окна Qt.
+
+FileWatcher следит за CSV-файлами через QFileSystemWatcher (inotify в
+Linux) и при изменении файла читает только байты, дописанные с прошлого
+чтения, до последней целой строки. Новые строки приходят сигналом
+appended(путь, строки), так что открытые списки и статистика
+дополняются без перечитывания файлов. Если файл заменили целиком
+(уплотнение журнала курсов, replace_file) или обрезали, приходит сигнал
+replaced(путь): такой файл нужно перечитать.
+
+Кроме самих файлов отслеживаются их каталоги: после атомарной замены
+QFileSystemWatcher теряет файл, и он снова добавляется при изменении
+каталога. Там, где уведомления недоступны (или с QUIZ_WATCH_POLL=1),
+файлы опрашиваются по таймеру раз в QUIZ_WATCH_INTERVAL миллисекунд.
+"""
+import csv
+import io
+import os
+
+from PyQt5.QtCore import QFileSystemWatcher, QObject, QTimer, pyqtSignal
+
+import metrics
+
+# Интервал опроса файлов без уведомлений, мс
+POLL_INTERVAL = int(os.environ.get("QUIZ_WATCH_INTERVAL", 1000))
+FORCE_POLLING = os.environ.get("QUIZ_WATCH_POLL", "") == "1"
+
+# Уведомления, пришедшие за это время, обрабатываются одним чтением, мс
+SETTLE_DELAY = 50
+
+
+def file_position(path):
+    """inode файла и его размер или (None, 0), если файла нет"""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None, 0
+    return stat.st_ino, stat.st_size
+
+
+class FileWatcher(QObject):
+    """Новые строки дописываемых CSV-файлов в виде сигналов Qt"""
+
+    # Пути в сигналах - абсолютные
+    appended = pyqtSignal(str, list)  # путь, новые строки CSV (списки полей)
+    replaced = pyqtSignal(str)  # путь файла, который нужно перечитать целиком
+
+    def __init__(self, paths, parent=None, poll_interval=POLL_INTERVAL, polling=FORCE_POLLING):
+        super().__init__(parent)
+        # Путь -> [inode, позиция после последней прочитанной строки]; то,
+        # что уже есть в файле, считается прочитанным
+        self._files = {os.path.abspath(path): list(file_position(path)) for path in paths}
+        self._pending = set()
+
+        self._settle = QTimer(self)
+        self._settle.setSingleShot(True)
+        self._settle.setInterval(SETTLE_DELAY)
+        self._settle.timeout.connect(self._check_pending)
+
+        self._poll = QTimer(self)
+        self._poll.setInterval(poll_interval)
+        self._poll.timeout.connect(self.check)
+
+        self._watcher = None
+        if not polling:
+            self._watcher = QFileSystemWatcher(self)
+            self._watcher.fileChanged.connect(self._schedule)
+            self._watcher.directoryChanged.connect(self._directory_changed)
+            directories = {os.path.dirname(path) for path in self._files}
+            if self._watcher.addPaths(sorted(directories)):
+                self._watcher = None  # Каталоги не отслеживаются - только опрос
+            else:
+                self._watch_files()
+        if self._watcher is None:
+            self._poll.start()
+
+    def _watch_files(self):
+        """Добавляет в QFileSystemWatcher существующие файлы, которых в нем нет"""
+        watched = set(self._watcher.files())
+        missing = [path for path in self._files if path not in watched and os.path.exists(path)]
+        if missing:
+            self._watcher.addPaths(missing)
+
+    def _schedule(self, path):
+        self._pending.add(path)
+        self._settle.start()
+
+    def _directory_changed(self, directory):
+        # Файл могли создать или заменить: проверяем файлы этого каталога
+        self._watch_files()
+        for path in self._files:
+            if os.path.dirname(path) == directory:
+                self._schedule(path)
+
+    def _check_pending(self):
+        pending, self._pending = self._pending, set()
+        for path in pending:
+            if path in self._files:
+                self._check(path)
+
+    def check(self):
+        """Проверяет все файлы (опрос по таймеру)"""
+        for path in self._files:
+            self._check(path)
+
+    def _check(self, path):
+        inode, position = self._files[path]
+        try:
+            with open(path, "rb") as file:
+                stat = os.fstat(file.fileno())
+                if inode is None:  # Файл только что создан: все его строки новые
+                    inode = self._files[path][0] = stat.st_ino
+                if stat.st_ino != inode or stat.st_size < position:
+                    self._files[path] = [stat.st_ino, stat.st_size]
+                    self.replaced.emit(path)
+                    return
+                if stat.st_size == position:
+                    return
+                file.seek(position)
+                data = file.read(stat.st_size - position)
+        except FileNotFoundError:
+            if inode is not None:
+                self._files[path] = [None, 0]
+                self.replaced.emit(path)
+            return
+
+        # Неполная последняя строка будет дочитана в следующий раз
+        complete = data[:data.rfind(b"\n") + 1]
+        if not complete:
+            return
+        self._files[path][1] += len(complete)
+        metrics.count("bytes_read", len(complete))
+        rows = [row for row in csv.reader(io.StringIO(complete.decode("utf-8", errors="replace"))) if row]
+        if rows:
+            self.appended.emit(path, rows)
+
+    def stop(self):
+        self._settle.stop()
+        self._poll.stop()
+        if self._watcher is not None:
+            self._watcher.removePaths(self._watcher.files() + self._watcher.directories())
@@ -0,0 +1,133 @@
+"""Проверка ответов по заранее разобранным ключам.
+
+Правильный ответ в tests.csv разбирается один раз при загрузке теста в
+ключ (AnswerKey), который потом проверяет ответы без повторной обработки.
+Виды ответов:
+
+    Москва              - текст: без учета регистра и лишних пробелов
+    any:5|пять|five     - любой из перечисленных текстов
+    num:3.14            - число; ответ "3,14" тоже засчитывается
+    num:3.14+-0.01      - число с допуском (можно писать и ±)
+    re:\\d+ (кг|kg)      - регулярное выражение для всего ответа, без учета регистра
+
+Ответы на один тест многих попыток проверяются пачкой (AnswerKey.grade_many):
+по столбцам, то есть все ответы на вопрос сразу, а не попытка за попыткой.
+"""
+import re
+
+NUMBER_TOLERANCE = 1e-9  # Допуск числа, если он не указан
+
+
+def normalize_answer(answer):
+    """Текст ответа без регистра, пробелов по краям и повторных пробелов"""
+    return " ".join(answer.lower().split())
+
+
+def parse_number(text):
+    return float(text.strip().replace(",", "."))
+
+
+class TextAnswer:
+    """Один или несколько допустимых текстов"""
+
+    def __init__(self, accepted):
+        self.accepted = frozenset(normalize_answer(answer) for answer in accepted)
+
+    def check_many(self, answers):
+        accepted = self.accepted
+        return [normalize_answer(answer) in accepted for answer in answers]
+
+
+class NumberAnswer:
+    """Число с допуском"""
+
+    def __init__(self, value, tolerance=NUMBER_TOLERANCE):
+        self.value = value
+        self.tolerance = tolerance
+
+    def check(self, answer):
+        try:
+            # Небольшой запас, чтобы 3.13 при допуске 0.01 от 3.14 не отсекалось ошибкой округления
+            return abs(parse_number(answer) - self.value) <= self.tolerance + NUMBER_TOLERANCE
+        except ValueError:
+            return False
+
+    def check_many(self, answers):
+        return [self.check(answer) for answer in answers]
+
+
+class RegexAnswer:
+    """Ответ целиком совпадает с регулярным выражением"""
+
+    def __init__(self, pattern):
+        self.pattern = re.compile(pattern, re.IGNORECASE)
+
+    def check_many(self, answers):
+        fullmatch = self.pattern.fullmatch
+        return [fullmatch(answer.strip()) is not None for answer in answers]
+
+
+def compile_answer(answer):
+    """Ключ одного вопроса по тексту правильного ответа"""
+    kind, separator, value = answer.partition(":")
+    kind = kind.strip().lower()
+    if separator and kind == "any":
+        return TextAnswer(value.split("|"))
+    if separator and kind == "num":
+        number, _, tolerance = value.replace("±", "+-").partition("+-")
+        try:
+            return NumberAnswer(parse_number(number), parse_number(tolerance) if tolerance.strip()
+                                else NUMBER_TOLERANCE)
+        except ValueError:
+            pass  # Не число - сравниваем как текст
+    if separator and kind == "re":
+        try:
+            return RegexAnswer(value.strip())
+        except re.error:
+            pass  # Некорректное выражение - сравниваем как текст
+    return TextAnswer([answer])
+
+
+class AnswerKey:
+    """Разобранные правильные ответы теста по порядку вопросов"""
+
+    def __init__(self, answers):
+        self.answers = tuple(answers)  # Исходные тексты, для проверки актуальности
+        self.checks = [compile_answer(answer) for answer in self.answers]
+
+    def __len__(self):
+        return len(self.checks)
+
+    def grade(self, answers):
+        """Баллы одной попытки"""
+        return self.grade_many([answers])[0]
+
+    def grade_many(self, submissions):
+        """Баллы многих попыток: ответы на каждый вопрос проверяются вместе.
+
+        Недостающие ответы считаются неверными, лишние не учитываются.
+        """
+        scores = [0] * len(submissions)
+        for i, check in enumerate(self.checks):
+            answered = [n for n, answers in enumerate(submissions) if i < len(answers)]
+            for n, correct in zip(answered, check.check_many([submissions[n][i] for n in answered])):
+                scores[n] += correct
+        return scores
+
+
+class KeyCache:
+    """Ключи тестов; ключ разбирается заново, только если ответы теста изменились"""
+
+    def __init__(self):
+        self._keys = {}  # тест -> (вопросы, ключ)
+
+    def get(self, test_name, questions):
+        """Ключ для вопросов (Question) теста"""
+        source, key = self._keys.get(test_name, (None, None))
+        if source is questions:
+            return key  # Хранилище вернуло тот же закэшированный список
+        answers = tuple(question.answer for question in questions)
+        if key is None or key.answers != answers:
+            key = AnswerKey(answers)
+        self._keys[test_name] = (questions, key)
+        return key
@@ -0,0 +1,112 @@
+"""Модели списков тестов и курсов для окна Qt.
+
+ListModel хранит строки списка и при обновлении не пересоздает его, а
+сравнивает новое содержимое со старым: общее начало и общий конец
+остаются на месте, удаляются и вставляются только строки между ними.
+Файлы данных обычно только дописываются, поэтому обновление списка из
+тысяч тестов сводится к вставке нескольких строк в конец, а выделение и
+прокрутка сохраняются. Строки, пришедшие от FileWatcher, добавляются
+в конец (add_items) без сравнения со всем списком.
+
+Поиск по списку - через QSortFilterProxyModel (search_proxy), которая
+фильтрует строки по мере ввода без изменения самой модели.
+"""
+from PyQt5.QtCore import QAbstractListModel, QModelIndex, QSortFilterProxyModel, Qt
+from PyQt5.QtWidgets import QLineEdit
+
+
+class ListModel(QAbstractListModel):
+    """Список строк, обновляемый по разнице со старым содержимым"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._items = []
+        self._message = False  # Вместо данных показано сообщение
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._items)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and index.isValid():
+            return self._items[index.row()]
+        return None
+
+    def flags(self, index):
+        if self._message:
+            return Qt.ItemIsEnabled  # Сообщение нельзя выбрать
+        return super().flags(index)
+
+    @property
+    def has_message(self):
+        return self._message
+
+    def items(self):
+        return [] if self._message else list(self._items)
+
+    def set_message(self, message):
+        """Показывает одно сообщение вместо данных (ошибка, пустой список)"""
+        self.beginResetModel()
+        self._items = [message]
+        self._message = True
+        self.endResetModel()
+
+    def set_items(self, items):
+        items = list(items)
+        if self._message:
+            self.beginResetModel()
+            self._items = items
+            self._message = False
+            self.endResetModel()
+            return
+
+        old = self._items
+        limit = min(len(old), len(items))
+        if old[:limit] == items[:limit]:
+            start = limit  # Список только дописан или укорочен с конца
+        else:
+            start = 0
+            while old[start] == items[start]:
+                start += 1
+        old_end, new_end = len(old), len(items)
+        while old_end > start and new_end > start and old[old_end - 1] == items[new_end - 1]:
+            old_end -= 1
+            new_end -= 1
+
+        if old_end > start:
+            self.beginRemoveRows(QModelIndex(), start, old_end - 1)
+            del self._items[start:old_end]
+            self.endRemoveRows()
+        if new_end > start:
+            self.beginInsertRows(QModelIndex(), start, new_end - 1)
+            self._items[start:start] = items[start:new_end]
+            self.endInsertRows()
+
+    def add_items(self, items):
+        """Дописывает в конец строки, которых еще нет в списке"""
+        present = set(self.items())
+        new = [item for item in dict.fromkeys(items) if item not in present]
+        if not new:
+            return
+        if self._message:
+            self.set_items(new)
+            return
+        self.beginInsertRows(QModelIndex(), len(self._items), len(self._items) + len(new) - 1)
+        self._items.extend(new)
+        self.endInsertRows()
+
+
+def search_proxy(model, parent=None):
+    """Фильтр строк модели по подстроке без учета регистра"""
+    proxy = QSortFilterProxyModel(parent)
+    proxy.setSourceModel(model)
+    proxy.setFilterCaseSensitivity(Qt.CaseInsensitive)
+    return proxy
+
+
+def search_field(proxy, placeholder="Поиск"):
+    """Поле ввода, которое фильтрует список по мере набора"""
+    field = QLineEdit()
+    field.setPlaceholderText(placeholder)
+    field.setClearButtonEnabled(True)
+    field.textChanged.connect(proxy.setFilterFixedString)
+    return field
@@ -0,0 +1,228 @@
+"""Замеры времени операций и счетчики чтения данных.
+
+Операции окна и QuizCore оборачиваются в интервалы (span): для каждого
+имени копятся число вызовов, суммарное и наибольшее время. Счетчики (count)
+считают прочитанные строки и байты, записанные результаты и т. п.
+
+    with metrics.span("ui.display_test"):
+        ...
+
+    @metrics.timed("core.login")
+    def login(self, login, role): ...
+
+    metrics.count("rows_scanned", len(rows))
+
+Выгрузка:
+    QUIZ_METRICS=metrics.jsonl   - каждый интервал строкой JSON в файл;
+    QUIZ_METRICS_PORT=9100       - текст в формате Prometheus по GET /metrics
+                                   (у server.py - на его собственном порту);
+    QUIZ_PROFILE=cprofile        - профиль cProfile внешних интервалов в
+                                   quiz-profile.pstats (QUIZ_PROFILE_OUT);
+    QUIZ_PROFILE=tracemalloc     - выделенная память по интервалам и места
+                                   наибольших выделений в quiz-profile.txt.
+"""
+import atexit
+import contextlib
+import functools
+import json
+import os
+import threading
+import time
+
+PROFILE_MODES = ("", "cprofile", "tracemalloc")
+
+# Сколько строк JSON копится перед записью в файл
+JSONL_BUFFER = 100
+
+# Сколько мест наибольших выделений памяти выводится в отчет tracemalloc
+TRACEMALLOC_TOP = 30
+
+PREFIX = "quiz_"
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"  # Текстовый формат Prometheus
+
+
+class SpanStats:
+    __slots__ = ("count", "total", "max", "memory")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.memory = 0  # Выделено памяти за интервалы (только с tracemalloc)
+
+
+class Metrics:
+    """Интервалы и счетчики одного процесса"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()  # Глубина вложенности интервалов в потоке
+        self.spans = {}  # имя -> SpanStats
+        self.counters = {}  # имя -> значение
+        self.jsonl_path = None
+        self.profile = ""
+        self.profile_path = None
+        self._events = []
+        self._profile_stats = None  # pstats.Stats накопленного профиля
+
+    def configure(self, jsonl_path=None, profile="", profile_path=None):
+        if profile not in PROFILE_MODES:
+            raise ValueError(f"Неизвестный режим профилирования: {profile}")
+        self.jsonl_path = jsonl_path or None
+        self.profile = profile
+        self.profile_path = profile_path or ("quiz-profile.pstats" if profile == "cprofile" else "quiz-profile.txt")
+        if profile == "tracemalloc":
+            import tracemalloc
+            tracemalloc.start()
+
+    # Сбор
+    def count(self, name, value=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    @contextlib.contextmanager
+    def span(self, name):
+        depth = getattr(self._local, "depth", 0)
+        self._local.depth = depth + 1
+        profiler = memory = None
+        if self.profile == "cprofile" and depth == 0:
+            import cProfile
+            profiler = cProfile.Profile()
+            profiler.enable()
+        elif self.profile == "tracemalloc":
+            import tracemalloc
+            memory = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self._local.depth = depth
+            if profiler is not None:
+                profiler.disable()
+            allocated = 0
+            if memory is not None:
+                import tracemalloc
+                allocated = max(0, tracemalloc.get_traced_memory()[0] - memory)
+            self._record(name, elapsed, allocated, profiler)
+
+    def timed(self, name):
+        """Декоратор: каждый вызов функции - интервал name"""
+        def decorate(function):
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                with self.span(name):
+                    return function(*args, **kwargs)
+            return wrapper
+        return decorate
+
+    def _record(self, name, elapsed, allocated, profiler):
+        with self._lock:
+            stats = self.spans.get(name)
+            if stats is None:
+                stats = self.spans[name] = SpanStats()
+            stats.count += 1
+            stats.total += elapsed
+            stats.max = max(stats.max, elapsed)
+            stats.memory += allocated
+            if profiler is not None:
+                import pstats
+                if self._profile_stats is None:
+                    self._profile_stats = pstats.Stats(profiler)
+                else:
+                    self._profile_stats.add(profiler)
+            if self.jsonl_path:
+                event = {"time": round(time.time(), 3), "span": name, "seconds": round(elapsed, 6),
+                         "thread": threading.current_thread().name}
+                if self.profile == "tracemalloc":
+                    event["allocated"] = allocated
+                self._events.append(json.dumps(event, ensure_ascii=False))
+                if len(self._events) >= JSONL_BUFFER:
+                    self._flush_events()
+
+    def _flush_events(self):
+        if not self._events:
+            return
+        with open(self.jsonl_path, "a", encoding="utf-8") as file:
+            file.write("\n".join(self._events) + "\n")
+        self._events = []
+
+    # Выгрузка
+    def snapshot(self):
+        """Накопленные значения: {"spans": {...}, "counters": {...}}"""
+        with self._lock:
+            return {
+                "spans": {name: {"count": stats.count, "total": stats.total, "max": stats.max,
+                                 "memory": stats.memory} for name, stats in self.spans.items()},
+                "counters": dict(self.counters),
+            }
+
+    def prometheus_text(self):
+        """Значения в текстовом формате Prometheus"""
+        data = self.snapshot()
+        lines = [f"# TYPE {PREFIX}span_seconds summary"]
+        for name, stats in sorted(data["spans"].items()):
+            label = json.dumps(name, ensure_ascii=False)
+            lines.append(f"{PREFIX}span_seconds_count{{span={label}}} {stats['count']}")
+            lines.append(f"{PREFIX}span_seconds_sum{{span={label}}} {stats['total']:.6f}")
+        lines.append(f"# TYPE {PREFIX}span_seconds_max gauge")
+        for name, stats in sorted(data["spans"].items()):
+            lines.append(f"{PREFIX}span_seconds_max{{span={json.dumps(name, ensure_ascii=False)}}} {stats['max']:.6f}")
+        for name, value in sorted(data["counters"].items()):
+            lines.append(f"# TYPE {PREFIX}{name}_total counter")
+            lines.append(f"{PREFIX}{name}_total {value}")
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port, host="127.0.0.1"):
+        """Отдает /metrics по HTTP из фонового потока; возвращает сервер"""
+        import http.server  # Нужен только с QUIZ_METRICS_PORT, а импортируется долго
+        registry = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path != "/metrics":
+                    self.send_error(404)
+                    return
+                data = registry.prometheus_text().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass  # Запросы не выводятся в консоль
+
+        server = http.server.ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+        return server
+
+    def close(self):
+        """Дописывает буфер JSON Lines и сохраняет профиль"""
+        with self._lock:
+            if self.jsonl_path:
+                self._flush_events()
+            if self.profile == "cprofile" and self._profile_stats is not None:
+                self._profile_stats.dump_stats(self.profile_path)
+            elif self.profile == "tracemalloc":
+                import tracemalloc
+                if tracemalloc.is_tracing():
+                    top = tracemalloc.take_snapshot().statistics("lineno")[:TRACEMALLOC_TOP]
+                    with open(self.profile_path, "w", encoding="utf-8") as file:
+                        for name, stats in sorted(self.spans.items()):
+                            file.write(f"{name}: {stats.count} раз, выделено {stats.memory} байт\n")
+                        file.write("\n")
+                        file.writelines(f"{stat}\n" for stat in top)
+
+
+# Общий набор замеров процесса; настраивается переменными окружения
+metrics = Metrics()
+metrics.configure(os.environ.get("QUIZ_METRICS", ""), os.environ.get("QUIZ_PROFILE", ""),
+                  os.environ.get("QUIZ_PROFILE_OUT", ""))
+atexit.register(metrics.close)
+
+span = metrics.span
+timed = metrics.timed
+count = metrics.count
+prometheus_text = metrics.prometheus_text
+serve = metrics.serve
@@ -0,0 +1,155 @@
+"""Поиск строк CSV по первому столбцу в отображенном в память файле.
+
+Файл не читается через текстовый ввод-вывод: он отображается в память
+(mmap), а границы строк и ключ первого столбца ищутся прямо в байтах
+методами find. Для строк с другим ключом не создается ни строк, ни списков
+Python; декодируются и разбираются только совпавшие строки.
+
+Поле в кавычках может содержать перевод строки. Совпадение считается
+началом строки, только если до него четное число кавычек; кавычки в файлах
+редки, поэтому их подсчет тоже идет через find. Ключ ищется в том виде, в
+каком его записывает csv.writer (файлы данных пишет только приложение).
+"""
+import contextlib
+import csv
+import io
+import mmap
+
+QUOTE = ord('"')
+FIELD_ENDS = (ord(","), ord("\r"), ord("\n"))
+
+
+@contextlib.contextmanager
+def mapped(path):
+    """Содержимое файла только для чтения; пустой файл - пустые байты"""
+    with open(path, "rb") as file:
+        try:
+            buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # Пустой файл отобразить нельзя
+            yield b""
+            return
+        try:
+            yield buffer
+        finally:
+            buffer.close()
+
+
+def parse_raw_row(raw):
+    """Разбор одной строки CSV из байтов"""
+    return next(csv.reader(io.StringIO(raw.decode("utf-8"))), [])
+
+
+def encode_field(value):
+    """Байты поля в том виде, в каком его пишет csv.writer"""
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow([value, ""])
+    return buffer.getvalue()[:-len(",\r\n")].encode("utf-8")
+
+
+def row_end(buffer, pos):
+    """Смещение перевода строки, которым заканчивается строка, или длина файла"""
+    size = len(buffer)
+    inside = False  # Внутри поля в кавычках
+    while True:
+        newline = buffer.find(b"\n", pos)
+        if newline < 0:
+            newline = size
+        quote = buffer.find(b'"', pos, newline)
+        while quote >= 0:
+            inside = not inside
+            quote = buffer.find(b'"', quote + 1, newline)
+        if not inside or newline >= size:
+            return newline
+        pos = newline + 1
+
+
+def row_length(buffer, start, end):
+    """Длина строки без перевода строки"""
+    while end > start and buffer[end - 1] in (13, 10):
+        end -= 1
+    return end - start
+
+
+def first_field(buffer, offset, length):
+    """Значение первого столбца строки"""
+    end = offset + length
+    if buffer[offset] != QUOTE:
+        comma = buffer.find(b",", offset, end)
+        return buffer[offset:comma if comma >= 0 else end].decode("utf-8")
+    return parse_raw_row(buffer[offset:end])[0]
+
+
+def scan_keys(buffer, start=0):
+    """Первый столбец, смещение и длина каждой непустой строки.
+
+    Участки файла без кавычек делятся на строки целиком одной операцией;
+    строки с кавычками разбираются по одной.
+    """
+    size = len(buffer)
+    keys = []
+    while start < size:
+        quote = buffer.find(b'"', start)
+        plain_end = buffer.rfind(b"\n", start, size if quote < 0 else quote)
+        if plain_end < 0:
+            # Строка с кавычками (или последняя строка без перевода строки)
+            end = row_end(buffer, start)
+            length = row_length(buffer, start, end)
+            if length:
+                keys.append((first_field(buffer, start, length), start, length))
+            start = end + 1
+            continue
+
+        offset = start
+        for line in buffer[start:plain_end].split(b"\n"):
+            step = len(line) + 1
+            if line.endswith(b"\r"):
+                line = line[:-1]  # Иначе \r попадет в ключ строки из одного столбца
+            if line:
+                keys.append((line.split(b",", 1)[0].decode("utf-8"), offset, len(line)))
+            offset += step
+        start = plain_end + 1
+    return keys
+
+
+def find_rows(buffer, key, start=0):
+    """Строки, первый столбец которых равен key: список (смещение, длина).
+
+    start должен быть началом строки.
+    """
+    field = encode_field(key)
+    size = len(buffer)
+    matches = []
+
+    def add(offset):
+        after = offset + len(field)
+        if after < size and buffer[after] not in FIELD_ENDS:
+            return  # Ключ - только начало более длинного значения
+        end = row_end(buffer, offset)
+        matches.append((offset, row_length(buffer, offset, end)))
+
+    if buffer.find(field, start, start + len(field)) == start:
+        add(start)
+
+    needle = b"\n" + field
+    quotes = 0  # Кавычек от start до quote_pos
+    quote_pos = start
+    pos = start
+    while True:
+        hit = buffer.find(needle, pos)
+        if hit < 0:
+            break
+        quote = buffer.find(b'"', quote_pos, hit)
+        while quote >= 0:
+            quotes += 1
+            quote = buffer.find(b'"', quote + 1, hit)
+        quote_pos = hit
+        if quotes % 2 == 0:  # Иначе перевод строки внутри поля в кавычках
+            add(hit + 1)
+        pos = hit + 1
+    return matches
+
+
+def read_rows(path, key):
+    """Разобранные строки файла с ключом key в первом столбце"""
+    with mapped(path) as buffer:
+        return [parse_raw_row(buffer[offset:offset + length]) for offset, length in find_rows(buffer, key)]
@@ -0,0 +1,90 @@
+"""Прохождение теста студентом: заранее загруженные вопросы и ответы по страницам.
+
+Когда студенту показывается список тестов, вопросы тестов из него
+загружаются в фоне (QuestionPrefetch), поэтому выбранный тест открывается
+без обращения к файлам. Загруженные заранее вопросы могут устареть, если
+тест изменили, поэтому окно сверяет их в фоне с хранилищем после открытия
+теста, а QuizCore.submit не принимает ответы не на все вопросы.
+
+Вопросы показываются по страницам: окно держит виджеты только для одной
+страницы и при переходе заполняет их заново, а ответы хранятся в
+TestSession списком строк, а не ссылками на виджеты.
+"""
+import threading
+
+# Вопросов на одной странице теста
+PAGE_SIZE = 10
+
+# Для скольких первых тестов списка вопросы загружаются заранее
+PREFETCH_LIMIT = 20
+
+
+class TestSession:
+    """Вопросы одного прохождения теста и ответы на них"""
+
+    def __init__(self, test_name, questions, page_size=PAGE_SIZE):
+        self.test_name = test_name
+        self.questions = questions
+        self.answers = [""] * len(questions)
+        self.page_size = page_size
+        self.page = 0
+
+    @property
+    def page_count(self):
+        return max(1, -(-len(self.questions) // self.page_size))
+
+    def page_range(self):
+        """Номера вопросов текущей страницы"""
+        start = self.page * self.page_size
+        return range(start, min(start + self.page_size, len(self.questions)))
+
+    def go_to(self, page):
+        self.page = min(max(page, 0), self.page_count - 1)
+
+    def set_answers(self, answers):
+        """Ответы на вопросы текущей страницы по порядку"""
+        for number, answer in zip(self.page_range(), answers):
+            self.answers[number] = answer
+
+
+class QuestionPrefetch:
+    """Вопросы тестов, загруженные в фоне до выбора теста"""
+
+    def __init__(self, core, limit=PREFETCH_LIMIT):
+        self.core = core
+        self.limit = limit
+        self._lock = threading.Lock()
+        self._questions = {}  # тест -> тексты вопросов
+
+    def load(self, tests, task=None):
+        """Загружает вопросы тестов по очереди; выполняется в фоновом потоке"""
+        tests = list(tests)[:self.limit]
+        for i, test_name in enumerate(tests):
+            if task is not None:
+                task.report(i, len(tests))  # Прерывает загрузку, если она отменена
+            with self._lock:
+                if test_name in self._questions:
+                    continue
+            questions = self.core.questions(test_name)
+            with self._lock:
+                self._questions[test_name] = questions
+
+    def get(self, test_name):
+        """Загруженные вопросы теста или None"""
+        with self._lock:
+            return self._questions.get(test_name)
+
+    def put(self, test_name, questions):
+        with self._lock:
+            self._questions[test_name] = questions
+
+    def discard(self, tests):
+        """Забывает вопросы тестов, которые изменились"""
+        with self._lock:
+            for test_name in tests:
+                self._questions.pop(test_name, None)
+
+    def clear(self):
+        """Забывает загруженное: список тестов загружается заново"""
+        with self._lock:
+            self._questions = {}
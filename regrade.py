@@ -0,0 +1,218 @@
+"""Перепроверка сохраненных результатов после исправления правильных ответов.
+
+Результаты, записанные вместе с ответами студента (столбец answers в
+results.csv), заново проверяются по текущим правильным ответам из
+tests.csv (grading.AnswerKey). Файл результатов делится на диапазоны байт
+(chunked.chunk_ranges), которые перепроверяются в нескольких процессах:
+каждый читает свой диапазон пачками строк и пишет исправленные строки и
+отчет о различиях во временные файлы. Поэтому память зависит от размера
+пачки, а не от числа результатов. Неизмененные строки переносятся байт в
+байт.
+
+Затем под блокировкой results.csv части склеиваются в новый файл, который
+атомарно заменяет старый (storage.replace_file); результаты, дописанные за время
+перепроверки, переносятся в него как есть. Отчет о различиях - CSV со
+студентом, тестом, временем, прежним и новым баллом.
+
+    python regrade.py --diff regrade.csv
+    python regrade.py --test Тест1 --dry-run
+"""
+import argparse
+import concurrent.futures
+import csv
+import io
+import itertools
+import multiprocessing
+import os
+import shutil
+import tempfile
+from collections import namedtuple
+
+from chunked import CHUNKS_PER_WORKER, chunk_ranges, default_workers
+from grading import AnswerKey
+from storage import (COPY_CHUNK, ResultRepository, TestRepository, decode_answers, format_rows, open_locked,
+                     replace_file, result_row)
+
+DIFF_FIELDS = ["student", "test", "timestamp", "old_score", "new_score"]
+
+# Сколько строк результатов проверяется за раз
+BATCH_ROWS = 10000
+
+RegradeSummary = namedtuple("RegradeSummary", "checked changed")
+
+
+def load_answers(tests_path, tests=None):
+    """Правильные ответы тестов: тест -> кортеж ответов по порядку вопросов"""
+    repository = TestRepository(tests_path)
+    names = tests or repository.test_names()
+    return {name: tuple(question.answer for question in repository.questions(name)) for name in names}
+
+
+def read_batches(path, start, end):
+    """Строки диапазона байт пачками: список исходных строк в байтах"""
+    batch = []
+    with open(path, "rb") as file:
+        file.seek(start)
+        position = start
+        while position < end:
+            line = file.readline(end - position)
+            if not line:
+                break
+            position += len(line)
+            batch.append(line)
+            if len(batch) >= BATCH_ROWS:
+                yield batch
+                batch = []
+    if batch:
+        yield batch
+
+
+def regrade_batch(lines, keys, parse_row):
+    """Исправленные строки пачки (байты), строки отчета о различиях и
+    число перепроверенных результатов"""
+    results = [parse_row(row) if row else None
+               for row in csv.reader(io.StringIO(b"".join(lines).decode("utf-8"), newline=""))]
+    if len(results) != len(lines):
+        # Строка с переводом строки внутри поля: такую пачку оставляем как есть
+        return lines, [], 0
+
+    by_test = {}  # тест -> [(номер строки, ответы)]
+    for n, result in enumerate(results):
+        if result is not None and result.test in keys:
+            answers = decode_answers(result.answers)
+            if answers is not None:
+                by_test.setdefault(result.test, []).append((n, answers))
+
+    lines = list(lines)
+    diff = []
+    checked = 0
+    for test_name, submissions in by_test.items():
+        scores = keys[test_name].grade_many([answers for _, answers in submissions])
+        checked += len(submissions)
+        for (n, _), score in zip(submissions, scores):
+            result = results[n]
+            if score == result.score:
+                continue
+            ending = b"\r\n" if lines[n].endswith(b"\r\n") else b"\n" if lines[n].endswith(b"\n") else b""
+            row = result_row(result.student, result.test, score, result.timestamp, result.answers)
+            lines[n] = format_rows([row]).encode("utf-8").rstrip(b"\r\n") + ending
+            diff.append([result.student, result.test, result.timestamp,
+                         "" if result.score is None else result.score, score])
+    return lines, diff, checked
+
+
+def regrade_chunk(path, start, end, answers, out_path, diff_path):
+    """Перепроверяет диапазон файла; выполняется в процессе пула.
+
+    Возвращает (проверено строк с ответами, изменено баллов).
+    """
+    keys = {test_name: AnswerKey(test_answers) for test_name, test_answers in answers.items()}
+    parse_row = ResultRepository(path).parse_row
+    checked = changed = 0
+    with open(out_path, "wb") as out, open(diff_path, "w", encoding="utf-8", newline="") as diff_file:
+        diff_writer = csv.writer(diff_file)
+        for batch in read_batches(path, start, end):
+            lines, diff, batch_checked = regrade_batch(batch, keys, parse_row)
+            checked += batch_checked
+            out.writelines(lines)
+            diff_writer.writerows(diff)
+            changed += len(diff)
+    return checked, changed
+
+
+def file_chunks(path, start=0, end=None):
+    """Байты [start, end) файла path частями по COPY_CHUNK"""
+    with open(path, "rb") as source:
+        source.seek(start)
+        left = None if end is None else end - start
+        while left is None or left > 0:
+            chunk = source.read(COPY_CHUNK if left is None else min(COPY_CHUNK, left))
+            if not chunk:
+                break
+            yield chunk
+            if left is not None:
+                left -= len(chunk)
+
+
+def copy_into(target, path, start=0, end=None):
+    """Дописывает в открытый файл target байты [start, end) файла path"""
+    for chunk in file_chunks(path, start, end):
+        target.write(chunk)
+
+
+def regrade(results_path, tests_path, tests=None, workers=None, diff_path=None, dry_run=False, progress=None):
+    """Перепроверяет результаты и заменяет файл результатов исправленным.
+
+    progress(готово частей, всего частей) вызывается по мере готовности.
+    При dry_run файл результатов не меняется, пишется только отчет.
+    """
+    answers = load_answers(tests_path, tests)
+    end = ResultRepository(results_path).end_cursor()[0]
+    workers = workers or default_workers(end)
+    ranges = chunk_ranges(results_path, workers * CHUNKS_PER_WORKER, end) if end else []
+
+    # Временные файлы - рядом с файлом результатов
+    work_dir = tempfile.mkdtemp(prefix=".regrade-", dir=os.path.dirname(os.path.abspath(results_path)))
+    try:
+        parts = [(os.path.join(work_dir, f"{i}.csv"), os.path.join(work_dir, f"{i}.diff.csv"))
+                 for i in range(len(ranges))]
+        jobs = [(results_path, start, stop, answers, out_path, part_diff)
+                for (start, stop), (out_path, part_diff) in zip(ranges, parts)]
+        checked = changed = 0
+        if workers == 1:
+            for done, job in enumerate(jobs, 1):
+                part_checked, part_changed = regrade_chunk(*job)
+                checked += part_checked
+                changed += part_changed
+                if progress is not None:
+                    progress(done, len(jobs))
+        else:
+            context = multiprocessing.get_context("spawn")  # Как в chunked.parallel_report
+            with concurrent.futures.ProcessPoolExecutor(workers, mp_context=context) as pool:
+                futures = [pool.submit(regrade_chunk, *job) for job in jobs]
+                for done, future in enumerate(concurrent.futures.as_completed(futures), 1):
+                    part_checked, part_changed = future.result()
+                    checked += part_checked
+                    changed += part_changed
+                    if progress is not None:
+                        progress(done, len(jobs))
+
+        if diff_path:
+            with open(diff_path, "wb") as diff_file:
+                diff_file.write(format_rows([DIFF_FIELDS]).encode("utf-8"))
+                for _, part_diff in parts:
+                    copy_into(diff_file, part_diff)
+
+        if changed and not dry_run:
+            # Пока держим блокировку, новые результаты не дописываются;
+            # дописанные во время перепроверки переносим как есть
+            fd = open_locked(results_path)
+            try:
+                chunks = itertools.chain.from_iterable(file_chunks(out_path) for out_path, _ in parts)
+                replace_file(results_path, itertools.chain(chunks, file_chunks(results_path, end)))
+            finally:
+                os.close(fd)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return RegradeSummary(checked, changed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Перепроверка результатов по исправленным ответам")
+    parser.add_argument("--test", action="append", default=[], help="Только этот тест (можно несколько раз)")
+    parser.add_argument("--diff", default="regrade.diff.csv", help="Файл отчета об измененных баллах")
+    parser.add_argument("--dry-run", action="store_true", help="Только отчет, без изменения результатов")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Число процессов; по умолчанию по числу ядер и размеру файла")
+    parser.add_argument("--data-dir", default=".", help="Каталог с CSV-файлами")
+    args = parser.parse_args()
+
+    summary = regrade(os.path.join(args.data_dir, "results.csv"), os.path.join(args.data_dir, "tests.csv"),
+                      args.test or None, args.workers, args.diff, args.dry_run)
+    print(f"Проверено результатов с ответами: {summary.checked}, изменено баллов: {summary.changed}")
+    if summary.changed:
+        print(f"Различия: {args.diff}" + (" (результаты не изменены)" if args.dry_run else ""))
+
+
+if __name__ == "__main__":
+    main()
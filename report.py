@@ -0,0 +1,241 @@
+"""Отчеты по результатам тестов из командной строки.
+
+Результаты читаются по одной строке и сразу учитываются, поэтому память
+зависит только от числа групп в отчете, а не от размера истории. Фильтры:
+период, курс, тест, студент. Группировка - по любому сочетанию полей
+student, test, course, day, month; для каждой группы считаются количество
+попыток, сумма, средний, минимальный и максимальный балл и время последней
+попытки. Частичные отчеты по разным частям файла складываются методом
+Report.merge, так что части можно считать параллельно.
+
+    python report.py --group-by course,test --since 2025-01-01 --format json
+    python report.py --student student1 --rows --out student1.csv
+    python report.py --group-by test --workers 8
+
+Для CSV-файлов отчет считается в нескольких процессах (chunked.py);
+--workers 1 считает в одном процессе.
+
+Вывод пишется построчно в файл или на стандартный вывод.
+"""
+import argparse
+import csv
+import json
+import operator
+import os
+import sys
+
+from stats import Aggregate
+from storage import open_storage
+
+GROUP_FIELDS = ("student", "test", "course", "day", "month")
+AGGREGATE_FIELDS = ["count", "total", "mean", "min", "max", "last"]
+ROW_FIELDS = ["student", "test", "score", "timestamp", "answers"]
+NO_COURSE = ""  # Группа для студентов, не закрепленных ни за одним курсом
+
+# Значение поля группировки из результата (кроме курса, у которого значений может быть несколько)
+FIELD_VALUES = {
+    "student": operator.attrgetter("student"),
+    "test": operator.attrgetter("test"),
+    "day": lambda result: result.timestamp[:10],
+    "month": lambda result: result.timestamp[:7],
+}
+
+
+class Filters:
+    """Условия отбора результатов; пустое условие пропускает все"""
+
+    def __init__(self, since="", until="", students=(), tests=(), course_students=None):
+        self.since = since
+        self.until = until
+        self.students = set(students)
+        self.tests = set(tests)
+        self.course_students = course_students  # Студенты выбранного курса или None
+
+    def match(self, result):
+        # Время в формате "ГГГГ-ММ-ДД ЧЧ:ММ:СС" сравнивается как строка;
+        # until - последний включаемый день
+        if self.since and result.timestamp[:len(self.since)] < self.since:
+            return False
+        if self.until and result.timestamp[:len(self.until)] > self.until:
+            return False
+        if self.students and result.student not in self.students:
+            return False
+        if self.tests and result.test not in self.tests:
+            return False
+        if self.course_students is not None and result.student not in self.course_students:
+            return False
+        return True
+
+
+class Report:
+    """Агрегаты результатов по группам"""
+
+    def __init__(self, group_by, student_courses=None):
+        self.group_by = list(group_by)
+        self.student_courses = student_courses or {}  # студент -> курсы
+        self.groups = {}  # ключ группы -> Aggregate
+        self.skipped = 0  # Строки без корректного балла
+        self._key = None  # Ключ единственной группы результата, если курс не участвует
+        if "course" not in self.group_by:
+            if set(self.group_by) <= {"student", "test"} and len(self.group_by) > 1:
+                self._key = operator.attrgetter(*self.group_by)  # Сразу кортеж
+            else:
+                values = [FIELD_VALUES[field] for field in self.group_by]
+                self._key = lambda result: tuple(value(result) for value in values)
+
+    def __getstate__(self):
+        # Функция ключа не сериализуется; она строится заново по group_by
+        return self.group_by, self.student_courses, self.groups, self.skipped
+
+    def __setstate__(self, state):
+        group_by, student_courses, groups, skipped = state
+        self.__init__(group_by, student_courses)
+        self.groups = groups
+        self.skipped = skipped
+
+    def keys(self, result):
+        """Ключи групп результата; студент нескольких курсов попадает в каждый"""
+        keys = [()]
+        for field in self.group_by:
+            if field == "course":
+                values = self.student_courses.get(result.student) or [NO_COURSE]
+            else:
+                values = [FIELD_VALUES[field](result)]
+            keys = [key + (value,) for key in keys for value in values]
+        return keys
+
+    def add(self, result):
+        if result.score is None:
+            self.skipped += 1
+            return
+        for key in (self._key(result),) if self._key is not None else self.keys(result):
+            aggregate = self.groups.get(key)
+            if aggregate is None:
+                aggregate = self.groups[key] = Aggregate()
+            aggregate.add(result.score, result.timestamp)
+
+    def merge(self, other):
+        """Добавляет частичный отчет по другой части результатов"""
+        for key, aggregate in other.groups.items():
+            if key in self.groups:
+                self.groups[key].merge(aggregate)
+            else:
+                self.groups[key] = aggregate
+        self.skipped += other.skipped
+
+    def rows(self):
+        for key in sorted(self.groups):
+            aggregate = self.groups[key]
+            yield list(key) + [aggregate.count, aggregate.total, round(aggregate.mean, 2),
+                               aggregate.min, aggregate.max, aggregate.last]
+
+
+def student_courses(storage, course_names=None):
+    """Курсы каждого студента: студент -> список курсов"""
+    courses = {}
+    for course_name in course_names or storage.course_names():
+        for student in storage.course_students(course_name):
+            courses.setdefault(student, []).append(course_name)
+    return courses
+
+
+def build_report(results, filters, report):
+    for result in results:
+        if filters.match(result):
+            report.add(result)
+    return report
+
+
+class CsvOutput:
+    def __init__(self, file, fields):
+        self.writer = csv.writer(file)
+        self.writer.writerow(fields)
+
+    def write(self, row):
+        self.writer.writerow(row)
+
+    def close(self):
+        pass
+
+
+class JsonOutput:
+    """Массив JSON-объектов; элементы пишутся по одному по мере готовности"""
+
+    def __init__(self, file, fields):
+        self.file = file
+        self.fields = fields
+        self.first = True
+        file.write("[")
+
+    def write(self, row):
+        self.file.write("\n" if self.first else ",\n")
+        self.file.write(json.dumps(dict(zip(self.fields, row)), ensure_ascii=False))
+        self.first = False
+
+    def close(self):
+        self.file.write("\n]\n")
+
+
+OUTPUTS = {"csv": CsvOutput, "json": JsonOutput}
+
+
+def parse_list(value):
+    return [item.strip() for item in value.split(",") if item.strip()] if value else []
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Отчеты по результатам тестов")
+    parser.add_argument("--since", default="", help="Начало периода: ГГГГ-ММ-ДД")
+    parser.add_argument("--until", default="", help="Конец периода включительно: ГГГГ-ММ-ДД")
+    parser.add_argument("--course", default=None, help="Только студенты курса")
+    parser.add_argument("--test", action="append", default=[], help="Тест (можно несколько раз)")
+    parser.add_argument("--student", action="append", default=[], help="Студент (можно несколько раз)")
+    parser.add_argument("--group-by", default="student",
+                        help=f"Поля группировки через запятую: {', '.join(GROUP_FIELDS)}")
+    parser.add_argument("--rows", action="store_true", help="Выгрузить отобранные строки без группировки")
+    parser.add_argument("--format", default="csv", choices=sorted(OUTPUTS))
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Число процессов; по умолчанию по числу ядер и размеру файла")
+    parser.add_argument("--out", default=None, help="Файл отчета; по умолчанию стандартный вывод")
+    parser.add_argument("--data-dir", default=".", help="Каталог с CSV-файлами")
+    parser.add_argument("--db", default=os.environ.get("QUIZ_DB", ""), help="База SQLite вместо CSV")
+    args = parser.parse_args()
+
+    group_by = parse_list(args.group_by)
+    unknown = [field for field in group_by if field not in GROUP_FIELDS]
+    if unknown:
+        parser.error(f"Неизвестные поля группировки: {', '.join(unknown)}")
+
+    storage = open_storage(args.data_dir, args.db)
+    course_students = set(storage.course_students(args.course)) if args.course else None
+    filters = Filters(args.since, args.until, args.student, args.test, course_students)
+
+    out = open(args.out, "w", encoding="utf-8", newline="") if args.out else sys.stdout
+    try:
+        if args.rows:
+            output = OUTPUTS[args.format](out, ROW_FIELDS)
+            for result in storage.iter_results():
+                if filters.match(result):
+                    output.write(["" if value is None else value for value in result])
+        else:
+            # С фильтром по курсу группы по курсам строятся только для него
+            courses = student_courses(storage, [args.course] if args.course else None)
+            report = Report(group_by, courses)
+            if hasattr(storage, "aggregate_results"):
+                storage.aggregate_results(report, filters, args.workers)
+            else:
+                build_report(storage.iter_results(), filters, report)
+            output = OUTPUTS[args.format](out, group_by + AGGREGATE_FIELDS)
+            for row in report.rows():
+                output.write(row)
+            if report.skipped:
+                print(f"Пропущено строк без корректного балла: {report.skipped}", file=sys.stderr)
+        output.close()
+    finally:
+        if out is not sys.stdout:
+            out.close()
+        storage.close()
+
+
+if __name__ == "__main__":
+    main()
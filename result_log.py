@@ -0,0 +1,477 @@
+"""Двоичный журнал результатов тестов - альтернатива results.csv.
+
+Каждый результат - запись фиксированной длины (struct): номер студента,
+номер теста, баллы и время прохождения в секундах от 1970-01-01. Логины и
+названия тестов хранятся один раз в словаре рядом с журналом
+(results.bin.names, по одному имени в строке CSV; номер имени - номер
+строки). Поэтому запись дописывается за O(1), N-я запись читается одним
+seek, а чтение журнала не разбирает текст:
+
+    log = ResultLog("results.bin")
+    log.add_result("student1", "Тест1", 3, "2025-03-21 15:49:20")
+    log[0], len(log)
+
+Время хранится без часового пояса, в том же виде, в каком его пишет
+QuizCore.submit; значение в другом формате при переводе из CSV теряется.
+Ответы студентов (столбец answers) в журнале не хранятся, поэтому
+перепроверка (regrade.py) работает только с results.csv, а файл с
+ответами переводится в журнал только с --drop-answers.
+Журнал подключается вместо results.csv, если у файла результатов
+расширение .bin (см. CsvStorage). Перевод из CSV и обратно:
+
+    python result_log.py to-bin results.csv results.bin [--drop-answers]
+    python result_log.py to-csv results.bin results.csv
+"""
+import argparse
+import csv
+import datetime
+import gc
+import io
+import os
+import struct
+import sys
+import zlib
+
+import metrics
+from report import Report, build_report
+from stats import Aggregate
+from storage import (HEAD_SIZE, Result, ResultRepository, file_stamp, format_rows, lock_file, open_locked,
+                     result_row, write_logged)
+
+MAGIC = b"QZRL\x01\x00\x00\x00"  # Сигнатура и версия формата
+RECORD = struct.Struct("<IIiq")  # студент, тест, баллы, время
+NO_SCORE = -2 ** 31  # Некорректные баллы
+NO_TIME = -2 ** 63  # Время не записано
+
+# Номер поля записи для группировки отчета
+FIELD_POSITIONS = {"student": 0, "test": 1}
+
+# Сколько записей читается за одну операцию при последовательном чтении
+READ_RECORDS = 64 * 1024
+
+EPOCH_ORDINAL = datetime.date(1970, 1, 1).toordinal()
+
+
+# Время суток собирается из готовых частей: " ЧЧ:ММ" и ":СС"
+CLOCK_MINUTES = [f" {minute // 60:02d}:{minute % 60:02d}" for minute in range(24 * 60)]
+CLOCK_SECONDS = [f":{second:02d}" for second in range(60)]
+
+_day_seconds = {}  # "ГГГГ-ММ-ДД" -> секунды начала дня
+_day_texts = {}  # дней от 1970-01-01 -> "ГГГГ-ММ-ДД"
+
+
+def to_epoch(timestamp):
+    """Время "ГГГГ-ММ-ДД ЧЧ:ММ:СС" в секундах; пустое - NO_TIME, другой формат - None"""
+    if not timestamp:
+        return NO_TIME
+    try:
+        if len(timestamp) != 19 or timestamp[10] != " " or timestamp[13] != ":" or timestamp[16] != ":":
+            raise ValueError(timestamp)
+        hours, minutes, seconds = int(timestamp[11:13]), int(timestamp[14:16]), int(timestamp[17:19])
+        if hours > 23 or minutes > 59 or seconds > 59:
+            raise ValueError(timestamp)
+        day = timestamp[:10]
+        start = _day_seconds.get(day)
+        if start is None:
+            date = datetime.datetime.strptime(day, "%Y-%m-%d").date()
+            start = _day_seconds[day] = (date.toordinal() - EPOCH_ORDINAL) * 86400
+        return start + hours * 3600 + minutes * 60 + seconds
+    except ValueError:
+        return None
+
+
+def from_epoch(seconds):
+    if seconds == NO_TIME:
+        return ""
+    days, seconds = divmod(seconds, 86400)
+    day = _day_texts.get(days)
+    if day is None:
+        day = _day_texts[days] = datetime.date.fromordinal(EPOCH_ORDINAL + days).isoformat()
+    return day + CLOCK_MINUTES[seconds // 60] + CLOCK_SECONDS[seconds % 60]
+
+
+class NameTable:
+    """Словарь имен: имя <-> номер; файл только дописывается"""
+
+    def __init__(self, path):
+        self.path = path
+        self._reset()
+
+    def _reset(self):
+        self.names = []
+        self._ids = {}
+        self._pos = 0  # Сколько байт файла уже прочитано
+
+    def _read_tail(self, file):
+        file.seek(0, os.SEEK_END)
+        size = file.tell()
+        if size < self._pos:
+            self._reset()  # Словарь переписан
+        file.seek(self._pos)
+        data = file.read(size - self._pos)
+        data = data[:data.rfind(b"\n") + 1]  # Неполная строка будет дочитана позже
+        self._pos += len(data)
+        for row in csv.reader(io.StringIO(data.decode("utf-8"), newline="")):
+            name = row[0] if row else ""
+            # Одно имя могли дописать два процесса: оба номера означают его,
+            # а новым записям достается первый
+            self._ids.setdefault(name, len(self.names))
+            self.names.append(name)
+
+    def refresh(self):
+        try:
+            with open(self.path, "rb") as file:
+                self._read_tail(file)
+        except FileNotFoundError:
+            self._reset()
+
+    def intern(self, names, fsync=False):
+        """Номера имен; новые имена дописываются в файл под блокировкой"""
+        missing = [name for name in dict.fromkeys(names) if name not in self._ids]
+        if missing:
+            fd = os.open(self.path, os.O_RDWR | os.O_APPEND | os.O_CREAT | getattr(os, "O_BINARY", 0), 0o666)
+            with os.fdopen(fd, "r+b", buffering=0) as file:
+                lock_file(fd)
+                self._read_tail(file)  # Имена могли добавить другие процессы
+                missing = [name for name in missing if name not in self._ids]
+                if missing:
+                    data = format_rows([name] for name in missing).encode("utf-8")
+                    size = file.tell()
+                    if self._pos < size:
+                        data = b"\r\n" + data  # Последняя строка файла не закончена
+                    write_logged(fd, self.path, size, data, fsync)
+                    self._read_tail(file)
+        return [self._ids[name] for name in names]
+
+
+class ResultLog:
+    """Журнал результатов с тем же интерфейсом, что у ResultRepository"""
+
+    def __init__(self, path, names_path=None):
+        self.path = path
+        self.names = NameTable(names_path or path + ".names")
+        self._clear()
+
+    def _clear(self):
+        self._stamp = None
+        self._cursor = None  # Позиция, до которой прочитан кэш
+        self._records = []
+        self._by_student = {}
+
+    def _index(self, record):
+        self._records.append(record)
+        self._by_student.setdefault(record.student, []).append(record)
+
+    def invalidate(self):
+        self._stamp = None
+
+    def decode(self, records):
+        """Результаты из распакованных записей"""
+        names = self.names.names
+        for student, test, score, timestamp in records:
+            if student >= len(names) or test >= len(names):
+                self.names.refresh()  # Имена дописал другой процесс
+                names = self.names.names
+            yield Result(names[student], names[test], None if score == NO_SCORE else score,
+                         from_epoch(timestamp))
+
+    def encode(self, rows, fsync=False):
+        """Двоичные записи строк (студент, тест, баллы, время)"""
+        rows = [[str(value) for value in row] + [""] * (2 - len(row)) for row in rows]
+        # Имена записываются в словарь раньше, чем записи, которые на них ссылаются
+        ids = self.names.intern([name for row in rows for name in row[:2]], fsync)
+        data = bytearray()
+        for i, row in enumerate(rows):
+            try:
+                score = int(row[2])
+            except (ValueError, IndexError):
+                score = NO_SCORE
+            timestamp = to_epoch(row[3] if len(row) > 3 else "")
+            data += RECORD.pack(ids[2 * i], ids[2 * i + 1], score, NO_TIME if timestamp is None else timestamp)
+        return bytes(data)
+
+    # Доступ по номеру
+    def __len__(self):
+        stamp = file_stamp(self.path)
+        return 0 if stamp is None else max(0, (stamp[1] - len(MAGIC)) // RECORD.size)
+
+    def __getitem__(self, n):
+        if n < 0:
+            n += len(self)
+        if n < 0:
+            raise IndexError(n)
+        with open(self.path, "rb") as file:
+            file.seek(len(MAGIC) + n * RECORD.size)
+            data = file.read(RECORD.size)
+        if len(data) < RECORD.size:
+            raise IndexError(n)
+        return next(self.decode([RECORD.unpack(data)]))
+
+    # Запись
+    def append(self, rows, fsync=False):
+        """Дописывает результаты одной операцией записи под блокировкой файла"""
+        data = self.encode(rows, fsync)
+        fd = open_locked(self.path)
+        try:
+            size = os.fstat(fd).st_size
+            start = size if size >= len(MAGIC) else 0
+            # Оборванная при сбое запись в конце файла отбрасывается
+            start -= (start - len(MAGIC)) % RECORD.size if start else 0
+            if start != size:
+                os.ftruncate(fd, start)
+            if start == 0:
+                data = MAGIC + data
+            write_logged(fd, self.path, start, data, fsync)
+        finally:
+            os.close(fd)
+        self._stamp = None  # Кэш дочитается при следующем обращении
+
+    def add_result(self, student, test_name, score, timestamp, answers=""):
+        # Ответы в записи фиксированной длины не хранятся
+        self.append([[student, test_name, score, timestamp]])
+
+    # Чтение
+    def _check(self, file):
+        if file.read(len(MAGIC)) not in (MAGIC, b""):
+            raise ValueError(f"{self.path} не является журналом результатов")
+
+    def _read(self, file, offset, end):
+        """Записи из диапазона байт [offset, end) по порядку"""
+        file.seek(offset)
+        while offset < end:
+            data = file.read(min(end - offset, READ_RECORDS * RECORD.size))
+            if not data:
+                break
+            offset += len(data)
+            metrics.count("bytes_read", len(data))
+            metrics.count("rows_scanned", len(data) // RECORD.size)
+            yield from RECORD.iter_unpack(data)
+
+    def stream(self, end=None):
+        """Результаты по одному в порядке записи до смещения end"""
+        with open(self.path, "rb") as file:
+            self._check(file)
+            if end is None:
+                end = self.end_cursor()[0]
+            self.names.refresh()
+            yield from self.decode(self._read(file, len(MAGIC), end))
+
+    def read_since(self, cursor):
+        """Результаты после позиции cursor; позиция как у ResultRepository.read_since"""
+        offset, head = cursor or (0, 0)
+        restarted = False
+        with open(self.path, "rb") as file:
+            self._check(file)
+            size = os.fstat(file.fileno()).st_size
+            file.seek(0)
+            if size < offset or zlib.crc32(file.read(min(offset, HEAD_SIZE))) != head:
+                offset = 0
+                restarted = True
+            end = self._aligned(size)
+            self.names.refresh()
+            results = list(self.decode(self._read(file, max(offset, len(MAGIC)), end)))
+            file.seek(0)
+            head = zlib.crc32(file.read(min(end, HEAD_SIZE)))
+        return results, [max(offset, end), head], restarted
+
+    def _aligned(self, size):
+        """Конец последней полной записи"""
+        if size < len(MAGIC):
+            return 0
+        return size - (size - len(MAGIC)) % RECORD.size
+
+    def end_cursor(self):
+        with open(self.path, "rb") as file:
+            end = self._aligned(os.fstat(file.fileno()).st_size)
+            head = zlib.crc32(file.read(min(end, HEAD_SIZE)))
+        return [end, head]
+
+    def _refresh(self):
+        """Кэш дочитывается с места, где остановился, если файл только дописывали"""
+        stamp = file_stamp(self.path)
+        if stamp is None:
+            self._clear()
+            raise FileNotFoundError(self.path)
+        if stamp == self._stamp:
+            return
+        results, cursor, restarted = self.read_since(self._cursor)
+        if restarted:
+            self._records = []
+            self._by_student = {}
+        for result in results:
+            self._index(result)
+        self._cursor = cursor
+        self._stamp = stamp
+
+    def aggregate(self, report, filters, end=None):
+        """Учитывает в отчете report результаты до смещения end.
+
+        Группы по студенту и тесту считаются прямо по номерам имен
+        групповыми операциями NumPy (columnar.py), без расшифровки записей;
+        остальные отчеты и фильтры по времени - по расшифрованным
+        результатам (report.build_report).
+        """
+        if end is None:
+            end = self.end_cursor()[0]
+        positions = [FIELD_POSITIONS.get(field) for field in report.group_by]
+        if None in positions or filters.since or filters.until:
+            return build_report(self.stream(end), filters, report)
+
+        import numpy as np
+        from columnar import group_reduce, read_log
+
+        with open(self.path, "rb") as file:
+            self._check(file)
+        self.names.refresh()
+        names = self.names.names
+        base = max(len(names), 1)  # Имена пишутся в словарь раньше записей до end
+        records = read_log(self.path, end)
+        metrics.count("bytes_read", records.nbytes)
+        metrics.count("rows_scanned", len(records))
+
+        def ids(allowed):
+            return np.array([i for i, name in enumerate(names) if name in allowed], dtype=np.uint32)
+
+        mask = np.ones(len(records), dtype=bool)
+        if filters.students:
+            mask &= np.isin(records["student"], ids(filters.students))
+        if filters.course_students is not None:
+            mask &= np.isin(records["student"], ids(filters.course_students))
+        if filters.tests:
+            mask &= np.isin(records["test"], ids(filters.tests))
+        valid = records["score"] != NO_SCORE
+        skipped = int(np.count_nonzero(mask & ~valid))
+        records = records[mask & valid]
+
+        # Ключ группы - номера имен полей группировки, сведенные в одно число
+        fields = [("student", "test")[position] for position in positions]
+        codes = np.zeros(len(records), dtype=np.int64)
+        for field in fields:
+            codes = codes * base + records[field]
+        keys, codes = np.unique(codes, return_inverse=True)
+        stats = group_reduce(codes.ravel(), keys, records["score"].astype(np.int64),
+                             records["time"].view("datetime64[s]"))
+
+        # Номера имен и время последней попытки переводятся в текст целыми столбцами
+        columns = []
+        for j in range(len(fields)):
+            numbers = stats.keys // base ** (len(fields) - 1 - j) % base
+            columns.append([names[i] for i in numbers.tolist()])
+        name_keys = list(zip(*columns)) if columns else [()] * len(stats.keys)
+        last = ["" if text == "NaT" else text.replace("T", " ")
+                for text in np.datetime_as_string(stats.last, unit="s").tolist()]
+
+        partial = Report(report.group_by)
+        partial.skipped = skipped
+        # Сотни тысяч групп - сотни тысяч объектов: сборщик мусора на это время отключается
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            aggregates = list(map(Aggregate, stats.count.tolist(), stats.total.tolist(), stats.min.tolist(),
+                                  stats.max.tolist(), last))
+            if len(set(names)) == len(names):
+                partial.groups = dict(zip(name_keys, aggregates))
+            else:
+                for name_key, aggregate in zip(name_keys, aggregates):
+                    if name_key in partial.groups:
+                        partial.groups[name_key].merge(aggregate)  # Одно имя под двумя номерами
+                    else:
+                        partial.groups[name_key] = aggregate
+            report.merge(partial)
+        finally:
+            if gc_enabled:
+                gc.enable()
+        return report
+
+    def records(self):
+        self._refresh()
+        return self._records
+
+    def for_student(self, student):
+        if self._stamp is None or file_stamp(self.path) != self._stamp:
+            # Кэш не загружен или устарел: сравниваем только номера студента,
+            # не расшифровывая чужие записи
+            if not os.path.exists(self.path):
+                raise FileNotFoundError(self.path)
+            self.names.refresh()
+            ids = {i for i, name in enumerate(self.names.names) if name == student}
+            if not ids:
+                return []
+            with open(self.path, "rb") as file:
+                self._check(file)
+                end = self._aligned(os.fstat(file.fileno()).st_size)
+                return list(self.decode(record for record in self._read(file, len(MAGIC), end)
+                                        if record[0] in ids))
+        return self._by_student.get(student, [])
+
+
+def csv_to_log(csv_path, log_path, batch=READ_RECORDS, drop_answers=False):
+    """Переводит results.csv в журнал; возвращает (записей, потеряно значений времени).
+
+    Ответы в журнале не хранятся, а без них не работает перепроверка
+    (regrade.py), поэтому файл с ответами переводится только с
+    drop_answers; иначе - ValueError, и журнал не создается.
+    """
+    for path in (log_path, log_path + ".names"):
+        if os.path.exists(path):
+            os.remove(path)
+    log = ResultLog(log_path)
+    count = lost = 0
+    rows = []
+    try:
+        for result in ResultRepository(csv_path).stream():
+            if result.answers and not drop_answers:
+                raise ValueError(f"В {csv_path} есть ответы студентов, в журнале они будут потеряны")
+            if result.timestamp and to_epoch(result.timestamp) is None:
+                lost += 1
+            rows.append(["" if value is None else value for value in result[:4]])
+            if len(rows) >= batch:
+                log.append(rows)
+                count += len(rows)
+                rows = []
+        if rows or not count:
+            log.append(rows)
+            count += len(rows)
+    except ValueError:
+        for path in (log_path, log_path + ".names"):
+            if os.path.exists(path):
+                os.remove(path)
+        raise
+    return count, lost
+
+
+def log_to_csv(log_path, csv_path):
+    """Переводит журнал в CSV; возвращает число записей"""
+    count = 0
+    with open(csv_path, "w", encoding="utf-8", newline="") as file:
+        writer = csv.writer(file)
+        for result in ResultLog(log_path).stream():
+            writer.writerow(result_row(*result))
+            count += 1
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Перевод результатов между CSV и двоичным журналом")
+    parser.add_argument("direction", choices=["to-bin", "to-csv"])
+    parser.add_argument("source")
+    parser.add_argument("target")
+    parser.add_argument("--drop-answers", action="store_true",
+                        help="перевести в журнал, отбросив ответы студентов (перепроверка станет невозможна)")
+    args = parser.parse_args()
+
+    if args.direction == "to-bin":
+        try:
+            count, lost = csv_to_log(args.source, args.target, drop_answers=args.drop_answers)
+        except ValueError as e:
+            print(f"{e}; перевод отменен (--drop-answers переводит без них)")
+            sys.exit(1)
+        print(f"Записей: {count}")
+        if lost:
+            print(f"Время в другом формате не сохранено у {lost} записей")
+    else:
+        print(f"Записей: {log_to_csv(args.source, args.target)}")
+
+
+if __name__ == "__main__":
+    main()
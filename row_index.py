@@ -0,0 +1,146 @@
+"""Постоянный индекс строк CSV-файла по значению первого столбца.
+
+Индекс хранится рядом с файлом данных (например, tests.csv.idx) и содержит
+для каждой строки данных ключ, байтовое смещение и длину строки. Файлы данных
+только дописываются, поэтому индекс обновляется дочитыванием хвоста: после
+добавления строки сканируются только новые байты. Если файл данных был
+переписан (стал короче или не совпадает с индексом), индекс строится заново.
+Новые строки ищутся в отображенном в память файле (mmap_scan): из каждой
+строки декодируется только первый столбец.
+"""
+import csv
+import io
+import os
+
+from mmap_scan import mapped, parse_raw_row, scan_keys
+
+# До стольких строк rows читает их из файла без mmap
+DIRECT_READS = 16
+
+
+class RowIndex:
+    """Индекс строк файла данных: ключ -> список (смещение, длина)"""
+
+    def __init__(self, data_path, index_path=None):
+        self.data_path = data_path
+        self.index_path = index_path or data_path + ".idx"
+        self.generation = 0  # Меняется при каждой перестройке индекса
+        self._reset()
+
+    def _reset(self):
+        self.generation += 1
+        self._entries = {}
+        self._covered = 0  # До какого байта файл данных проиндексирован
+        self._last = None  # Последняя запись индекса, для проверки файла данных
+        self._index_pos = 0  # Сколько байт файла индекса уже прочитано
+        self._synced = None  # mtime и размер файла данных при последней сверке
+
+    def _add(self, key, offset, length):
+        if offset < self._covered:
+            return  # Запись уже есть (индекс дописывали два процесса)
+        self._entries.setdefault(key, []).append((offset, length))
+        self._covered = offset + length
+        self._last = (key, offset, length)
+
+    def _read_index(self):
+        """Дочитывает новые записи файла индекса"""
+        try:
+            size = os.path.getsize(self.index_path)
+        except FileNotFoundError:
+            size = 0
+        if size < self._index_pos:
+            self._reset()  # Индекс перестроил другой процесс
+        if size == self._index_pos:
+            return
+
+        with open(self.index_path, "rb") as file:
+            file.seek(self._index_pos)
+            data = file.read(size - self._index_pos)
+        # Неполная последняя строка будет дочитана в следующий раз
+        complete = data[:data.rfind(b"\n") + 1]
+        try:
+            rows = [(row[0], int(row[1]), int(row[2]))
+                    for row in csv.reader(io.StringIO(complete.decode("utf-8"))) if len(row) == 3]
+        except (csv.Error, ValueError):  # UnicodeDecodeError - тоже ValueError
+            # Испорченный индекс строится заново по файлу данных
+            self._reset()
+            with open(self.index_path, "wb"):
+                pass
+            return
+        for row in rows:
+            self._add(*row)
+        self._index_pos += len(complete)
+
+    def _valid(self, file, size):
+        """Проверяет, что файл данных не переписывали после индексации"""
+        if size < self._covered:
+            return False
+        if self._last is None:
+            return True
+        key, offset, length = self._last
+        file.seek(offset)
+        raw = file.read(length)
+        try:
+            row = parse_raw_row(raw) if raw else []
+        except UnicodeDecodeError:
+            return False  # Смещение попало в середину символа другой строки
+        return bool(row) and row[0] == key
+
+    def sync(self):
+        """Приводит индекс в соответствие с файлом данных"""
+        self._read_index()
+        st = os.stat(self.data_path)
+        if (st.st_mtime_ns, st.st_size) == self._synced:
+            return  # Файл данных не менялся с прошлой сверки
+        with open(self.data_path, "rb") as file:
+            st = os.fstat(file.fileno())
+            size = st.st_size
+            if not self._valid(file, size):
+                self._reset()
+                with open(self.index_path, "wb"):
+                    pass  # Очищаем устаревший индекс
+            if size == self._covered:
+                self._synced = (st.st_mtime_ns, size)
+                return
+
+        with mapped(self.data_path) as buffer:
+            new_rows = scan_keys(buffer, self._covered)
+        self._synced = (st.st_mtime_ns, size)
+        if not new_rows:
+            return  # В хвосте только переводы строк
+
+        buffer = io.StringIO()
+        # С "\r\n" в конце строки csv.writer берет в кавычки поле, содержащее \r
+        csv.writer(buffer, lineterminator="\r\n").writerows(new_rows)
+        data = buffer.getvalue().encode("utf-8")
+        with open(self.index_path, "ab") as file:
+            file.write(data)
+        # Свои записи читаем из файла индекса вместе с чужими, если их
+        # успел дописать другой процесс; повторы отбрасывает _add
+        self._read_index()
+
+    def keys(self):
+        """Ключи в порядке первого появления в файле"""
+        self.sync()
+        return list(self._entries)
+
+    def count(self, key):
+        self.sync()
+        return len(self._entries.get(key, ()))
+
+    def rows(self, key, start=0):
+        """Строки данных с заданным ключом, начиная с номера start"""
+        self.sync()
+        entries = self._entries.get(key, [])[start:]
+        if not entries:
+            return []
+        if len(entries) <= DIRECT_READS:
+            # Несколько строк дешевле прочитать, чем отображать файл в память
+            with open(self.data_path, "rb") as file:
+                rows = []
+                for offset, length in entries:
+                    file.seek(offset)
+                    rows.append(parse_raw_row(file.read(length)))
+                return rows
+        with mapped(self.data_path) as buffer:
+            return [parse_raw_row(buffer[offset:offset + length]) for offset, length in entries]
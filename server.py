@@ -0,0 +1,250 @@
+"""HTTP/JSON сервер операций системы тестирования.
+
+Сервер владеет файлами данных один: все операции QuizCore выполняются по
+очереди в одном рабочем потоке, а asyncio только принимает соединения и
+разбирает запросы. Поэтому сотни клиентов не читают и не пишут общие
+CSV-файлы сами, а результаты пишутся без гонок между процессами.
+
+Запуск:
+
+    python server.py --host 0.0.0.0 --port 8765 --data-dir .
+
+Протокол: POST /api/<операция> с JSON-объектом именованных аргументов.
+Ответ - {"result": ...} или {"error": "текст", "type": "класс ошибки"}:
+
+    curl -d '{"login": "student1", "role": "student", "password": "..."}' localhost:8765/api/login
+
+Все операции, кроме login, resume и get_setting, требуют токен сеанса, который вернул
+login, в заголовке "Authorization: Bearer <токен>". Сервер сам берет
+пользователя из сеанса: студент отправляет ответы и смотрит статистику
+только от своего имени, операции преподавателя студенту недоступны.
+Типы аргументов проверяются до вызова операции (METHODS).
+
+GET /metrics отдает замеры операций (metrics.py) в текстовом формате Prometheus.
+"""
+import argparse
+import asyncio
+import concurrent.futures
+import json
+import os
+import signal
+from http import HTTPStatus
+
+import metrics
+from core import QuizCore
+from storage import open_storage
+
+STUDENT = ("student",)
+TEACHER = ("teacher",)
+ANYONE = ("student", "teacher")
+ANY_VALUE = (str, int, float, type(None))
+
+# Операции, доступные клиентам: роли, которым доступна операция (None - без
+# входа), и типы аргументов; список из одного типа - список таких значений.
+# grade не публикуется: иначе по баллам можно подобрать правильные ответы.
+METHODS = {
+    "login": (None, {"login": str, "role": str, "password": str}),
+    "resume": (None, {"token": str}),
+    "logout": (ANYONE, {}),
+    "students": (TEACHER, {}),
+    "test_names": (ANYONE, {}),
+    "questions": (ANYONE, {"test_name": str}),
+    "submit": (STUDENT, {"test_name": str, "answers": [str]}),  # Студент - из сеанса
+    "create_test": (TEACHER, {"test_name": str}),
+    "add_question": (TEACHER, {"test_name": str, "question": str, "answer": str}),
+    "course_names": (ANYONE, {}),
+    "course_students": (TEACHER, {"course_name": str}),
+    "create_course": (TEACHER, {"course_name": str}),
+    "enroll": (TEACHER, {"course_name": str, "students": [str]}),
+    "teacher_stats": (TEACHER, {}),
+    "student_stats": (ANYONE, {"student": str}),  # Студенту - только своя
+    "get_setting": (None, {"key": str, "default": ANY_VALUE}),  # Окно читает настройки до входа
+    "set_setting": (TEACHER, {"key": str, "value": ANY_VALUE}),
+}
+
+# Аргументы, которые можно не передавать
+OPTIONAL = {"password", "default"}
+
+JSON_TYPE = "application/json; charset=utf-8"
+
+MAX_BODY = 1024 * 1024
+
+
+class HttpError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def check_arguments(method, kwargs, types):
+    """Проверяет состав и типы аргументов операции"""
+    if not isinstance(kwargs, dict):
+        raise HttpError(HTTPStatus.BAD_REQUEST, "Аргументы должны быть JSON-объектом")
+    for name, value in kwargs.items():
+        expected = types.get(name)
+        if expected is None:
+            raise HttpError(HTTPStatus.BAD_REQUEST, f"Лишний аргумент операции {method}: {name}")
+        if isinstance(expected, list):
+            valid = isinstance(value, list) and all(isinstance(item, expected[0]) for item in value)
+        else:
+            valid = isinstance(value, expected) and not isinstance(value, bool)
+        if not valid:
+            raise HttpError(HTTPStatus.BAD_REQUEST, f"Неверный тип аргумента {name} операции {method}")
+    missing = [name for name in types if name not in kwargs and name not in OPTIONAL]
+    if missing:
+        raise HttpError(HTTPStatus.BAD_REQUEST, f"Не хватает аргументов операции {method}: {', '.join(missing)}")
+
+
+class QuizServer:
+    """Разбор HTTP-запросов и вызов операций QuizCore в потоке-владельце данных"""
+
+    def __init__(self, core):
+        self.core = core
+        # Один поток: операции с данными выполняются строго по очереди
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+
+    async def call(self, method, kwargs, token=None):
+        if method not in METHODS:
+            raise HttpError(HTTPStatus.NOT_FOUND, f"Неизвестная операция: {method}")
+        roles, types = METHODS[method]
+        check_arguments(method, kwargs, types)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, self.run, method, kwargs, roles, token)
+
+    def run(self, method, kwargs, roles, token):
+        """Проверяет сеанс и выполняет операцию (в потоке-владельце данных)"""
+        if roles is not None:
+            session = self.core.resume(token) if token else None
+            if session is None:
+                raise HttpError(HTTPStatus.UNAUTHORIZED, "Нужен вход в систему")
+            login, role = session
+            if role not in roles:
+                raise HttpError(HTTPStatus.FORBIDDEN, f"Операция {method} недоступна роли {role}")
+            if method == "submit":
+                kwargs["student"] = login
+            elif method == "student_stats" and role == "student" and kwargs["student"] != login:
+                raise HttpError(HTTPStatus.FORBIDDEN, "Студенту доступна только своя статистика")
+            elif method == "logout":
+                kwargs["token"] = token
+        return getattr(self.core, method)(**kwargs)
+
+    async def read_request(self, reader):
+        """Метод, путь, заголовки и тело запроса или None, если клиент закрыл соединение"""
+        line = await reader.readline()
+        if not line:
+            return None
+        try:
+            method, path, _ = line.decode("latin-1").split(" ", 2)
+        except ValueError:
+            raise HttpError(HTTPStatus.BAD_REQUEST, "Некорректная строка запроса")
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        try:
+            length = int(headers.get("content-length", 0) or 0)
+        except ValueError:
+            raise HttpError(HTTPStatus.BAD_REQUEST, "Некорректный Content-Length")
+        if length > MAX_BODY:
+            raise HttpError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "Слишком большой запрос")
+        body = await reader.readexactly(length) if length else b""
+        return method, path, headers, body
+
+    async def respond(self, request):
+        """Статус и ответ: словарь для JSON или готовый текст"""
+        method, path, headers, body = request
+        if method == "GET" and path == "/metrics":
+            return HTTPStatus.OK, metrics.prometheus_text()
+        if method != "POST" or not path.startswith("/api/"):
+            raise HttpError(HTTPStatus.NOT_FOUND, f"Нет такого адреса: {method} {path}")
+        try:
+            kwargs = json.loads(body.decode("utf-8")) if body else {}
+        except ValueError:
+            raise HttpError(HTTPStatus.BAD_REQUEST, "Тело запроса - не JSON")
+        scheme, _, token = headers.get("authorization", "").partition(" ")
+        try:
+            result = await self.call(path[len("/api/"):], kwargs, token if scheme.lower() == "bearer" else None)
+        except HttpError:
+            raise
+        except Exception as e:
+            return HTTPStatus.INTERNAL_SERVER_ERROR, {"error": str(e), "type": type(e).__name__}
+        return HTTPStatus.OK, {"result": result}
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request = await self.read_request(reader)
+                    if request is None:
+                        break
+                    status, payload = await self.respond(request)
+                    keep_alive = request[2].get("connection", "").lower() != "close"
+                except HttpError as e:
+                    status, payload = e.status, {"error": str(e), "type": "HttpError"}
+                    keep_alive = False
+                except asyncio.IncompleteReadError:
+                    break
+
+                if isinstance(payload, str):
+                    data, content_type = payload.encode("utf-8"), metrics.CONTENT_TYPE
+                else:
+                    data, content_type = json.dumps(payload, ensure_ascii=False).encode("utf-8"), JSON_TYPE
+                writer.write(
+                    f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+                    f"Content-Type: {content_type}\r\n"
+                    f"Content-Length: {len(data)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode("latin-1") + data)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+        self.core.close()  # Дописываем результаты, оставшиеся в буфере
+
+
+async def serve(core, host, port):
+    quiz_server = QuizServer(core)
+    server = await asyncio.start_server(quiz_server.handle, host, port, backlog=1024)
+    print(f"Сервер слушает {host}:{server.sockets[0].getsockname()[1]}", flush=True)
+
+    # По SIGINT и SIGTERM сервер останавливается штатно и дописывает буфер результатов
+    loop = asyncio.get_running_loop()
+    task = asyncio.current_task()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(signum, task.cancel)
+        except NotImplementedError:  # Windows
+            pass
+    try:
+        async with server:
+            await server.serve_forever()
+    except asyncio.CancelledError:
+        pass
+    finally:
+        quiz_server.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HTTP/JSON сервер системы тестирования")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--data-dir", default=".", help="Каталог с CSV-файлами")
+    parser.add_argument("--db", default=os.environ.get("QUIZ_DB", ""), help="База SQLite вместо CSV")
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(serve(QuizCore(open_storage(args.data_dir, args.db)), args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
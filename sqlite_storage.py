@@ -0,0 +1,358 @@
+"""Хранилище данных в базе SQLite.
+
+Реализует тот же интерфейс, что и CsvStorage из storage.py, но хранит данные
+в индексированных таблицах: поиск по логину, тесту, студенту и курсу идет по
+индексу, а запись - это вставка строки в транзакции вместо перезаписи файла.
+
+Перенос данных между CSV-файлами и базой:
+
+    python sqlite_storage.py import quiz.db --data-dir .
+    python sqlite_storage.py export quiz.db --data-dir backup
+"""
+import argparse
+import csv
+import os
+import sqlite3
+import threading
+
+from enrollment import EnrollmentStore
+from storage import (User, Question, Result, TestRepository, ResultRepository, UserRepository, encode_answers,
+                     format_rows, result_row)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    login TEXT PRIMARY KEY,
+    role TEXT NOT NULL,
+    password TEXT NOT NULL DEFAULT ''
+);
+CREATE TABLE IF NOT EXISTS tests (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS questions (
+    id INTEGER PRIMARY KEY,
+    test_id INTEGER NOT NULL REFERENCES tests(id),
+    question TEXT NOT NULL,
+    answer TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS questions_test ON questions(test_id);
+CREATE TABLE IF NOT EXISTS results (
+    id INTEGER PRIMARY KEY,
+    student TEXT NOT NULL,
+    test TEXT NOT NULL,
+    score INTEGER,
+    timestamp TEXT NOT NULL DEFAULT '',
+    answers TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS results_student ON results(student);
+CREATE INDEX IF NOT EXISTS results_test ON results(test);
+CREATE TABLE IF NOT EXISTS courses (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS enrollments (
+    id INTEGER PRIMARY KEY,
+    course_id INTEGER NOT NULL REFERENCES courses(id),
+    student TEXT NOT NULL,
+    UNIQUE (course_id, student)
+);
+CREATE INDEX IF NOT EXISTS enrollments_student ON enrollments(student);
+CREATE TABLE IF NOT EXISTS settings (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+USERS_HEADER = ["login", "role"]
+
+# Сколько строк результатов читать из курсора за раз
+FETCH_SIZE = 1000
+
+
+class SqliteStorage:
+    """Хранилище в одном файле базы SQLite"""
+
+    def __init__(self, path):
+        self.path = path
+        self.stats_path = path + ".stats.json"
+        # Соединение используется из фоновых потоков, доступ защищен блокировкой
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.RLock()
+        with self._lock, self.conn:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.executescript(SCHEMA)
+            # База создана до появления столбцов ответов и паролей
+            for table, column in (("results", "answers"), ("users", "password")):
+                columns = [row[1] for row in self.conn.execute(f"PRAGMA table_info({table})")]
+                if column not in columns:
+                    self.conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} TEXT NOT NULL DEFAULT ''")
+
+    def _query(self, sql, params=()):
+        with self._lock:
+            return self.conn.execute(sql, params).fetchall()
+
+    def close(self):
+        self.conn.close()
+
+    # Пользователи
+    def user(self, login):
+        rows = self._query("SELECT login, role, password FROM users WHERE login = ?", (login,))
+        return User(*rows[0]) if rows else None
+
+    def all_users(self):
+        return [User(*row) for row in self._query("SELECT login, role, password FROM users ORDER BY rowid")]
+
+    def students(self):
+        rows = self._query("SELECT login FROM users WHERE role = 'student' ORDER BY rowid")
+        return [row[0] for row in rows]
+
+    def add_users(self, rows):
+        with self._lock, self.conn:
+            # Строка - логин, роль и, возможно, хеш пароля
+            cursor = self.conn.executemany("INSERT OR IGNORE INTO users (login, role, password) VALUES (?, ?, ?)",
+                                           ((row[0], row[1], row[2] if len(row) > 2 else "") for row in rows))
+            return cursor.rowcount
+
+    def set_password(self, login, password_hash):
+        with self._lock, self.conn:
+            cursor = self.conn.execute("UPDATE users SET password = ? WHERE login = ?", (password_hash, login))
+            if not cursor.rowcount:
+                raise KeyError(f"Нет пользователя {login}")
+
+    # Тесты и вопросы
+    def test_names(self):
+        return [row[0] for row in self._query("SELECT name FROM tests ORDER BY id")]
+
+    def questions(self, test_name):
+        rows = self._query(
+            "SELECT q.question, q.answer FROM questions q JOIN tests t ON t.id = q.test_id "
+            "WHERE t.name = ? ORDER BY q.id", (test_name,))
+        return [Question(test_name, question, answer) for question, answer in rows]
+
+    def iter_questions(self):
+        """Вопросы всех тестов по одному через курсор базы"""
+        with self._lock:
+            cursor = self.conn.cursor()
+            cursor.execute("SELECT t.name, q.question, q.answer FROM questions q JOIN tests t ON t.id = q.test_id "
+                           "ORDER BY q.id")
+        while True:
+            with self._lock:
+                rows = cursor.fetchmany(FETCH_SIZE)
+            if not rows:
+                return
+            for row in rows:
+                yield Question(*row)
+
+    def _test_id(self, test_name):
+        self.conn.execute("INSERT OR IGNORE INTO tests (name) VALUES (?)", (test_name,))
+        return self.conn.execute("SELECT id FROM tests WHERE name = ?", (test_name,)).fetchone()[0]
+
+    def add_question(self, test_name, question, answer):
+        with self._lock, self.conn:
+            self.conn.execute("INSERT INTO questions (test_id, question, answer) VALUES (?, ?, ?)",
+                              (self._test_id(test_name), question, answer))
+
+    def add_questions(self, rows):
+        test_ids = {}
+
+        def with_test_ids():
+            for test_name, question, answer in rows:
+                if test_name not in test_ids:
+                    test_ids[test_name] = self._test_id(test_name)
+                yield test_ids[test_name], question, answer
+
+        with self._lock, self.conn:
+            cursor = self.conn.executemany(
+                "INSERT INTO questions (test_id, question, answer) VALUES (?, ?, ?)", with_test_ids())
+            return cursor.rowcount
+
+    def create_test(self, test_name):
+        with self._lock, self.conn:
+            self._test_id(test_name)
+
+    # Результаты
+    def all_results(self):
+        rows = self._query("SELECT student, test, score, timestamp, answers FROM results ORDER BY id")
+        return [Result(*row) for row in rows]
+
+    def results_for_student(self, student):
+        rows = self._query("SELECT student, test, score, timestamp, answers FROM results "
+                           "WHERE student = ? ORDER BY id", (student,))
+        return [Result(*row) for row in rows]
+
+    def add_result(self, student, test_name, score, timestamp, answers=None):
+        with self._lock, self.conn:
+            self.conn.execute("INSERT INTO results (student, test, score, timestamp, answers) "
+                              "VALUES (?, ?, ?, ?, ?)",
+                              (student, test_name, score, timestamp, encode_answers(answers)))
+
+    def iter_results(self):
+        """Результаты по одному в порядке записи через курсор базы"""
+        with self._lock:
+            cursor = self.conn.cursor()
+            cursor.execute("SELECT student, test, score, timestamp, answers FROM results ORDER BY id")
+        while True:
+            with self._lock:
+                rows = cursor.fetchmany(FETCH_SIZE)
+            if not rows:
+                return
+            for row in rows:
+                yield Result(*row)
+
+    def results_since(self, cursor):
+        """Результаты с id больше cursor; после очистки таблицы - все заново"""
+        last_id = cursor or 0
+        restarted = False
+        if last_id and not self._query("SELECT 1 FROM results WHERE id = ?", (last_id,)):
+            last_id = 0
+            restarted = True
+        rows = self._query("SELECT id, student, test, score, timestamp, answers FROM results "
+                           "WHERE id > ? ORDER BY id", (last_id,))
+        if rows:
+            last_id = rows[-1][0]
+        return [Result(*row[1:]) for row in rows], last_id, restarted
+
+    # Курсы
+    def course_names(self):
+        return [row[0] for row in self._query("SELECT name FROM courses ORDER BY id")]
+
+    def course_students(self, course_name):
+        rows = self._query("SELECT e.student FROM enrollments e JOIN courses c ON c.id = e.course_id "
+                           "WHERE c.name = ? ORDER BY e.id", (course_name,))
+        return [row[0] for row in rows]
+
+    def _course_id(self, course_name):
+        self.conn.execute("INSERT OR IGNORE INTO courses (name) VALUES (?)", (course_name,))
+        return self.conn.execute("SELECT id FROM courses WHERE name = ?", (course_name,)).fetchone()[0]
+
+    def create_course(self, course_name):
+        with self._lock, self.conn:
+            self._course_id(course_name)
+
+    def enroll(self, course_name, students):
+        with self._lock, self.conn:
+            course_id = self._course_id(course_name)
+            self.conn.executemany("INSERT OR IGNORE INTO enrollments (course_id, student) VALUES (?, ?)",
+                                  [(course_id, student) for student in students])
+
+    # Настройки
+    def get_setting(self, key, default=None):
+        rows = self._query("SELECT value FROM settings WHERE key = ?", (key,))
+        return rows[0][0] if rows else default
+
+    def set_setting(self, key, value):
+        with self._lock, self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)", (key, str(value)))
+
+
+def read_csv(path):
+    """Непустые строки CSV-файла; отсутствующий файл считается пустым"""
+    if not os.path.exists(path):
+        return
+    with open(path, "r", encoding="utf-8", newline="") as file:
+        for row in csv.reader(file):
+            if row:
+                yield row
+
+
+def import_csv(storage, data_dir):
+    """Загружает CSV-файлы из каталога в базу, заменяя ее содержимое"""
+    tests_repo = TestRepository(os.path.join(data_dir, "tests.csv"))
+    results_repo = ResultRepository(os.path.join(data_dir, "results.csv"))
+    conn = storage.conn
+
+    if os.path.exists(storage.stats_path):
+        os.remove(storage.stats_path)  # Статистика будет посчитана заново
+
+    with storage._lock, conn:
+        for table in ("users", "questions", "tests", "results", "enrollments", "courses", "settings"):
+            conn.execute(f"DELETE FROM {table}")
+
+        users_repo = UserRepository(os.path.join(data_dir, "users.csv"))
+        users = users_repo.users() if os.path.exists(users_repo.path) else []
+        conn.executemany(
+            "INSERT OR REPLACE INTO users (login, role, password) VALUES (?, ?, ?)",
+            (user for user in users if [user.login, user.role] != USERS_HEADER))
+
+        for row in read_csv(tests_repo.path):
+            question = tests_repo.parse_row(row)
+            test_id = storage._test_id(question.test)
+            # Строка без вопроса и ответа только регистрирует тест
+            if question.question or question.answer:
+                conn.execute("INSERT INTO questions (test_id, question, answer) VALUES (?, ?, ?)",
+                             (test_id, question.question, question.answer))
+
+        conn.executemany(
+            "INSERT INTO results (student, test, score, timestamp, answers) VALUES (?, ?, ?, ?, ?)",
+            (results_repo.parse_row(row) for row in read_csv(results_repo.path)))
+
+        courses_path = os.path.join(data_dir, "courses.csv")
+        courses = EnrollmentStore(courses_path).records() if os.path.exists(courses_path) else []
+        for course in courses:
+            course_id = storage._course_id(course.name)
+            conn.executemany("INSERT OR IGNORE INTO enrollments (course_id, student) VALUES (?, ?)",
+                             [(course_id, student) for student in course.students])
+
+        conn.executemany(
+            "INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)",
+            (row[:2] for row in read_csv(os.path.join(data_dir, "settings.csv")) if len(row) >= 2))
+
+
+def write_csv(path, rows):
+    with open(path, "w", encoding="utf-8", newline="") as file:
+        file.write(format_rows(rows))
+
+
+def export_csv(storage, data_dir):
+    """Выгружает базу в CSV-файлы того же формата, что использует приложение"""
+    os.makedirs(data_dir, exist_ok=True)
+    query = storage._query
+
+    write_csv(os.path.join(data_dir, "users.csv"),
+              [USERS_HEADER] + [list(user) if user.password else [user.login, user.role]
+                                for user in storage.all_users()])
+
+    tests_rows = []
+    for test_name in storage.test_names():
+        questions = storage.questions(test_name)
+        if not questions:
+            tests_rows.append([test_name, "", ""])  # Тест без вопросов
+        tests_rows.extend([q.test, q.question, q.answer] for q in questions)
+    write_csv(os.path.join(data_dir, "tests.csv"), tests_rows)
+
+    results_rows = []
+    for result in storage.all_results():
+        row = result_row(*result)
+        if not result.timestamp and not result.answers:
+            row.pop()  # Старые строки без времени
+        results_rows.append(row)
+    write_csv(os.path.join(data_dir, "results.csv"), results_rows)
+
+    courses_path = os.path.join(data_dir, "courses.csv")
+    write_csv(courses_path, [[name] + storage.course_students(name) for name in storage.course_names()])
+    if os.path.exists(courses_path + ".journal"):
+        os.remove(courses_path + ".journal")  # Журнал уже учтен в выгрузке
+    write_csv(os.path.join(data_dir, "settings.csv"),
+              query("SELECT key, value FROM settings ORDER BY rowid"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Перенос данных между CSV-файлами и базой SQLite")
+    parser.add_argument("command", choices=["import", "export"],
+                        help="import - из CSV в базу, export - из базы в CSV")
+    parser.add_argument("database", help="Путь к файлу базы SQLite")
+    parser.add_argument("--data-dir", default=".", help="Каталог с CSV-файлами")
+    args = parser.parse_args()
+
+    storage = SqliteStorage(args.database)
+    try:
+        if args.command == "import":
+            import_csv(storage, args.data_dir)
+        else:
+            export_csv(storage, args.data_dir)
+    finally:
+        storage.close()
+
+
+if __name__ == "__main__":
+    main()
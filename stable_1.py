@@ -1,26 +1,73 @@
+import os
 import sys
-import csv
 
-import numpy as np
-from PyQt5.QtWidgets import (QApplication, QMainWindow, QPushButton, QLabel, QVBoxLayout, QWidget,
+from PyQt5.QtWidgets import (QApplication, QMainWindow, QPushButton, QLabel, QVBoxLayout, QHBoxLayout, QWidget,
                              QLineEdit, QMessageBox, QComboBox, QTabWidget, QDialog, QFormLayout, QListWidget,
-                             QInputDialog)
-from PyQt5.QtGui import QFont
-from PyQt5.QtCore import Qt
-from datetime import datetime
-import matplotlib.pyplot as plt
+                             QListView,
+                             QInputDialog, QFileDialog)
+from PyQt5.QtGui import QFont, QPixmap
+from PyQt5.QtCore import Qt, QThreadPool
+
+import metrics
+from core import QuizCore
+from file_watcher import FileWatcher
+from list_models import ListModel, search_field, search_proxy
+from quiz_session import PAGE_SIZE, QuestionPrefetch, TestSession
+from storage import CsvStorage
+from workers import TaskRunner
 
 # Файлы данных
 USER_CSV = "users.csv"
 TESTS_CSV = "tests.csv"
-RESULTS_CSV = "results.csv"
+# Вместо results.csv можно вести двоичный журнал результатов (result_log.py):
+# QUIZ_RESULTS=results.bin
+RESULTS_CSV = os.environ.get("QUIZ_RESULTS", "results.csv")
 COURSES_CSV = "courses.csv"
 SETTINGS_CSV = "settings.csv"
 
+# Порт, на котором окно отдает замеры операций (metrics.py) по GET /metrics
+METRICS_PORT = int(os.environ.get("QUIZ_METRICS_PORT", 0))
+
+# База SQLite вместо CSV-файлов, если задан путь в переменной окружения QUIZ_DB
+QUIZ_DB = os.environ.get("QUIZ_DB", "")
+
+# Адрес сервера server.py; если задан, окно работает через него, а не с файлами
+QUIZ_SERVER = os.environ.get("QUIZ_SERVER", "")
+
+# Пакетная запись результатов (см. result_sink.py): размер пачки, интервал
+# сброса в секундах и политика fsync (none, batch или close). Результаты,
+# принятые за последний интервал, при сбое теряются; с QUIZ_DURABLE=1 каждый
+# результат записывается до того, как студент увидит балл
+RESULT_SINK = {
+    "durable": os.environ.get("QUIZ_DURABLE", "") == "1",
+    "batch_size": int(os.environ.get("QUIZ_BATCH_SIZE", 100)),
+    "flush_interval": float(os.environ.get("QUIZ_FLUSH_INTERVAL", 1.0)),
+    "fsync": os.environ.get("QUIZ_FSYNC", "batch"),
+}
+
+
+def open_storage():
+    """Хранилище данных: база SQLite или CSV-файлы"""
+    if QUIZ_DB:
+        from sqlite_storage import SqliteStorage
+        return SqliteStorage(QUIZ_DB)
+    return CsvStorage(USER_CSV, TESTS_CSV, RESULTS_CSV, COURSES_CSV, SETTINGS_CSV,
+                      sink_options=RESULT_SINK)
+
+
+def open_core():
+    """Операции системы тестирования: на сервере или над локальным хранилищем"""
+    if QUIZ_SERVER:
+        from client import RemoteCore
+        return RemoteCore(QUIZ_SERVER)
+    return QuizCore(open_storage())
+
 
 class CreateCourseDialog(QDialog):
-    def __init__(self):
+    def __init__(self, core, tasks):
         super().__init__()
+        self.core = core
+        self.tasks = tasks
         self.setWindowTitle("Создание курса")
         self.setGeometry(200, 200, 400, 150)
 
@@ -40,17 +87,25 @@ class CreateCourseDialog(QDialog):
             QMessageBox.warning(self, "Ошибка", "Введите название курса!")
             return
 
-        with open(COURSES_CSV, "a", encoding="utf-8", newline="") as file:
-            writer = csv.writer(file)
-            writer.writerow([course_name])
+        self.create_button.setEnabled(False)
+        self.tasks.run(self.core.create_course, course_name,
+                       on_done=lambda _: self.course_created(course_name),
+                       on_error=self.create_failed)
 
+    def course_created(self, course_name):
         QMessageBox.information(self, "Успех", f"Курс '{course_name}' успешно создан!")
         self.accept()
 
+    def create_failed(self, e):
+        self.create_button.setEnabled(True)
+        QMessageBox.warning(self, "Ошибка", f"Не удалось создать курс: {e}")
+
 
 class AssignStudentsDialog(QDialog):
-    def __init__(self, courses, students):
+    def __init__(self, core, tasks, courses, students):
         super().__init__()
+        self.core = core
+        self.tasks = tasks
         self.setWindowTitle("Закрепление студентов за курсом")
         self.setGeometry(200, 200, 400, 300)
 
@@ -81,28 +136,111 @@ class AssignStudentsDialog(QDialog):
             QMessageBox.warning(self, "Ошибка", "Не выбраны студенты для закрепления!")
             return
 
-        try:
-            with open(COURSES_CSV, "r", encoding="utf-8", newline="") as file:
-                reader = csv.reader(file)
-                courses_data = list(reader)
+        self.assign_button.setEnabled(False)
+        self.tasks.run(self.core.enroll, selected_course, selected_students,
+                       on_done=lambda _: self.students_assigned(selected_course, selected_students),
+                       on_error=self.assign_failed)
+
+    def students_assigned(self, selected_course, selected_students):
+        QMessageBox.information(self, "Успех", f"Студенты {', '.join(selected_students)} успешно закреплены за курсом '{selected_course}'!")
+        self.accept()
+
+    def assign_failed(self, e):
+        self.assign_button.setEnabled(True)
+        QMessageBox.warning(self, "Ошибка", f"Произошла ошибка при закреплении студентов: {e}")
 
-            updated_courses_data = []
-            for row in courses_data:
-                if row and row[0] == selected_course:  # Если курс уже существует
-                    for student in selected_students:
-                        if student not in row:  # Добавляем студента только если его еще нет в списке
-                            row.append(student)
-                updated_courses_data.append(row)  # Добавляем обновленную строку
 
-            with open(COURSES_CSV, "w", encoding="utf-8", newline="") as file:
-                writer = csv.writer(file)
-                writer.writerows(updated_courses_data)  # Записываем обновленные данные
+class ImportDialog(QDialog):
+    """Массовый импорт вопросов или пользователей из CSV или JSON Lines"""
 
-            QMessageBox.information(self, "Успех", f"Студенты {', '.join(selected_students)} успешно закреплены за курсом '{selected_course}'!")
-            self.accept()
+    KINDS = {"Вопросы (тест, вопрос, ответ)": "import_questions",
+             "Пользователи (логин, роль, пароль)": "import_users"}
+
+    def __init__(self, core, tasks):
+        super().__init__()
+        self.core = core
+        self.tasks = tasks
+        self.setWindowTitle("Массовый импорт")
+        self.setGeometry(200, 200, 500, 200)
+
+        layout = QFormLayout()
+        self.kind_select = QComboBox()
+        self.kind_select.addItems(list(self.KINDS))
+        layout.addRow("Что импортировать:", self.kind_select)
+
+        self.path_input = QLineEdit()
+        self.browse_button = QPushButton("Выбрать файл")
+        self.browse_button.clicked.connect(self.browse)
+        layout.addRow(self.path_input, self.browse_button)
+
+        self.status_label = QLabel("")
+        layout.addRow(self.status_label)
+
+        self.import_button = QPushButton("Импортировать")
+        self.import_button.clicked.connect(self.start_import)
+        layout.addWidget(self.import_button)
+
+        self.setLayout(layout)
+
+    def browse(self):
+        path, _ = QFileDialog.getOpenFileName(self, "Файл для импорта", "",
+                                              "CSV и JSON (*.csv *.jsonl *.ndjson *.json)")
+        if path:
+            self.path_input.setText(path)
+
+    def start_import(self):
+        path = self.path_input.text().strip()
+        if not path or not os.path.isfile(path):
+            QMessageBox.warning(self, "Ошибка", "Выберите файл для импорта!")
+            return
+
+        # Отклоненные строки записываются в отчет рядом с импортируемым файлом
+        self.report_path = os.path.splitext(path)[0] + ".rejected.csv"
+        run_import = getattr(self.core, self.KINDS[self.kind_select.currentText()])
+        self.import_button.setEnabled(False)
+        self.tasks.run(lambda task: run_import(path, self.report_path, progress=task.report),
+                       key="import", with_task=True, on_done=self.import_finished,
+                       on_error=self.import_failed, on_progress=self.show_progress)
+
+    def show_progress(self, done, total):
+        self.status_label.setText(f"Прочитано {done * 100 // max(total, 1)}% файла")
+
+    def import_finished(self, summary):
+        self.import_button.setEnabled(True)
+        message = (f"Прочитано строк: {summary['read']}\nПринято: {summary['accepted']}\n"
+                   f"Отклонено: {summary['rejected']}")
+        if summary["rejected"]:
+            message += "\n\n" + "\n".join(summary["examples"][:5])
+            message += f"\n\nВсе отклоненные строки: {self.report_path}"
+        QMessageBox.information(self, "Импорт завершен", message)
+        self.accept()
 
-        except Exception as e:
-            QMessageBox.warning(self, "Ошибка", f"Произошла ошибка при закреплении студентов: {e}")
+    def import_failed(self, e):
+        self.import_button.setEnabled(True)
+        QMessageBox.warning(self, "Ошибка", f"Импорт не выполнен: {e}")
+
+
+class ChartDialog(QDialog):
+    """Окно с готовым изображением графика"""
+
+    def __init__(self, title, image):
+        super().__init__()
+        self.setWindowTitle(title)
+
+        layout = QVBoxLayout()
+        self.chart_label = QLabel()
+        self.set_image(image)
+        layout.addWidget(self.chart_label)
+
+        self.setLayout(layout)
+
+    def set_image(self, image):
+        """Заменяет график, например после новых результатов"""
+        if image is None:
+            return
+        pixmap = QPixmap()
+        pixmap.loadFromData(image, "PNG")
+        self.chart_label.setPixmap(pixmap)
 
 
 class QuizApp(QMainWindow):
@@ -111,6 +249,32 @@ class QuizApp(QMainWindow):
         self.setWindowTitle("Система тестирования")
         self.setGeometry(100, 100, 800, 600)
 
+        # Операции с данными: локальное хранилище (файлы читаются один раз и
+        # кэшируются, статистика дочитывается по мере надобности) или сервер
+        self.core = open_core()
+        self._chart_cache = None  # Создается при первом просмотре графика
+
+        # Операции с данными выполняются по очереди в одном фоновом потоке:
+        # окно не зависает, а хранилище не нужно защищать от гонок
+        self.io_pool = QThreadPool()
+        self.io_pool.setMaxThreadCount(1)
+        self.tasks = TaskRunner(self.io_pool)
+
+        # Вопросы тестов из списка студента загружаются заранее
+        self.prefetch = QuestionPrefetch(self.core)
+        self.session = None  # Текущее прохождение теста
+        self.session_token = None  # Токен сеанса пользователя (user_directory.py)
+        self.role = None
+
+        # Новые тесты, курсы и результаты из файлов, в том числе записанные
+        # другими окнами, появляются в открытых списках и графике сами
+        self.watcher = None
+        self.stats_dialog = None  # Открытое окно графика статистики
+
+        # Списки тестов и курсов обновляются по разнице со старым содержимым
+        self.tests_model = ListModel(self)
+        self.courses_model = ListModel(self)
+
         self.dpi_value = 96  # Значение DPI по умолчанию
         self.load_settings()  # Загружаем настройки из файла
         self.initUI()
@@ -123,7 +287,7 @@ class QuizApp(QMainWindow):
         self.tabs.addTab(self.login_panel, "Вход")
 
         layout = QVBoxLayout()
-        self.label = QLabel("Добро пожаловать! Введите логин и выберите роль:")
+        self.label = QLabel("Добро пожаловать! Введите логин и пароль и выберите роль:")
         self.label.setFont(QFont("Arial", 14))
         layout.addWidget(self.label)
 
@@ -131,6 +295,11 @@ class QuizApp(QMainWindow):
         self.login_input.setPlaceholderText("Введите логин")
         layout.addWidget(self.login_input)
 
+        self.password_input = QLineEdit()
+        self.password_input.setPlaceholderText("Пароль (при первом входе - новый пароль)")
+        self.password_input.setEchoMode(QLineEdit.Password)
+        layout.addWidget(self.password_input)
+
         self.teacher_button = QPushButton("Преподаватель")
         self.student_button = QPushButton("Ученик")
         layout.addWidget(self.teacher_button)
@@ -174,23 +343,15 @@ class QuizApp(QMainWindow):
 
     def load_settings(self):
         """Загрузка настроек из settings.csv"""
-        try:
-            with open(SETTINGS_CSV, "r", encoding="utf-8") as file:
-                reader = csv.reader(file)
-                settings = {row[0]: row[1] for row in reader}
-
-            if "dpi" in settings:
-                self.dpi_value = int(settings["dpi"])
-
-        except FileNotFoundError:
-            # Если файл настроек не найден, используем значение по умолчанию
-            self.dpi_value = 96
+        # Если файл настроек не найден, используем значение по умолчанию
+        self.dpi_value = int(self.core.get_setting("dpi", 96))
 
     def save_settings(self):
         """Сохранение текущих настроек в settings.csv"""
-        with open(SETTINGS_CSV, "w", encoding="utf-8", newline="") as file:
-            writer = csv.writer(file)
-            writer.writerow(["dpi", self.dpi_value])
+        try:
+            self.core.set_setting("dpi", self.dpi_value)
+        except Exception as e:  # На сервере общие настройки меняет только преподаватель
+            QMessageBox.warning(self, "Ошибка", f"Настройка применена, но не сохранена: {e}")
 
     def login(self, role):
         self.current_user = self.login_input.text().strip()
@@ -198,17 +359,36 @@ class QuizApp(QMainWindow):
             QMessageBox.warning(self, "Ошибка", "Введите логин!")
             return
 
-        with open(USER_CSV, "r", encoding="utf-8") as file:
-            reader = csv.reader(file)
-            users = {row[0]: row[1] for row in reader}  # логин: роль
+        self.set_login_enabled(False)
+        self.tasks.run(self.core.login, self.current_user, role, self.password_input.text(), key="login",
+                       on_done=lambda token: self.finish_login(token, role),
+                       on_error=self.login_failed)
 
-        if self.current_user in users and users[self.current_user] == role:
+    def finish_login(self, token, role):
+        self.set_login_enabled(True)
+        self.password_input.clear()
+        if token:
+            self.session_token = token
             self.open_main_menu(role)
         else:
-            QMessageBox.warning(self, "Ошибка", "Неверный логин или роль")
+            QMessageBox.warning(self, "Ошибка", "Неверный логин, пароль или роль")
+
+    def login_failed(self, e):
+        self.set_login_enabled(True)
+        QMessageBox.warning(self, "Ошибка", f"Не удалось проверить логин: {e}")
+
+    def set_login_enabled(self, enabled):
+        self.teacher_button.setEnabled(enabled)
+        self.student_button.setEnabled(enabled)
+
+    def show_progress(self, done, total):
+        """Ход долгой фоновой загрузки в строке состояния"""
+        self.statusBar().showMessage(f"Загрузка: {done} из {total}")
 
     def open_main_menu(self, role):
         self.tabs.clear()  # Очистим старые вкладки
+        self.role = role
+        self.start_watcher()  # До загрузки списков, чтобы не пропустить дописанное в это время
 
         if role == "teacher":
             self.open_teacher_tabs()
@@ -243,19 +423,17 @@ class QuizApp(QMainWindow):
         # Поле для ввода ответа
         self.add_answer_input = QLineEdit()
         self.add_answer_input.setPlaceholderText("Введите правильный ответ")
+        self.add_answer_input.setToolTip("Текст ответа или any:вариант1|вариант2, num:3.14+-0.01, "
+                                         "re:регулярное выражение (см. grading.py)")
         layout.addWidget(self.add_answer_input)
 
-        # Выпадающий список для выбора теста
+        # Выпадающий список для выбора теста с поиском по названию
         self.test_select = QComboBox()
+        tests_proxy = search_proxy(self.tests_model, self)
+        self.test_select.setModel(tests_proxy)
+        self.load_tests()  # Список тестов заполнится после загрузки в фоне
 
-        with open(TESTS_CSV, 'r', encoding='utf-8', newline='') as csvfile:
-            reader = csv.reader(csvfile)
-            tests = set()
-            for row in reader:
-                if row:  # Проверяем, что строка не пустая
-                    tests.add(row[0])
-            self.test_select.addItems(list(tests))
-
+        layout.addWidget(search_field(tests_proxy, "Поиск теста"))
         layout.addWidget(self.test_select)
 
         # Кнопка для добавления нового теста
@@ -268,51 +446,90 @@ class QuizApp(QMainWindow):
         self.save_question_button.clicked.connect(self.save_question)
         layout.addWidget(self.save_question_button)
 
+        # Кнопка для загрузки вопросов и пользователей из файла
+        self.import_button = QPushButton("Массовый импорт из файла")
+        self.import_button.clicked.connect(self.bulk_import)
+        layout.addWidget(self.import_button)
+
 
         tab.setLayout(layout)
         return tab
 
 
 
-    def load_tests(self):
-        """Загрузка доступных тестов.  Адаптировано для преподавателя и студента."""
-        try:
-            with open(TESTS_CSV, "r", encoding="utf-8") as file:
-                reader = csv.reader(file)
-                tests = [row[0] for row in reader if row]  # Загружаем только непустые строки
-                if not tests:
-                    if hasattr(self, 'test_list'): # Проверка наличия атрибута
-                        self.test_list.addItem("Нет доступных тестов!")
-                    else:
-                        self.test_select.addItem("Нет доступных тестов!") # Для преподавателя
-                    return
-        except FileNotFoundError:
-            if hasattr(self, 'test_list'):
-                self.test_list.addItem(f"Файл {TESTS_CSV} не найден!")
-            else:
-                self.test_select.addItem(f"Файл {TESTS_CSV} не найден!")
+    def start_watcher(self):
+        """Слежение за файлами данных; только для локальных CSV-файлов"""
+        storage = getattr(self.core, "storage", None)
+        if self.watcher is not None or not isinstance(storage, CsvStorage):
             return
-        except Exception as e:
+        self.watched = {
+            os.path.abspath(storage.tests.path): "tests",
+            os.path.abspath(storage.courses.path): "courses",
+            os.path.abspath(storage.courses.journal_path): "courses",
+        }
+        if storage.results.path.endswith(".csv"):  # Двоичный журнал результатов построчно не читается
+            self.watched[os.path.abspath(storage.results.path)] = "results"
+        self.watcher = FileWatcher(list(self.watched), self)
+        self.watcher.appended.connect(self.data_appended)
+        self.watcher.replaced.connect(self.data_replaced)
+
+    def data_appended(self, path, rows):
+        kind = self.watched.get(path)
+        if kind == "tests":
+            names = [row[0] for row in rows]
+            self.prefetch.discard(names)  # В эти тесты добавили вопросы
+            with metrics.span("ui.test_list"):
+                # Первый столбец - название теста; список дополняется только новыми
+                self.tests_model.add_items(names)
             if hasattr(self, 'test_list'):
-                self.test_list.addItem(f"Ошибка при загрузке тестов: {str(e)}")
-            else:
-                self.test_select.addItem(f"Ошибка при загрузке тестов: {str(e)}")
+                self.start_test_button.setEnabled(True)
+        elif kind == "courses":
+            self.courses_model.add_items(row[0] for row in rows)
+        elif kind == "results":
+            self.results_appended(rows)
+
+    def data_replaced(self, path):
+        # Файл переписан: списки перечитываются и обновляются по разнице
+        kind = self.watched.get(path)
+        if kind == "tests":
+            self.load_tests()
+        elif kind == "courses":
+            self.load_courses()
+        elif kind == "results":
+            self.results_appended(None)
+
+    def load_tests(self):
+        """Загрузка доступных тестов.  Адаптировано для преподавателя и студента."""
+        self.tasks.run(self.core.test_names, key="load_tests",
+                       on_done=self.show_tests, on_error=self.show_tests_error)
+
+    def add_tests_message(self, message):
+        self.tests_model.set_message(message)
+
+    def show_tests_error(self, e):
+        if isinstance(e, FileNotFoundError):
+            self.add_tests_message(f"Файл {TESTS_CSV} не найден!")
+        else:
+            self.add_tests_message(f"Ошибка при загрузке тестов: {str(e)}")
+
+    def show_tests(self, tests):
+        if not tests:
+            self.add_tests_message("Нет доступных тестов!")
             return
 
+        with metrics.span("ui.test_list"):
+            self.tests_model.set_items(tests)  # Вставляются только новые тесты
         if hasattr(self, 'test_list'): # Если это студент
-            self.test_list.clear()
-            for test in tests:
-                self.test_list.addItem(test)
             self.start_test_button.setEnabled(True)
-        else: # Если это преподаватель
-            self.test_select.clear()
-            for test in tests:
-                self.test_select.addItem(test)
+            # Пока студент выбирает тест, его вопросы загружаются в фоне
+            self.prefetch.clear()
+            self.tasks.run(self.prefetch.load, tests, key="prefetch_questions", with_task=True)
 
 
     def start_test(self):
         """Начать прохождение выбранного теста"""
-        selected_test = self.test_list.currentItem().text()
+        index = self.test_list.currentIndex()
+        selected_test = index.data() if index.isValid() and not self.tests_model.has_message else ""
         if not selected_test:
             QMessageBox.warning(self, "Ошибка", "Выберите тест для начала!")
             return
@@ -321,9 +538,22 @@ class QuizApp(QMainWindow):
         print(
             f"Выбран тест: {self.selected_test}")  # Отладочное сообщение
 
-        # Загружаем вопросы выбранного теста
-        questions = self.load_test_questions(self.selected_test)
+        questions = self.prefetch.get(self.selected_test)
+        if questions is not None:
+            self.show_test_questions(questions)
+            # Тест могли изменить после предзагрузки: сверяем вопросы в фоне
+            test_name = self.selected_test
+            self.tasks.run(self.core.questions, test_name, key="check_test",
+                           on_done=lambda fresh: self.refresh_test_questions(test_name, fresh))
+            return
+
+        # Вопросы еще не загружены заранее: загружаем их в фоне
+        self.start_test_button.setEnabled(False)
+        self.tasks.run(self.core.questions, self.selected_test, key="start_test",
+                       on_done=self.show_test_questions, on_error=self.test_questions_failed)
 
+    def show_test_questions(self, questions):
+        self.start_test_button.setEnabled(True)
         if not questions:
             QMessageBox.warning(
                 self, "Ошибка", "Не удалось загрузить вопросы для выбранного теста.")
@@ -331,105 +561,151 @@ class QuizApp(QMainWindow):
 
         self.display_test(questions)
 
-    def load_test_questions(self, test_name):
-        """Загрузка вопросов для выбранного теста"""
-        questions = []
-        try:
-            with open(TESTS_CSV, "r", encoding="utf-8") as file:
-                reader = csv.reader(file)
-                for row in reader:
-                    if row and row[0] == test_name:  # Если это нужный тест
-                        questions.append(
-                            (row[1], row[2]))  # Вопрос и правильный ответ
-        except FileNotFoundError:
+    def refresh_test_questions(self, test_name, questions):
+        """Показывает новые вопросы теста вместо устаревших, сохраняя ответы"""
+        self.prefetch.put(test_name, questions)
+        session = self.session
+        if session is None or session.test_name != test_name or session.questions == questions or not questions:
+            return
+        self.save_page()
+        # Ответы сохраняются там, где вопрос остался на своем месте
+        answers = [session.answers[i] if i < len(session.questions) and session.questions[i] == question else ""
+                   for i, question in enumerate(questions)]
+        page = session.page
+        self.display_test(questions, answers)
+        self.show_page(page)
+        self.statusBar().showMessage("Тест изменился, вопросы обновлены")
+
+    def test_questions_failed(self, e):
+        self.start_test_button.setEnabled(True)
+        if isinstance(e, FileNotFoundError):
             QMessageBox.warning(self, "Ошибка", f"Файл {TESTS_CSV} не найден!")
-            return []
-
-        return questions
-
-    def display_test(self, questions):
-        """Отображение вопросов для прохождения теста"""
-        self.test_form_layout = QFormLayout()
-
-        # Сохраняем вопросы в атрибуте для доступа после заполнения
-        self.questions = questions
-        self.answers = []
+        else:
+            QMessageBox.warning(self, "Ошибка", f"Не удалось загрузить вопросы: {e}")
+
+    @metrics.timed("ui.display_test")
+    def display_test(self, questions, answers=None):
+        """Отображение вопросов для прохождения теста по страницам.
+
+        Виджеты создаются для одной страницы и заполняются заново при
+        переходе, поэтому большой тест открывается так же быстро, как
+        маленький; ответы хранит self.session.
+        """
+        if self.session is not None:
+            self.tabs.removeTab(self.tabs.indexOf(self.test_tab))  # Предыдущий тест не отправлен
+        self.session = TestSession(self.selected_test, questions)
+        if answers is not None:
+            self.session.answers = list(answers)  # Ответы на тест, вопросы которого обновились
 
-        # Добавляем вопросы на форму
-        for i, (question, correct_answer) in enumerate(self.questions):
-            question_label = QLabel(question)
-            self.test_form_layout.addRow(question_label)
+        layout = QVBoxLayout()
+        form_layout = QFormLayout()
+        self.question_labels = []
+        self.answer_inputs = []
+        for _ in range(min(PAGE_SIZE, len(questions))):
+            question_label = QLabel()
+            question_label.setWordWrap(True)
+            form_layout.addRow(question_label)
 
-            # Добавляем поле для ответа
             answer_input = QLineEdit()
             answer_input.setPlaceholderText("Введите ваш ответ")
-            self.test_form_layout.addRow(answer_input)
-
-            self.answers.append(
-                (answer_input, correct_answer))  # Сохраняем поле ответа и правильный ответ
+            form_layout.addRow(answer_input)
+
+            self.question_labels.append(question_label)
+            self.answer_inputs.append(answer_input)
+        layout.addLayout(form_layout)
+        layout.addStretch()
+
+        # Переход между страницами
+        pages_layout = QHBoxLayout()
+        self.prev_page_button = QPushButton("Назад")
+        self.prev_page_button.clicked.connect(lambda: self.show_page(self.session.page - 1))
+        pages_layout.addWidget(self.prev_page_button)
+        self.page_label = QLabel()
+        self.page_label.setAlignment(Qt.AlignCenter)
+        pages_layout.addWidget(self.page_label)
+        self.next_page_button = QPushButton("Далее")
+        self.next_page_button.clicked.connect(lambda: self.show_page(self.session.page + 1))
+        pages_layout.addWidget(self.next_page_button)
+        layout.addLayout(pages_layout)
 
         # Кнопка для отправки теста
         self.submit_button = QPushButton("Отправить тест")
         self.submit_button.clicked.connect(self.submit_test)
-        self.test_form_layout.addRow(self.submit_button)
+        layout.addWidget(self.submit_button)
 
-        # Создаем новый виджет для отображения вопросов
-        test_form_widget = QWidget()
-        test_form_widget.setLayout(self.test_form_layout)
-
-        # Добавляем виджет на вкладку
         self.test_tab = QWidget()
-        self.test_tab.setLayout(self.test_form_layout)
+        self.test_tab.setLayout(layout)
+        self.fill_page(0)  # Новые поля ввода пусты, сохранять из них нечего
         self.tabs.addTab(self.test_tab, "Тест")
 
         # Выводим отладочную информацию
         print("Тест с вопросами успешно отображен")
 
-    def submit_test(self):
-        """Обработка результатов теста и запись в файл."""
-        score = 0
-        total_questions = len(self.answers)
+    def save_page(self):
+        """Переносит ответы текущей страницы из полей ввода в сессию"""
+        self.session.set_answers([answer_input.text() for answer_input in self.answer_inputs])
+
+    @metrics.timed("ui.show_page")
+    def show_page(self, page):
+        self.save_page()
+        self.fill_page(page)
+
+    def fill_page(self, page):
+        """Заполняет поля страницы вопросами и ответами из сессии"""
+        self.session.go_to(page)
+        numbers = self.session.page_range()
+        for i, (question_label, answer_input) in enumerate(zip(self.question_labels, self.answer_inputs)):
+            visible = i < len(numbers)
+            question_label.setVisible(visible)
+            answer_input.setVisible(visible)
+            if visible:
+                number = numbers[i]
+                question_label.setText(f"{number + 1}. {self.session.questions[number]}")
+                answer_input.setText(self.session.answers[number])
+            else:
+                answer_input.clear()
 
-        for answer_input, correct_answer in self.answers:
-            if answer_input.text().strip().lower() == correct_answer.lower():
-                score += 1
+        self.page_label.setText(f"Страница {self.session.page + 1} из {self.session.page_count}")
+        self.prev_page_button.setEnabled(self.session.page > 0)
+        self.next_page_button.setEnabled(self.session.page < self.session.page_count - 1)
 
+    def submit_test(self):
+        """Проверка ответов и запись результата в фоне."""
+        self.save_page()
+        self.submit_button.setEnabled(False)
+        self.tasks.run(self.core.submit, self.current_user, self.session.test_name, list(self.session.answers),
+                       on_done=self.show_result, on_error=self.submit_failed)
+
+    def show_result(self, result):
+        score, total_questions = result
         QMessageBox.information(self, "Результат", f"Вы набрали {score} из {total_questions} баллов!")
 
-        # Запись результатов в файл
-        try:
-            with open(RESULTS_CSV, "a", encoding="utf-8", newline="") as file:
-                writer = csv.writer(file)
-                timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")  # Добавляем отметку времени
-                writer.writerow([self.current_user, self.selected_test, score, timestamp]) # Добавляем тест и время
-            print(f"Результат теста записан в {RESULTS_CSV}")
-        except Exception as e:
-            QMessageBox.warning(self, "Ошибка", f"Не удалось записать результат в файл: {str(e)}")
-
         self.tabs.removeTab(self.tabs.indexOf(self.test_tab))
+        self.session = None
         print(f"Тест завершен, результат: {score}/{total_questions}")
 
+    def submit_failed(self, e):
+        self.submit_button.setEnabled(True)
+        QMessageBox.warning(self, "Ошибка", f"Не удалось записать результат в файл: {str(e)}")
 
     def load_courses(self):
         """Загрузка доступных курсов для студента"""
-        try:
-            with open(COURSES_CSV, "r", encoding="utf-8") as file:
-                reader = csv.reader(file)
-                courses = [row[0] for row in reader if row]  # Загружаем только непустые строки
-                if not courses:
-                    self.courses_list.addItem("Нет доступных курсов!")
-                    return
-        except FileNotFoundError:
-            self.courses_list.addItem(f"Файл {COURSES_CSV} не найден!")
-            return
-        except Exception as e:
-            self.courses_list.addItem(
+        self.tasks.run(self.core.course_names, key="load_courses",
+                       on_done=self.show_courses, on_error=self.show_courses_error)
+
+    def show_courses_error(self, e):
+        if isinstance(e, FileNotFoundError):
+            self.courses_model.set_message(f"Файл {COURSES_CSV} не найден!")
+        else:
+            self.courses_model.set_message(
                 f"Ошибка при загрузке курсов: {str(e)}")
+
+    def show_courses(self, courses):
+        if not courses:
+            self.courses_model.set_message("Нет доступных курсов!")
             return
 
-        self.courses_list.clear()  # Очищаем список перед добавлением новых данных
-        for course in courses:
-            self.courses_list.addItem(course)  # Добавляем каждый курс в список
+        self.courses_model.set_items(courses)  # Вставляются только новые курсы
 
     def create_new_test(self):
         """Создание нового теста и добавление его в файл и список"""
@@ -437,28 +713,26 @@ class QuizApp(QMainWindow):
             self, "Новый тест", "Введите название нового теста:")
 
         if ok and test_name.strip():
-            # Добавляем новый тест в файл
-            with open(TESTS_CSV, "a", encoding="utf-8", newline="") as file:
-                writer = csv.writer(file)
-                writer.writerow(
-                    [test_name.strip(), "", ""])  # Сохраняем тест в формате CSV (например, пустые вопросы и ответы)
-
-
-            QMessageBox.information(
-                self, "Успех", f"Тест '{test_name.strip()}' успешно создан!")
+            # Добавляем новый тест в файл и получаем обновленный список тестов
+            self.tasks.run(self.create_test, test_name.strip(),
+                           on_done=lambda tests: self.test_created(test_name.strip(), tests),
+                           on_error=lambda e: QMessageBox.warning(
+                               self, "Ошибка", f"Не удалось создать тест: {e}"))
         else:
             QMessageBox.warning(self, "Ошибка", "Введите корректное название теста.")
 
+    def create_test(self, test_name):
+        """Регистрация теста (выполняется в фоне)"""
+        self.core.create_test(test_name)
+        return self.core.test_names()
 
-        # Обновляем список тестов в выпадающем списке
-        self.test_select.clear()
-        with open(TESTS_CSV, 'r', encoding='utf-8', newline='') as csvfile:
-            reader = csv.reader(csvfile)
-            tests = set()
-            for row in reader:
-                if row:  # Проверяем, что строка не пустая
-                    tests.add(row[0])
-            self.test_select.addItems(list(tests))
+    def test_created(self, test_name, tests):
+        QMessageBox.information(
+            self, "Успех", f"Тест '{test_name}' успешно создан!")
+
+        # Добавляем в выпадающий список только новый тест и выбираем его
+        self.tests_model.set_items(tests)
+        self.test_select.setCurrentText(test_name)
 
     def create_teacher_stats_tab(self):
         tab = QWidget()
@@ -520,7 +794,11 @@ class QuizApp(QMainWindow):
         self.test_list_label = QLabel("Доступные тесты:")
         layout.addWidget(self.test_list_label)
 
-        self.test_list = QListWidget()
+        tests_proxy = search_proxy(self.tests_model, self)
+        layout.addWidget(search_field(tests_proxy, "Поиск теста"))
+        self.test_list = QListView()
+        self.test_list.setModel(tests_proxy)
+        self.test_list.setUniformItemSizes(True)  # Высота строк не пересчитывается для тысяч тестов
         layout.addWidget(self.test_list)
 
         # Кнопка для начала теста
@@ -555,7 +833,11 @@ class QuizApp(QMainWindow):
         self.courses_list_label = QLabel("Доступные курсы:")
         layout.addWidget(self.courses_list_label)
 
-        self.courses_list = QListWidget()
+        courses_proxy = search_proxy(self.courses_model, self)
+        layout.addWidget(search_field(courses_proxy, "Поиск курса"))
+        self.courses_list = QListView()
+        self.courses_list.setModel(courses_proxy)
+        self.courses_list.setUniformItemSizes(True)
         layout.addWidget(self.courses_list)
 
         # Загружаем курсы при открытии вкладки
@@ -592,10 +874,12 @@ class QuizApp(QMainWindow):
 
         test_name = self.test_select.currentText()
 
-        with open(TESTS_CSV, "a", encoding="utf-8", newline="") as file:
-            writer = csv.writer(file)
-            writer.writerow([test_name, question, answer])
+        self.tasks.run(self.core.add_question, test_name, question, answer,
+                       on_done=self.question_saved,
+                       on_error=lambda e: QMessageBox.warning(
+                           self, "Ошибка", f"Не удалось добавить вопрос: {e}"))
 
+    def question_saved(self, _):
         QMessageBox.information(self, "Успех", "Вопрос добавлен!")
         self.add_question_input.clear()
         self.add_answer_input.clear()
@@ -642,121 +926,113 @@ class QuizApp(QMainWindow):
             QMessageBox.warning(self, "Ошибка", "Введите корректное значение DPI")
 
     def view_teacher_stats(self):
-        try:
-            with open(RESULTS_CSV, "r", encoding="utf-8") as file:
-                reader = csv.reader(file)
-                # next(reader)  # Не нужно пропускать заголовок, если его нет
-                results = [row for row in reader if row]  # Пропускаем пустые строки
-
-            if not results:
-                QMessageBox.information(self, "Статистика", "Нет данных для отображения.")
-                return
-
-            students = sorted(
-                list(set([row[0] for row in results])))  # Уникальные студенты, отсортированные по алфавиту
-
-            student_scores = {}
-            for student in students:
-                student_scores[student] = []  # Инициализируем список баллов для каждого студента
-
-            for row in results:
-                student = row[0]
-                try:
-                    score = int(row[2])  # Баллы теперь в третьем столбце
-                    student_scores[student].append(score)
-                except (ValueError, IndexError) as e:
-                    print(f"Ошибка в данных для студента {student}: {e}")  # Выводим ошибку в консоль для отладки
-                    continue  # Пропускаем некорректную строку
-
-            x = np.arange(len(students))
-            width = 0.5
-
-            fig, ax = plt.subplots()
-
-            for i, student in enumerate(students):
-                scores = student_scores[student]
-                if scores:  # Если есть баллы для студента
-                    ax.bar(x[i], np.mean(scores), width, label=student if i == 0 else "",
-                           color=plt.cm.get_cmap('hsv', len(students))(i))  # Разные цвета для каждого студента
-
-            ax.set_ylabel('Средний балл')
-            ax.set_title('Статистика по результатам тестов (средние баллы)')
-            ax.set_xticks(x)
-            ax.set_xticklabels(students, rotation=45, ha='right')
-            ax.legend()
-
-            fig.tight_layout()
-            plt.show()
-
-        except FileNotFoundError:
-            QMessageBox.warning(self, "Ошибка", f"Файл {RESULTS_CSV} не найден.")
-        except Exception as e:
-            QMessageBox.critical(self, "Ошибка", f"Произошла ошибка: {str(e)}")
+        self.tasks.run(self.render_teacher_stats, key="stats", with_task=True,
+                       on_done=self.show_stats, on_error=self.stats_failed,
+                       on_progress=self.show_progress)
 
     def view_student_stats(self):
+        self.tasks.run(self.render_student_stats, key="stats", with_task=True,
+                       on_done=self.show_stats, on_error=self.stats_failed,
+                       on_progress=self.show_progress)
+
+    @property
+    def chart_cache(self):
+        # charts тянет за собой matplotlib, импорт которого дольше всего
+        # остального запуска, поэтому он откладывается до первого графика
+        if self._chart_cache is None:
+            from charts import ChartCache
+            self._chart_cache = ChartCache()
+        return self._chart_cache
+
+    def render_teacher_stats(self, task):
+        """Подсчет статистики и отрисовка графика (выполняется в фоне)"""
+        student_means = self.core.teacher_stats(progress=task.report)
+        if not student_means:
+            return None
+        # График рисуется без интерактивного окна и берется из кэша, если данные не менялись
+        with metrics.span("ui.stats_render"):
+            return self.chart_cache.teacher_chart(student_means, dpi=self.dpi_value)
+
+    def render_student_stats(self, task):
+        test_means = self.core.student_stats(self.current_user, progress=task.report)
+        if not test_means:
+            return None
+        with metrics.span("ui.stats_render"):
+            return self.chart_cache.student_chart(self.current_user, test_means, dpi=self.dpi_value)
+
+    def show_stats(self, image):
+        self.statusBar().clearMessage()
+        if image is None:
+            QMessageBox.information(self, "Статистика", "Нет данных для отображения.")
+            return
+        self.stats_dialog = ChartDialog("Статистика", image)
         try:
-            with open(RESULTS_CSV, "r", encoding="utf-8") as file:
-                reader = csv.reader(file)
-                results = [row for row in reader if row and row[0] == self.current_user]  # Фильтруем результаты текущего студента, проверяем на пустые строки
-
-            if not results:
-                QMessageBox.information(self, "Статистика", "Нет данных для отображения.")
-                return
-
-            tests = [row[1] for row in results]  # Название теста
-            scores = [int(row[2]) for row in results]  # Баллы
-
-            x = np.arange(len(tests))
-            width = 0.5
-
-            fig, ax = plt.subplots()
-            rects = ax.bar(x, scores, width, label='Баллы')
-
-            ax.set_ylabel('Баллы')
-            ax.set_title(f'Результаты студента {self.current_user}')
-            ax.set_xticks(x)
-            ax.set_xticklabels(tests, rotation=45, ha='right')
-            ax.legend()
-
-            for rect in rects:
-                height = rect.get_height()
-                ax.annotate(f'{height}',
-                            xy=(rect.get_x() + rect.get_width() / 2, height),
-                            xytext=(0, 3),
-                            textcoords="offset points",
-                            ha='center', va='bottom')
-
-            fig.tight_layout()
-            plt.show()
+            self.stats_dialog.exec()
+        finally:
+            self.stats_dialog = None
+
+    def results_appended(self, rows):
+        """Перерисовывает открытый график; статистика дочитывает только новые результаты"""
+        dialog = self.stats_dialog
+        if dialog is None:
+            return
+        if self.role == "teacher":
+            render = self.render_teacher_stats
+        elif rows is None or any(row[0] == self.current_user for row in rows):
+            render = self.render_student_stats
+        else:
+            return  # Новые результаты других студентов
+        self.tasks.run(render, key="stats", with_task=True, on_done=dialog.set_image,
+                       on_error=lambda e: print(f"Не удалось обновить статистику: {e}"))
 
-        except FileNotFoundError:
+    def stats_failed(self, e):
+        self.statusBar().clearMessage()
+        if isinstance(e, FileNotFoundError):
             QMessageBox.warning(self, "Ошибка", f"Файл {RESULTS_CSV} не найден.")
-        except ValueError:
-            QMessageBox.warning(self, "Ошибка", "Неверный формат данных в файле результатов. Убедитесь, что баллы представлены числами.")
-        except IndexError:  # Обработка IndexError, если строка не содержит достаточно элементов
-            QMessageBox.warning(self, "Ошибка", "Неверный формат данных в файле результатов. Проверьте количество столбцов в каждой строке.")
-        except Exception as e:
+        else:
             QMessageBox.critical(self, "Ошибка", f"Произошла ошибка: {str(e)}")
 
-
     def create_course(self):
-        dialog = CreateCourseDialog()
+        dialog = CreateCourseDialog(self.core, self.tasks)
         dialog.exec()
 
+    def bulk_import(self):
+        dialog = ImportDialog(self.core, self.tasks)
+        if dialog.exec():
+            self.load_tests()  # Импорт мог добавить новые тесты
+
     def assign_students(self):
-        # Получаем список курсов и студентов
-        with open(COURSES_CSV, "r", encoding="utf-8") as file:
-            courses = [row[0] for row in csv.reader(file)]
+        # Получаем список курсов и студентов в фоне, затем открываем диалог
+        self.tasks.run(self.load_assign_data, key="assign_students",
+                       on_done=self.open_assign_dialog,
+                       on_error=lambda e: QMessageBox.warning(
+                           self, "Ошибка", f"Не удалось загрузить курсы и студентов: {e}"))
+
+    def load_assign_data(self):
+        return self.core.course_names(), self.core.students()
+
+    def open_assign_dialog(self, data):
+        courses, students = data
+        dialog = AssignStudentsDialog(self.core, self.tasks, courses, students)
+        dialog.exec()
 
-        with open(USER_CSV, "r", encoding="utf-8") as file:
-            students = [row[0] for row in csv.reader(
-                file) if row and row[1] == "student"]
+    def closeEvent(self, event):
+        if self.watcher is not None:
+            self.watcher.stop()
+        self.tasks.cancel_all()  # Незавершенные загрузки больше не нужны
+        self.io_pool.waitForDone()  # Начатая запись должна завершиться
+        self.core.close()  # Дописываем результаты, оставшиеся в буфере
+        super().closeEvent(event)
 
-        dialog = AssignStudentsDialog(courses, students)
-        dialog.exec()
+
+def main():
+    if METRICS_PORT:
+        metrics.serve(METRICS_PORT)
+    app = QApplication(sys.argv)
+    window = QuizApp()
+    window.show()
+    return app.exec_()
 
 
-app = QApplication(sys.argv)
-window = QuizApp()
-window.show()
-sys.exit(app.exec_())
\ No newline at end of file
+if __name__ == "__main__":
+    sys.exit(main())
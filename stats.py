@@ -0,0 +1,176 @@
+"""Накопленная статистика по результатам тестов.
+
+Для каждой пары (студент, тест) хранятся количество попыток, сумма, минимум,
+максимум баллов и время последней попытки. Агрегаты по студенту, тесту и
+курсу складываются из них. Статистика сохраняется в файл вместе с позицией в
+результатах, до которой она посчитана, поэтому после перезапуска дочитываются
+только новые результаты, а не вся история.
+"""
+import json
+import threading
+
+from storage import replace_file
+
+STATS_VERSION = 1
+
+# Через сколько результатов сообщать о ходе подсчета
+PROGRESS_STEP = 10000
+
+
+class Aggregate:
+    """Количество, сумма, минимум, максимум и время последней попытки"""
+
+    __slots__ = ("count", "total", "min", "max", "last")
+
+    def __init__(self, count=0, total=0, min=None, max=None, last=""):
+        self.count = count
+        self.total = total
+        self.min = min
+        self.max = max
+        self.last = last
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def add(self, score, timestamp=""):
+        self.count += 1
+        self.total += score
+        self.min = score if self.min is None else min(self.min, score)
+        self.max = score if self.max is None else max(self.max, score)
+        # Время в формате "ГГГГ-ММ-ДД ЧЧ:ММ:СС" сравнивается как строка
+        self.last = max(self.last, timestamp)
+
+    def merge(self, other):
+        if not other.count:
+            return
+        self.count += other.count
+        self.total += other.total
+        self.min = other.min if self.min is None else min(self.min, other.min)
+        self.max = other.max if self.max is None else max(self.max, other.max)
+        self.last = max(self.last, other.last)
+
+    def to_list(self):
+        return [self.count, self.total, self.min, self.max, self.last]
+
+    def __reduce__(self):
+        # Компактная сериализация для передачи частичных агрегатов между процессами
+        return Aggregate, (self.count, self.total, self.min, self.max, self.last)
+
+
+class ResultStats:
+    """Агрегаты результатов, обновляемые по мере добавления результатов"""
+
+    def __init__(self, storage, path=None):
+        self.storage = storage
+        self.path = path or storage.stats_path
+        self._lock = threading.Lock()
+        self._reset()
+        self._load()
+
+    def _reset(self):
+        self.cursor = None
+        self.by_student_test = {}  # (студент, тест) -> Aggregate
+        self.by_student = {}
+        self.by_test = {}
+        self.tests_by_student = {}  # студент -> тесты в порядке первой попытки
+
+    def _add(self, student, test, aggregate):
+        if (student, test) not in self.by_student_test:
+            self.by_student_test[(student, test)] = Aggregate()
+            self.tests_by_student.setdefault(student, []).append(test)
+        self.by_student_test[(student, test)].merge(aggregate)
+        self.by_student.setdefault(student, Aggregate()).merge(aggregate)
+        self.by_test.setdefault(test, Aggregate()).merge(aggregate)
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as file:
+                data = json.load(file)
+        except (FileNotFoundError, ValueError):
+            return
+        if data.get("version") != STATS_VERSION:
+            return
+        for student, test, *values in data["by_student_test"]:
+            self._add(student, test, Aggregate(*values))
+        self.cursor = data["cursor"]
+
+    def save(self):
+        data = {
+            "version": STATS_VERSION,
+            "cursor": self.cursor,
+            "by_student_test": [[student, test] + aggregate.to_list()
+                                for (student, test), aggregate in self.by_student_test.items()],
+        }
+        replace_file(self.path, json.dumps(data, ensure_ascii=False).encode("utf-8"))
+
+    def refresh(self, progress=None):
+        """Учитывает результаты, добавленные с прошлого обновления.
+
+        progress(сделано, всего) вызывается по ходу подсчета; если он
+        прерывает подсчет исключением, статистика остается прежней.
+        """
+        with self._lock:
+            if self.cursor is None and hasattr(self.storage, "aggregate_results"):
+                self._rebuild(progress)
+                return
+            results, cursor, restarted = self.storage.results_since(self.cursor)
+            if cursor == self.cursor:
+                return
+
+            # Новые результаты сначала собираются отдельно и применяются
+            # целиком, чтобы прерванный подсчет не учел их наполовину
+            delta = {}
+            skipped = 0
+            for i, result in enumerate(results):
+                if progress is not None and i % PROGRESS_STEP == 0:
+                    progress(i, len(results))
+                if result.score is None:
+                    skipped += 1  # Некорректная строка
+                    continue
+                key = (result.student, result.test)
+                if key not in delta:
+                    delta[key] = Aggregate()
+                delta[key].add(result.score, result.timestamp)
+            if skipped:
+                print(f"Ошибка в данных: пропущено строк без балла: {skipped}")
+
+            if restarted:
+                self._reset()  # Результаты переписаны, считаем заново
+            for (student, test), aggregate in delta.items():
+                self._add(student, test, aggregate)
+            self.cursor = cursor
+            self.save()
+
+    def _rebuild(self, progress=None):
+        """Первый подсчет по всему файлу результатов - параллельно по частям"""
+        from report import Report
+        report = Report(["student", "test"])
+        cursor = self.storage.aggregate_results(report, progress=progress)
+        if report.skipped:
+            print(f"Ошибка в данных: пропущено строк без балла: {report.skipped}")  # Некорректные строки
+
+        self._reset()
+        for (student, test), aggregate in report.groups.items():
+            self._add(student, test, aggregate)
+        self.cursor = cursor
+        self.save()
+
+    def student(self, student):
+        return self.by_student.get(student)
+
+    def test(self, test_name):
+        return self.by_test.get(test_name)
+
+    def student_tests(self, student):
+        """Агрегаты студента по каждому тесту"""
+        return [(test, self.by_student_test[(student, test)])
+                for test in self.tests_by_student.get(student, [])]
+
+    def course(self, course_name):
+        """Агрегат курса - сумма агрегатов закрепленных за ним студентов"""
+        total = Aggregate()
+        for student in self.storage.course_students(course_name):
+            if student in self.by_student:
+                total.merge(self.by_student[student])
+        return total
@@ -0,0 +1,740 @@
+"""Слой доступа к CSV-файлам данных.
+
+Каждый файл представлен отдельным репозиторием. Репозиторий читает файл один
+раз, хранит типизированные записи в памяти и перечитывает файл только тогда,
+когда у него изменились mtime или размер.
+"""
+import csv
+import io
+import itertools
+import json
+import os
+import tempfile
+import zlib
+from collections import namedtuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: блокировки между процессами нет
+    fcntl = None
+
+import metrics
+import mmap_scan
+import wal
+from row_index import RowIndex
+
+# password - соленый хеш пароля (user_directory.hash_password), пусто у старых строк
+User = namedtuple("User", "login role password", defaults=("",))
+Question = namedtuple("Question", "test question answer")
+# answers - ответы студента в виде JSON-массива (пусто у старых результатов)
+Result = namedtuple("Result", "student test score timestamp answers", defaults=("",))
+Course = namedtuple("Course", "name students")
+
+# Сколько первых байт файла результатов проверяется, чтобы заметить перезапись
+HEAD_SIZE = 4096
+
+# Размер части при копировании подготовленных строк в файл данных
+COPY_CHUNK = 1024 * 1024
+
+
+def file_stamp(path):
+    """Отпечаток файла (mtime, размер) или None, если файла нет"""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def encode_answers(answers):
+    """Ответы студента для пятого столбца results.csv"""
+    return json.dumps(list(answers), ensure_ascii=False) if answers is not None else ""
+
+
+def decode_answers(text):
+    """Список ответов из столбца answers или None, если ответы не сохранены"""
+    if not text:
+        return None
+    try:
+        answers = json.loads(text)
+    except ValueError:
+        return None
+    return [str(answer) for answer in answers] if isinstance(answers, list) else None
+
+
+def result_row(student, test_name, score, timestamp, answers=""):
+    """Строка results.csv; у результатов без ответов столбцов четыре, как раньше"""
+    row = [student, test_name, "" if score is None else score, timestamp]
+    return row + [answers] if answers else row
+
+
+def format_rows(rows):
+    """Строки CSV в том же формате, в каком их пишет csv.writer"""
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    return buffer.getvalue()
+
+
+def lock_file(fd):
+    """Исключительная рекомендательная блокировка файла до его закрытия"""
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+
+
+def open_locked(path):
+    """Дескриптор файла для дозаписи под блокировкой.
+
+    Если файл атомарно заменили (например, regrade.py), пока мы ждали
+    блокировку, открывается новый файл: иначе запись ушла бы в удаленный.
+    """
+    while True:
+        fd = os.open(path, os.O_RDWR | os.O_APPEND | os.O_CREAT | getattr(os, "O_BINARY", 0), 0o666)
+        lock_file(fd)
+        try:
+            if os.fstat(fd).st_ino == os.stat(path).st_ino:
+                return fd
+        except FileNotFoundError:
+            pass
+        os.close(fd)
+
+
+def append_rows(path, rows, fsync=False):
+    """Дописывает строки в конец файла одной операцией записи.
+
+    Запись идет под блокировкой файла, поэтому строки нескольких процессов
+    не перемешиваются. Если запись не удалась, файл обрезается до прежнего
+    размера: половина строки в нем не остается. Возвращает смещение, с
+    которого записаны строки.
+    """
+    data = format_rows(rows).encode("utf-8")
+    fd = open_locked(path)
+    try:
+        start = os.fstat(fd).st_size
+        # Если последняя строка файла не закончена, начинаем с новой строки,
+        # иначе первая запись склеится с последней строкой файла
+        if start > 0:
+            os.lseek(fd, start - 1, os.SEEK_SET)
+            if os.read(fd, 1) != b"\n":
+                data = b"\r\n" + data
+        write_logged(fd, path, start, data, fsync)
+        return start
+    finally:
+        os.close(fd)  # Закрытие файла снимает блокировку
+
+
+def append_file(path, source_path, fsync=False):
+    """Дописывает содержимое файла source_path в конец path одной операцией.
+
+    Работает как append_rows, но данные копируются из файла частями и не
+    держатся в памяти целиком. Возвращает смещение, с которого они записаны.
+    """
+    fd = open_locked(path)
+    try:
+        start = os.fstat(fd).st_size
+        prefix = b""
+        if start > 0:
+            os.lseek(fd, start - 1, os.SEEK_SET)
+            if os.read(fd, 1) != b"\n":
+                prefix = b"\r\n"
+        with open(source_path, "rb") as source:
+            chunks = itertools.chain([prefix], iter(lambda: source.read(COPY_CHUNK), b""))
+            write_logged(fd, path, start, chunks, fsync, source_path, prefix)
+        return start
+    finally:
+        os.close(fd)
+
+
+def write_logged(fd, path, start, data, fsync=False, source_path=None, prefix=b""):
+    """Дописывает в файл под блокировкой (позиция start) байты data или части
+    из итератора data, сначала внося их в журнал (wal.py).
+
+    Для частей из файла в журнал передается сам файл source_path с prefix.
+    При ошибке файл обрезается до start, а запись в журнале отменяется.
+    """
+    log = wal.journal_for(path)
+    inode = os.fstat(fd).st_ino
+    if log is not None:
+        if source_path is None:
+            number = log.log(path, inode, start, data)
+        else:
+            number = log.log_file(path, inode, start, source_path, prefix)
+        if fsync:
+            log.sync(number)  # Журнал на диске раньше файла данных
+    try:
+        for chunk in [data] if isinstance(data, bytes) else data:
+            if os.write(fd, chunk) != len(chunk):
+                raise OSError(f"Строки записаны в {path} не полностью")
+        if fsync and log is None:
+            os.fsync(fd)
+    except BaseException:
+        os.ftruncate(fd, start)
+        if log is not None:
+            log.abort(path, inode, start)
+        raise
+    if log is not None:
+        log.maybe_checkpoint()
+
+
+def replace_file(path, data):
+    """Атомарно заменяет содержимое файла байтами data или частями из итератора data.
+
+    Новая версия пишется во временный файл рядом, сбрасывается на диск и
+    переименовывается поверх старой: после сбоя остается либо старый файл,
+    либо новый целиком.
+    """
+    fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(path) + ".", suffix=".tmp",
+                                    dir=os.path.dirname(os.path.abspath(path)))
+    try:
+        with os.fdopen(fd, "wb") as file:
+            for chunk in [data] if isinstance(data, bytes) else data:
+                file.write(chunk)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    wal.sync_directory(os.path.dirname(os.path.abspath(path)))
+
+
+def sync_file(path):
+    """Сбрасывает записанные данные файла на диск"""
+    fd = os.open(path, os.O_RDONLY | getattr(os, "O_BINARY", 0))
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class CsvRepository:
+    """Базовый репозиторий: один объект на один CSV-файл"""
+
+    def __init__(self, path):
+        self.path = path
+        self._stamp = None
+        self._records = []
+
+    def parse_row(self, row):
+        """Преобразует строку CSV в запись или возвращает None"""
+        raise NotImplementedError
+
+    def _clear(self):
+        """Сброс индексов перед полной перезагрузкой"""
+        self._records = []
+
+    def _index(self, record):
+        """Добавление записи в индексы"""
+        self._records.append(record)
+
+    def _refresh(self):
+        stamp = file_stamp(self.path)
+        if stamp is None:
+            self._stamp = None
+            self._clear()
+            raise FileNotFoundError(self.path)
+        if stamp == self._stamp:
+            return
+
+        self._clear()
+        rows = 0
+        with open(self.path, "r", encoding="utf-8", newline="") as file:
+            for row in csv.reader(file):
+                if not row:  # Пропускаем пустые строки
+                    continue
+                rows += 1
+                record = self.parse_row(row)
+                if record is not None:
+                    self._index(record)
+        self._stamp = stamp
+        metrics.count("rows_scanned", rows)
+        metrics.count("bytes_read", stamp[1])
+
+    def stream(self):
+        """Записи по одной прямо из файла, без загрузки в кэш"""
+        rows = 0
+        try:
+            with open(self.path, "r", encoding="utf-8", newline="") as file:
+                for row in csv.reader(file):
+                    if row:
+                        rows += 1
+                        yield self.parse_row(row)
+        finally:
+            metrics.count("rows_scanned", rows)
+
+    def records(self):
+        self._refresh()
+        return self._records
+
+    def append(self, rows, fsync=False):
+        """Дописывает строки в файл и обновляет кэш без полного перечитывания"""
+        before = file_stamp(self.path)
+        start = append_rows(self.path, rows, fsync)
+        # Кэш актуален, только если между проверкой и записью файл не менялся
+        fresh = before is not None and before == self._stamp and start == before[1]
+
+        if fresh:
+            for row in rows:
+                record = self.parse_row([str(value) for value in row])
+                if record is not None:
+                    self._index(record)
+            self._stamp = file_stamp(self.path)
+        else:
+            self._stamp = None
+
+    def append_many(self, rows):
+        """Дописывает строки из итератора одной операцией, не держа их в памяти.
+
+        Строки сначала пишутся во временный файл рядом с файлом данных, а
+        затем целиком дописываются в него. Возвращает число строк.
+        """
+        staged_path = self.path + ".import.tmp"
+        count = 0
+        try:
+            with open(staged_path, "w", encoding="utf-8", newline="") as file:
+                writer = csv.writer(file)
+                for row in rows:
+                    writer.writerow(row)
+                    count += 1
+            if count:
+                append_file(self.path, staged_path)
+                self._stamp = None  # Файл будет перечитан при следующем обращении
+        finally:
+            if os.path.exists(staged_path):
+                os.remove(staged_path)
+        return count
+
+    def invalidate(self):
+        self._stamp = None
+
+
+class UserRepository(CsvRepository):
+    """users.csv: логин, роль и хеш пароля.
+
+    Пользователь при входе ищется через постоянный индекс users.csv.idx:
+    читается только его строка, а новые строки файла индексируются
+    дочитыванием хвоста. Смена пароля дописывает строку с тем же логином;
+    действует последняя строка пользователя.
+    """
+
+    def __init__(self, path):
+        super().__init__(path)
+        self.index = RowIndex(path)
+        self._found_stamp = None
+        self._found = {}  # логин -> User, найденные через индекс при этом состоянии файла
+
+    def _clear(self):
+        super()._clear()
+        self._by_login = {}
+
+    def parse_row(self, row):
+        if len(row) < 2:
+            return None
+        return User(row[0], row[1], row[2] if len(row) > 2 else "")
+
+    def _index(self, record):
+        super()._index(record)
+        self._by_login[record.login] = record
+
+    def get(self, login):
+        stamp = file_stamp(self.path)
+        if stamp is None:
+            raise FileNotFoundError(self.path)
+        if stamp != self._found_stamp:
+            self._found_stamp = stamp
+            self._found = {}
+        user = self._found.get(login)
+        if user is None:
+            rows = self.index.rows(login)  # Обычно одна строка, после смены пароля - несколько
+            metrics.count("rows_scanned", len(rows))
+            if not rows:
+                return None
+            user = self._found[login] = self.parse_row(rows[-1])
+        return user
+
+    def users(self):
+        """Все пользователи по одному разу, в порядке первого появления"""
+        self._refresh()
+        return list(self._by_login.values())
+
+    def students(self):
+        return [user.login for user in self.users() if user.role == "student"]
+
+    def append(self, rows, fsync=False):
+        super().append(rows, fsync)
+        self.index.sync()
+
+    def append_many(self, rows):
+        count = super().append_many(rows)
+        self.index.sync()
+        return count
+
+    def add_users(self, rows):
+        return self.append_many(rows)
+
+    def set_password(self, login, password_hash):
+        user = self.get(login)
+        if user is None:
+            raise KeyError(f"Нет пользователя {login}")
+        self.append([[user.login, user.role, password_hash]])
+
+
+class TestRepository(CsvRepository):
+    """tests.csv: название теста, вопрос, правильный ответ.
+
+    Вопросы теста читаются через постоянный индекс tests.csv.idx: при запуске
+    теста с диска читаются только строки этого теста, а не весь файл.
+    """
+
+    def __init__(self, path):
+        super().__init__(path)
+        self.index = RowIndex(path)
+        self._by_test = {}  # Кэш вопросов: тест -> (поколение индекса, число строк, вопросы)
+        self._names = {}  # Названия тестов в порядке появления
+        self._names_file = None  # inode файла и сколько байт уже разобрано
+        self._names_pos = 0
+
+    def parse_row(self, row):
+        test = row[0]
+        question = row[1] if len(row) > 1 else ""
+        answer = row[2] if len(row) > 2 else ""
+        return Question(test, question, answer)
+
+    def test_names(self):
+        """Названия тестов в порядке их появления в файле.
+
+        Весь файл разбирается csv.reader (полный разбор им быстрее, чем
+        mmap_scan.scan_keys, которому нужны еще и смещения строк для
+        индекса), потом дочитываются только дописанные строки.
+        """
+        with open(self.path, "rb") as file:
+            st = os.fstat(file.fileno())
+            if st.st_ino != self._names_file or st.st_size < self._names_pos:
+                self._names, self._names_file, self._names_pos = {}, st.st_ino, 0  # Файл переписан
+            if st.st_size == self._names_pos:
+                return list(self._names)
+            file.seek(self._names_pos)
+            data = file.read(st.st_size - self._names_pos)
+
+        rows = 0
+        for row in csv.reader(io.StringIO(data.decode("utf-8"), newline="")):
+            if row:
+                self._names.setdefault(row[0])
+                rows += 1
+        # Строка без перевода строки может быть дописана не до конца: ее
+        # разбираем снова в следующий раз, повтор названия ничего не меняет
+        self._names_pos += data.rfind(b"\n") + 1
+        metrics.count("rows_scanned", rows)
+        metrics.count("bytes_read", len(data))
+        return list(self._names)
+
+    def questions(self, test_name):
+        if file_stamp(self.path) is None:
+            raise FileNotFoundError(self.path)
+        count = self.index.count(test_name)
+        generation, cached_count, questions = self._by_test.get(test_name, (None, 0, []))
+        if generation != self.index.generation:
+            cached_count, questions = 0, []  # Файл переписан, читаем заново
+        if count > cached_count or generation != self.index.generation:
+            # Дочитываем только строки, добавленные после прошлого чтения
+            questions = list(questions)
+            rows = self.index.rows(test_name, cached_count)
+            for row in rows:
+                record = self.parse_row(row)
+                # Строка, созданная create_new_test, только регистрирует тест
+                if record.question or record.answer:
+                    questions.append(record)
+            metrics.count("rows_scanned", len(rows))
+            self._by_test[test_name] = (self.index.generation, count, questions)
+        return questions
+
+    def append(self, rows, fsync=False):
+        super().append(rows, fsync)
+        self.index.sync()  # Индексируем только что дописанные строки
+
+    def append_many(self, rows):
+        count = super().append_many(rows)
+        self.index.sync()
+        return count
+
+    def add_question(self, test_name, question, answer):
+        self.append([[test_name, question, answer]])
+
+    def add_questions(self, rows):
+        return self.append_many(rows)
+
+    def create_test(self, test_name):
+        self.append([[test_name, "", ""]])
+
+
+class ResultRepository(CsvRepository):
+    """results.csv: логин, тест, баллы и время прохождения"""
+
+    def _clear(self):
+        super()._clear()
+        self._by_student = {}
+
+    def parse_row(self, row):
+        try:
+            score = int(row[2])
+        except (ValueError, IndexError):
+            score = None  # Некорректная строка сохраняется, но без баллов
+        test = row[1] if len(row) > 1 else ""
+        timestamp = row[3] if len(row) > 3 else ""
+        answers = row[4] if len(row) > 4 else ""
+        return Result(row[0], test, score, timestamp, answers)
+
+    def _index(self, record):
+        super()._index(record)
+        self._by_student.setdefault(record.student, []).append(record)
+
+    def for_student(self, student):
+        if self._stamp is None or file_stamp(self.path) != self._stamp:
+            # Кэш не загружен или устарел: вместо разбора всего файла
+            # находим в нем только строки студента
+            if not os.path.exists(self.path):
+                raise FileNotFoundError(self.path)
+            rows = mmap_scan.read_rows(self.path, student)
+            metrics.count("rows_scanned", len(rows))
+            return [self.parse_row(row) for row in rows]
+        return self._by_student.get(student, [])
+
+    def add_result(self, student, test_name, score, timestamp, answers=""):
+        self.append([result_row(student, test_name, score, timestamp, answers)])
+
+    def read_since(self, cursor):
+        """Результаты, дописанные после позиции cursor.
+
+        Позиция - это смещение в байтах, контрольная сумма начала файла и
+        номер inode: если файл переписали или заменили новым, он читается с
+        начала. Возвращает результаты, новую позицию и признак того, что
+        чтение началось заново.
+        """
+        offset, head, inode = (list(cursor) + [None])[:3] if cursor else (0, 0, None)
+        restarted = False
+        with open(self.path, "rb") as file:
+            st = os.fstat(file.fileno())
+            size = st.st_size
+            if size < offset or zlib.crc32(file.read(min(offset, HEAD_SIZE))) != head or \
+                    inode not in (None, st.st_ino):
+                offset = 0
+                restarted = True
+            file.seek(offset)
+            data = file.read(size - offset)
+            # Неполная последняя строка будет дочитана в следующий раз
+            data = data[:data.rfind(b"\n") + 1]
+            offset += len(data)
+            file.seek(0)
+            head = zlib.crc32(file.read(min(offset, HEAD_SIZE)))
+
+        results = [self.parse_row(row) for row in csv.reader(io.StringIO(data.decode("utf-8"))) if row]
+        metrics.count("rows_scanned", len(results))
+        metrics.count("bytes_read", len(data))
+        return results, [offset, head, st.st_ino], restarted
+
+
+    def end_cursor(self):
+        """Позиция read_since после последней полной строки файла"""
+        with open(self.path, "rb") as file:
+            st = os.fstat(file.fileno())
+            offset = st.st_size
+            # Ищем последний перевод строки, читая файл с конца блоками
+            while offset > 0:
+                start = max(0, offset - HEAD_SIZE)
+                file.seek(start)
+                block = file.read(offset - start)
+                newline = block.rfind(b"\n")
+                if newline >= 0:
+                    offset = start + newline + 1
+                    break
+                offset = start
+            file.seek(0)
+            head = zlib.crc32(file.read(min(offset, HEAD_SIZE)))
+        return [offset, head, st.st_ino]
+
+
+class SettingsRepository(CsvRepository):
+    """settings.csv: пары ключ-значение"""
+
+    def _clear(self):
+        super()._clear()
+        self._values = {}
+
+    def parse_row(self, row):
+        if len(row) < 2:
+            return None
+        return row[0], row[1]
+
+    def _index(self, record):
+        super()._index(record)
+        self._values[record[0]] = record[1]
+
+    def get(self, key, default=None):
+        try:
+            self._refresh()
+        except FileNotFoundError:
+            return default
+        return self._values.get(key, default)
+
+    def set(self, key, value):
+        """Сохраняет значение, не затирая остальные настройки.
+
+        Файл переписывается атомарно (replace_file) под блокировкой, чтобы
+        одновременная запись из другого процесса не потеряла его значение.
+        """
+        fd = open_locked(self.path)
+        try:
+            self._stamp = None
+            self._refresh()  # Под блокировкой - значения других процессов
+            values = dict(self._values)
+            values[key] = value
+            replace_file(self.path, format_rows(values.items()).encode("utf-8"))
+        finally:
+            os.close(fd)
+        self._stamp = None
+
+
+class CsvStorage:
+    """Хранилище на CSV-файлах.
+
+    Общий интерфейс хранилища, который использует QuizApp; те же методы
+    реализует SqliteStorage (sqlite_storage.py).
+    """
+
+    def __init__(self, users_path, tests_path, results_path, courses_path, settings_path,
+                 sink_options=None):
+        # Записи, прерванные сбоем прошлого запуска, дописываются из журнала
+        self.data_paths = [users_path, tests_path, results_path, courses_path, settings_path]
+        recovered = wal.recover(self.data_paths)
+        if recovered:
+            print(f"Восстановлено из журнала записей: {recovered}")
+        self.users = UserRepository(users_path)
+        self.tests = TestRepository(tests_path)
+        if results_path.endswith(".bin"):
+            from result_log import ResultLog  # result_log импортирует этот модуль
+            self.results = ResultLog(results_path)
+        else:
+            self.results = ResultRepository(results_path)
+        from result_sink import ResultSink  # result_sink импортирует этот модуль
+        # Результаты дописываются пачками; чтение сначала сбрасывает буфер
+        self.result_sink = ResultSink(self.results, **(sink_options or {}))
+        from enrollment import EnrollmentStore  # enrollment импортирует этот модуль
+        self.courses = EnrollmentStore(courses_path)
+        self.settings = SettingsRepository(settings_path)
+        self.stats_path = results_path + ".stats.json"
+
+    # Пользователи
+    def user(self, login):
+        return self.users.get(login)
+
+    def all_users(self):
+        return self.users.users()
+
+    def students(self):
+        return self.users.students()
+
+    def add_users(self, rows):
+        """Добавляет пользователей (логин, роль[, хеш пароля]) из итератора; возвращает их число"""
+        return self.users.add_users(rows)
+
+    def set_password(self, login, password_hash):
+        self.users.set_password(login, password_hash)
+
+    # Тесты и вопросы
+    def test_names(self):
+        return self.tests.test_names()
+
+    def questions(self, test_name):
+        return self.tests.questions(test_name)
+
+    def iter_questions(self):
+        """Вопросы всех тестов по одному в порядке записи, мимо кэша вопросов"""
+        return (question for question in self.tests.stream() if question.question or question.answer)
+
+    def add_question(self, test_name, question, answer):
+        self.tests.add_question(test_name, question, answer)
+
+    def add_questions(self, rows):
+        """Добавляет вопросы (тест, вопрос, ответ) из итератора; возвращает их число"""
+        return self.tests.add_questions(rows)
+
+    def create_test(self, test_name):
+        self.tests.create_test(test_name)
+
+    # Результаты
+    def all_results(self):
+        with self.result_sink.flushed():
+            return list(self.results.records())
+
+    def results_for_student(self, student):
+        with self.result_sink.flushed():
+            return list(self.results.for_student(student))
+
+    def add_result(self, student, test_name, score, timestamp, answers=None):
+        """Записывает результат вместе с ответами студента (для перепроверки)"""
+        self.result_sink.add(student, test_name, score, timestamp, encode_answers(answers))
+
+    def results_since(self, cursor):
+        with self.result_sink.flushed():
+            return self.results.read_since(cursor)
+
+    def iter_results(self):
+        """Результаты по одному в порядке записи; память не зависит от размера файла"""
+        self.result_sink.flush()
+        return self.results.stream()
+
+    def aggregate_results(self, report, filters=None, workers=None, progress=None):
+        """Учитывает в отчете report все результаты, разбирая файл по частям в
+        нескольких процессах; возвращает позицию для results_since"""
+        from chunked import parallel_report
+        from report import Filters
+        with self.result_sink.flushed():
+            cursor = self.results.end_cursor()
+            if isinstance(self.results, ResultRepository):
+                parallel_report(self.results.path, filters or Filters(), report, workers, cursor[0], progress)
+            else:
+                # Двоичный журнал не разбирается как текст, и процессы ему не нужны
+                self.results.aggregate(report, filters or Filters(), cursor[0])
+        return cursor
+
+    # Курсы
+    def course_names(self):
+        return self.courses.names()
+
+    def course_students(self, course_name):
+        return self.courses.students(course_name)
+
+    def create_course(self, course_name):
+        self.courses.create_course(course_name)
+
+    def enroll(self, course_name, students):
+        self.courses.enroll(course_name, students)
+
+    # Настройки
+    def get_setting(self, key, default=None):
+        return self.settings.get(key, default)
+
+    def set_setting(self, key, value):
+        self.settings.set(key, value)
+
+    def close(self):
+        """Записывает результаты, оставшиеся в буфере, и очищает журнал записи"""
+        self.result_sink.close()
+        for path in self.data_paths:
+            log = wal.journal_for(path)
+            if log is not None:
+                log.checkpoint()
+
+
+def open_storage(data_dir=".", db_path=None):
+    """Хранилище для утилит командной строки: база SQLite или CSV-файлы каталога.
+
+    Файл результатов можно заменить двоичным журналом (result_log.py),
+    задав его имя в переменной окружения QUIZ_RESULTS, например results.bin.
+    """
+    if db_path:
+        from sqlite_storage import SqliteStorage
+        return SqliteStorage(db_path)
+    results_name = os.environ.get("QUIZ_RESULTS", "results.csv")
+    return CsvStorage(*(os.path.join(data_dir, name) for name in
+                        ("users.csv", "tests.csv", results_name, "courses.csv", "settings.csv")))
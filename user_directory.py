@@ -0,0 +1,159 @@
+"""Вход по паролю и кэш сеансов.
+
+Пароль хранится в третьем столбце users.csv (или в таблице users базы) как
+соленый хеш PBKDF2-SHA256 вида "pbkdf2_sha256$итерации$соль$хеш". Число
+итераций записано в самом хеше, поэтому его можно увеличить
+(QUIZ_KDF_ITERATIONS) без пересчета уже сохраненных паролей.
+
+Проверка хеша намеренно медленная, поэтому ее результат запоминается:
+повторный вход с тем же паролем в этом процессе сверяется с HMAC пароля на
+случайном ключе процесса, без KDF. Успешный вход выдает токен сеанса, по
+которому клиент возвращается в систему (resume) без пароля, пока сеанс не
+истек и пароль не сменили.
+
+У пользователя без пароля (старая строка users.csv без хеша, импорт без
+столбца password) пароль, введенный при первом входе, становится его
+паролем. Без пароля такой пользователь не входит; пароль можно задать и
+заранее:
+
+    python user_directory.py set-password student1 --data-dir .
+
+Прежний вход по одному логину включается явно, QUIZ_ALLOW_NO_PASSWORD=1
+(например, для учебной копии без паролей).
+"""
+import argparse
+import getpass
+import hashlib
+import hmac
+import os
+import secrets
+import threading
+import time
+
+from storage import open_storage
+
+SCHEME = "pbkdf2_sha256"
+KDF_ITERATIONS = int(os.environ.get("QUIZ_KDF_ITERATIONS", 200000))
+SALT_BYTES = 16
+
+ALLOW_NO_PASSWORD = os.environ.get("QUIZ_ALLOW_NO_PASSWORD", "") == "1"
+
+# Время жизни сеанса в секундах
+SESSION_TTL = 12 * 3600
+
+# При таком числе сеансов из кэша убираются истекшие
+SWEEP_SESSIONS = 10000
+
+
+def hash_password(password, iterations=KDF_ITERATIONS, salt=None):
+    salt = salt or secrets.token_bytes(SALT_BYTES)
+    digest = hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt, iterations)
+    return f"{SCHEME}${iterations}${salt.hex()}${digest.hex()}"
+
+
+def verify_password(password, password_hash):
+    """Совпадает ли пароль с хешем; хеш в неизвестном формате не совпадает ни с чем"""
+    try:
+        scheme, iterations, salt, digest = password_hash.split("$")
+        if scheme != SCHEME:
+            return False
+        expected = hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), bytes.fromhex(salt), int(iterations))
+    except ValueError:
+        return False
+    return hmac.compare_digest(expected.hex(), digest)
+
+
+class UserDirectory:
+    """Проверка входа над хранилищем (метод user) с кэшем проверок и сеансов"""
+
+    def __init__(self, storage, allow_no_password=ALLOW_NO_PASSWORD, session_ttl=SESSION_TTL):
+        self.storage = storage
+        self.allow_no_password = allow_no_password
+        self.session_ttl = session_ttl
+        self._lock = threading.Lock()
+        self._key = secrets.token_bytes(32)  # Ключ HMAC проверенных паролей, только в памяти
+        self._verified = {}  # логин -> (хеш пароля, HMAC проверенного пароля)
+        self._sessions = {}  # токен -> (логин, роль, хеш пароля, срок действия)
+
+    def _check(self, user, password):
+        if not user.password:
+            return self.allow_no_password  # Пароль не задан
+        mac = hmac.new(self._key, password.encode("utf-8"), hashlib.sha256).digest()
+        with self._lock:
+            cached = self._verified.get(user.login)
+        if cached is not None and cached[0] == user.password and hmac.compare_digest(cached[1], mac):
+            return True
+        if not verify_password(password, user.password):
+            return False
+        with self._lock:
+            self._verified[user.login] = (user.password, mac)
+        return True
+
+    def authenticate(self, login, role, password=""):
+        """Токен нового сеанса или None, если логин, роль или пароль неверны"""
+        user = self.storage.user(login)
+        if user is None or user.role != role:
+            return None
+        if not user.password and password:
+            # Переход со старых строк без пароля: первый введенный пароль сохраняется
+            self.set_password(login, password)
+            print(f"Пользователю {login} задан пароль при первом входе")
+            user = self.storage.user(login)
+        elif not self._check(user, password or ""):
+            return None
+        token = secrets.token_urlsafe(24)
+        now = time.monotonic()
+        with self._lock:
+            if len(self._sessions) >= SWEEP_SESSIONS:
+                self._sessions = {key: session for key, session in self._sessions.items() if session[3] > now}
+            self._sessions[token] = (user.login, user.role, user.password, now + self.session_ttl)
+        return token
+
+    def resume(self, token):
+        """[логин, роль] действующего сеанса или None"""
+        with self._lock:
+            session = self._sessions.get(token)
+        if session is None:
+            return None
+        login, role, password_hash, expires = session
+        user = self.storage.user(login)
+        if time.monotonic() > expires or user is None or (user.role, user.password) != (role, password_hash):
+            self.logout(token)  # Сеанс истек, пользователя удалили или сменили пароль
+            return None
+        return [login, role]
+
+    def logout(self, token):
+        with self._lock:
+            self._sessions.pop(token, None)
+
+    def set_password(self, login, password):
+        self.storage.set_password(login, hash_password(password))
+        with self._lock:
+            self._verified.pop(login, None)
+            self._sessions = {key: session for key, session in self._sessions.items() if session[0] != login}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Пароли пользователей")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    set_parser = subparsers.add_parser("set-password", help="Задать пароль пользователю")
+    set_parser.add_argument("login")
+    set_parser.add_argument("--data-dir", default=".", help="Каталог с CSV-файлами")
+    set_parser.add_argument("--db", default=os.environ.get("QUIZ_DB", ""), help="База SQLite вместо CSV")
+    args = parser.parse_args()
+
+    password = getpass.getpass("Новый пароль: ")
+    if password != getpass.getpass("Повторите пароль: "):
+        parser.error("пароли не совпадают")
+    storage = open_storage(args.data_dir, args.db)
+    try:
+        UserDirectory(storage).set_password(args.login, password)
+    except KeyError as e:
+        parser.error(str(e.args[0]))
+    finally:
+        storage.close()
+    print(f"Пароль пользователя {args.login} изменен")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,422 @@
+"""Журнал упреждающей записи (WAL) для дописываемых файлов данных.
+
+Перед тем как дописать байты в файл данных (storage.append_rows,
+append_file, ResultLog.append), они записываются в журнал quiz.wal в
+каталоге этого файла вместе с именем файла, его inode и смещением, с
+которого пишутся. Если процесс или система упали посреди записи, при
+следующем открытии хранилища журнал проигрывается (recover): запись,
+которой в файле нет, дописывается, оборванная - дописывается до конца, уже
+сделанная пропускается. Проигрывать журнал можно сколько угодно раз, а
+время восстановления зависит от размера журнала, а не файлов данных.
+
+Запись с fsync (политика batch у ResultSink) сначала сбрасывает на диск
+журнал, потом пишет файл данных; потоки, ждущие fsync одновременно,
+обходятся одним вызовом (групповая фиксация). Сами файлы данных
+сбрасываются на диск в контрольной точке (checkpoint): в фоне, когда журнал
+вырос больше CHECKPOINT_BYTES, и при закрытии хранилища.
+
+У заголовка записи своя контрольная сумма, поэтому контрольная точка
+читает только заголовки и перескакивает через данные, а восстановление
+читает по частям только данные записей, которые нужно дописать. После
+контрольной точки журнал заменяется новым файлом, в который переносятся
+записи, появившиеся за время контрольной точки, так что журнал сокращается
+и при постоянной записи. Остатки записи, оборванной сбоем, при этом
+отбрасываются: поиск записей продолжается со следующей сигнатуры MAGIC.
+
+Журнал отключается переменной окружения QUIZ_WAL=0.
+"""
+import os
+import struct
+import tempfile
+import threading
+import zlib
+
+try:
+    import fcntl
+except ImportError:  # Windows: блокировки между процессами нет
+    fcntl = None
+
+WAL_NAME = "quiz.wal"
+ENABLED = os.environ.get("QUIZ_WAL", "1") != "0"
+
+# После такого размера журнала в фоне выполняется контрольная точка
+CHECKPOINT_BYTES = 4 * 1024 * 1024
+
+# Размер части при копировании данных в журнал и из него
+COPY_CHUNK = 1024 * 1024
+
+# Сигнатура, crc32 остатка заголовка и имени, crc32 данных, вид, inode
+# файла, смещение, длина имени, длина данных
+MAGIC = b"QWAL"
+HEADER = struct.Struct("<4sIIBQQHQ")
+CHECKED = 12  # С этого байта заголовок входит в его контрольную сумму
+WRITE = 1  # Байты, дописываемые в файл
+ABORT = 2  # Запись не удалась, файл обрезан обратно
+
+_logs = {}
+_logs_lock = threading.Lock()
+
+
+def _lock(fd):
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+
+
+def _unlock(fd):
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+
+
+def sync_directory(path):
+    """Сбрасывает на диск запись каталога (переименование файла в нем)"""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return  # Windows: каталог так не открыть
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _header(kind, inode, offset, name, length, data_crc):
+    rest = HEADER.pack(MAGIC, 0, data_crc, kind, inode, offset, len(name), length)[CHECKED:]
+    crc = zlib.crc32(name, zlib.crc32(rest))
+    return HEADER.pack(MAGIC, crc, data_crc, kind, inode, offset, len(name), length) + name
+
+
+def _chunks(file, position, length):
+    """Части данных файла длиной length с позиции position"""
+    file.seek(position)
+    while length > 0:
+        chunk = file.read(min(length, COPY_CHUNK))
+        if not chunk:
+            return
+        length -= len(chunk)
+        yield chunk
+
+
+class Record:
+    """Заголовок записи журнала; данные лежат в журнале с позиции data_pos"""
+
+    __slots__ = ("kind", "inode", "offset", "name", "data_pos", "length", "data_crc")
+
+    def __init__(self, kind, inode, offset, name, data_pos, length, data_crc):
+        self.kind = kind
+        self.inode = inode
+        self.offset = offset
+        self.name = name
+        self.data_pos = data_pos
+        self.length = length
+        self.data_crc = data_crc
+
+    @property
+    def key(self):
+        return self.inode, self.offset, self.name
+
+    @property
+    def end(self):
+        return self.data_pos + self.length
+
+
+def scan(file, start=0):
+    """Заголовки целых записей журнала от start и позиция после последней из них.
+
+    Данные записей не читаются. Испорченный или оборванный кусок
+    пропускается до следующей сигнатуры MAGIC.
+    """
+    size = os.fstat(file.fileno()).st_size
+    records = []
+    position = end = start
+    while position + HEADER.size <= size:
+        file.seek(position)
+        header = file.read(HEADER.size)
+        magic, crc, data_crc, kind, inode, offset, name_length, length = HEADER.unpack(header)
+        name = file.read(name_length)
+        data_pos = position + HEADER.size + name_length
+        if magic != MAGIC or len(name) < name_length or \
+                zlib.crc32(name, zlib.crc32(header[CHECKED:])) != crc or kind not in (WRITE, ABORT):
+            position = _next_magic(file, position + 1, size)
+            continue
+        if data_pos + length > size:
+            break  # Последняя запись оборвана
+        records.append(Record(kind, inode, offset, name.decode("utf-8"), data_pos, length, data_crc))
+        position = end = data_pos + length
+    return records, end
+
+
+def _next_magic(file, position, size):
+    """Позиция следующей сигнатуры MAGIC или size"""
+    while position < size:
+        file.seek(position)
+        chunk = file.read(COPY_CHUNK + len(MAGIC) - 1)
+        found = chunk.find(MAGIC)
+        if found >= 0:
+            return position + found
+        position += COPY_CHUNK
+    return size
+
+
+def _data_valid(file, record):
+    crc = 0
+    for chunk in _chunks(file, record.data_pos, record.length):
+        crc = zlib.crc32(chunk, crc)
+    return crc == record.data_crc
+
+
+class WriteAheadLog:
+    """Журнал дозаписей файлов одного каталога"""
+
+    def __init__(self, path):
+        self.path = path
+        self.directory = os.path.dirname(path)
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._fd = self._open()
+        self._written = 0  # Номер последней записи этого процесса
+        self._synced = 0  # До какого номера записи журнал сброшен на диск
+        self._checkpointing = False
+
+    def _open(self):
+        return os.open(self.path, os.O_RDWR | os.O_APPEND | os.O_CREAT | getattr(os, "O_BINARY", 0), 0o666)
+
+    def _lock_current(self):
+        """Блокирует журнал; если его заменила контрольная точка, открывает новый файл.
+
+        Вызывается под self._lock.
+        """
+        while True:
+            _lock(self._fd)
+            try:
+                if os.stat(self.path).st_ino == os.fstat(self._fd).st_ino:
+                    return
+            except FileNotFoundError:
+                pass
+            _unlock(self._fd)
+            os.close(self._fd)
+            self._fd = self._open()
+
+    # Запись
+    def _append(self, chunks):
+        """Пишет части записи подряд под блокировкой журнала; возвращает номер записи"""
+        with self._lock:
+            self._lock_current()
+            try:
+                start = os.fstat(self._fd).st_size
+                try:
+                    for chunk in chunks:
+                        if os.write(self._fd, chunk) != len(chunk):
+                            raise OSError(f"Запись в {self.path} не полная")
+                except BaseException:
+                    os.ftruncate(self._fd, start)
+                    raise
+            finally:
+                _unlock(self._fd)
+            self._written += 1
+            return self._written
+
+    def log(self, path, inode, offset, data, kind=WRITE):
+        """Записывает в журнал байты data, дописываемые в path с позиции offset"""
+        name = os.path.basename(path).encode("utf-8")
+        return self._append([_header(kind, inode, offset, name, len(data), zlib.crc32(data)), data])
+
+    def log_file(self, path, inode, offset, source_path, prefix=b""):
+        """Как log, но данные - prefix и содержимое файла source_path"""
+        name = os.path.basename(path).encode("utf-8")
+        length = len(prefix) + os.path.getsize(source_path)
+        crc = zlib.crc32(prefix)
+        with open(source_path, "rb") as source:
+            for chunk in iter(lambda: source.read(COPY_CHUNK), b""):
+                crc = zlib.crc32(chunk, crc)
+
+        def chunks():
+            yield _header(WRITE, inode, offset, name, length, crc) + prefix
+            with open(source_path, "rb") as source:
+                yield from iter(lambda: source.read(COPY_CHUNK), b"")
+        return self._append(chunks())
+
+    def abort(self, path, inode, offset):
+        self.log(path, inode, offset, b"", ABORT)
+
+    def sync(self, number):
+        """Сбрасывает журнал на диск не меньше чем до записи number.
+
+        Поток, пришедший, пока другой выполняет fsync, ждет его и часто
+        обнаруживает, что его запись уже сброшена. Если журнал тем временем
+        заменили, записи старого уже на диске (см. checkpoint).
+        """
+        with self._sync_lock:
+            if self._synced >= number:
+                return
+            with self._lock:  # Контрольная точка может закрыть self._fd
+                target = self._written
+                fd = os.dup(self._fd)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+            self._synced = target
+
+    def size(self):
+        try:
+            return os.path.getsize(self.path)
+        except FileNotFoundError:
+            return 0
+
+    # Чтение и восстановление
+    def _open_data(self, name, inode):
+        """Дескриптор файла данных под блокировкой или None, если файл заменили"""
+        path = os.path.join(self.directory, name)
+        try:
+            fd = os.open(path, os.O_RDWR | os.O_APPEND | getattr(os, "O_BINARY", 0))
+        except FileNotFoundError:
+            return None
+        _lock(fd)
+        if os.fstat(fd).st_ino != inode:
+            os.close(fd)  # Файл атомарно заменен, его содержимое уже учитывает запись
+            return None
+        return fd
+
+    @staticmethod
+    def _apply(file, fd, record):
+        """Дописывает недостающую часть данных записи; True, если что-то дописано"""
+        size = os.fstat(fd).st_size
+        written = size - record.offset
+        if written < 0 or written >= record.length:
+            return False  # Файл обрезан или запись в нем уже есть
+        if not _data_valid(file, record):
+            return False  # Данные записи в журнале испорчены
+        # Начало записи в файле должно совпадать с журналом, иначе там другие данные
+        os.lseek(fd, record.offset, os.SEEK_SET)
+        for chunk in _chunks(file, record.data_pos, written):
+            if os.read(fd, len(chunk)) != chunk:
+                return False
+        for chunk in _chunks(file, record.data_pos + written, record.length - written):
+            os.write(fd, chunk)
+        return True
+
+    @staticmethod
+    def _collect(records, pending):
+        """Заносит в pending записи WRITE по ключу (inode, смещение, имя);
+        запись ABORT отменяет предыдущую запись с тем же ключом"""
+        for record in records:
+            if record.kind == WRITE:
+                pending[record.key] = record
+            else:
+                pending.pop(record.key, None)
+
+    def recover(self):
+        """Проигрывает журнал; возвращает число дописанных записей"""
+        with open(self.path, "rb") as file:
+            records, end = scan(file)
+            if not records:
+                return 0
+            pending = {}
+            self._collect(records, pending)
+            applied = 0
+            for key in list(pending):
+                inode, offset, name = key
+                fd = self._open_data(name, inode)
+                if fd is None:
+                    continue
+                try:
+                    # Пока ждали файл, писатель мог отметить неудачу своей записи
+                    more, end = scan(file, end)
+                    self._collect(more, pending)
+                    record = pending.get(key)
+                    if record is not None and self._apply(file, fd, record):
+                        applied += 1
+                finally:
+                    os.close(fd)
+        self.checkpoint()  # Сбрасывает дописанное на диск
+        return applied
+
+    def checkpoint(self):
+        """Сбрасывает на диск файлы из журнала и сокращает журнал"""
+        with open(self.path, "rb") as file:
+            inode = os.fstat(file.fileno()).st_ino
+            records, end = scan(file)
+        if end == 0 and self.size() == 0:
+            return
+        for name, data_inode in {(record.name, record.inode) for record in records}:
+            # Блокировка файла дожидается писателя, который уже внес запись в журнал
+            fd = self._open_data(name, data_inode)
+            if fd is not None:
+                try:
+                    os.fsync(fd)
+                finally:
+                    os.close(fd)
+        self._cut(inode, end)
+
+    def _cut(self, inode, end):
+        """Заменяет журнал файлом с записями, дописанными после позиции end.
+
+        Если журнал уже заменили (inode другой), ничего не делает: те записи
+        учла контрольная точка, которая его заменила.
+        """
+        with self._lock:
+            self._lock_current()
+            try:
+                if os.fstat(self._fd).st_ino != inode:
+                    return
+                with open(self.path, "rb") as file:
+                    records, _ = scan(file, end)  # Под блокировкой оборванная запись - остаток сбоя
+                    fd, tmp_path = tempfile.mkstemp(prefix=WAL_NAME + ".", suffix=".tmp", dir=self.directory)
+                    try:
+                        with os.fdopen(fd, "wb") as tail:
+                            for record in records:
+                                header = record.data_pos - HEADER.size - len(record.name.encode("utf-8"))
+                                for chunk in _chunks(file, header, record.end - header):
+                                    tail.write(chunk)
+                            tail.flush()
+                            os.fsync(tail.fileno())
+                        os.replace(tmp_path, self.path)
+                    except BaseException:
+                        if os.path.exists(tmp_path):
+                            os.remove(tmp_path)
+                        raise
+                sync_directory(self.directory)
+            finally:
+                _unlock(self._fd)
+            # Свои следующие записи - уже в новый файл
+            os.close(self._fd)
+            self._fd = self._open()
+
+    def maybe_checkpoint(self):
+        """Запускает контрольную точку в фоне, если журнал вырос"""
+        with self._lock:
+            if self._checkpointing or self.size() < CHECKPOINT_BYTES:
+                return
+            self._checkpointing = True
+        threading.Thread(target=self._checkpoint_in_background, daemon=True).start()
+
+    def _checkpoint_in_background(self):
+        try:
+            self.checkpoint()
+        except OSError as e:
+            print(f"Не удалось выполнить контрольную точку журнала: {e}")
+        finally:
+            self._checkpointing = False
+
+
+def journal_for(path):
+    """Журнал каталога файла данных или None, если журнал отключен"""
+    if not ENABLED:
+        return None
+    directory = os.path.dirname(os.path.abspath(path))
+    with _logs_lock:
+        log = _logs.get(directory)
+        if log is None:
+            log = _logs[directory] = WriteAheadLog(os.path.join(directory, WAL_NAME))
+        return log
+
+
+def recover(paths):
+    """Проигрывает журналы каталогов файлов paths; возвращает число дописанных записей"""
+    if not ENABLED:
+        return 0
+    directories = {os.path.dirname(os.path.abspath(path)) for path in paths}
+    return sum(journal_for(os.path.join(directory, WAL_NAME)).recover() for directory in sorted(directories)
+               if os.path.exists(os.path.join(directory, WAL_NAME)))
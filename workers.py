@@ -0,0 +1,106 @@
+"""Фоновое выполнение операций с файлами данных.
+
+Чтение и запись файлов выполняются в пуле потоков Qt, чтобы окно не
+зависало на медленном диске. Результат, ошибка и ход выполнения
+возвращаются в главный поток сигналами.
+"""
+import threading
+
+from PyQt5.QtCore import QObject, QRunnable, pyqtSignal
+
+
+class TaskCancelled(Exception):
+    """Задача отменена до завершения"""
+
+
+class TaskSignals(QObject):
+    finished = pyqtSignal(object)  # Результат функции
+    failed = pyqtSignal(object)  # Исключение
+    progress = pyqtSignal(int, int)  # Сделано, всего
+    done = pyqtSignal()  # Задача завершилась любым образом
+
+
+class Task(QRunnable):
+    """Функция, выполняемая в пуле потоков.
+
+    Если функция принимает аргумент task, ей передается сама задача: через
+    task.report() она сообщает о ходе выполнения и узнает об отмене.
+    """
+
+    def __init__(self, function, *args, with_task=False, **kwargs):
+        super().__init__()
+        self.function = function
+        self.args = args
+        self.kwargs = kwargs
+        if with_task:
+            self.kwargs["task"] = self
+        self.signals = TaskSignals()
+        self._cancelled = threading.Event()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def report(self, done, total):
+        """Сообщает о ходе выполнения; прерывает задачу, если она отменена"""
+        if self.cancelled:
+            raise TaskCancelled()
+        self.signals.progress.emit(done, total)
+
+    def run(self):
+        try:
+            if self.cancelled:
+                return
+            result = self.function(*self.args, **self.kwargs)
+        except TaskCancelled:
+            return
+        except Exception as e:
+            if not self.cancelled:
+                self.signals.failed.emit(e)
+        else:
+            if not self.cancelled:
+                self.signals.finished.emit(result)
+        finally:
+            self.signals.done.emit()
+
+
+class TaskRunner:
+    """Запуск задач в пуле с отменой предыдущей задачи того же вида"""
+
+    def __init__(self, pool):
+        self.pool = pool
+        self._tasks = {}  # Задачи держим до завершения, иначе их сигналы удалит сборщик мусора
+        self._by_key = {}
+
+    def run(self, function, *args, key=None, on_done=None, on_error=None, on_progress=None,
+            with_task=False, **kwargs):
+        if key is not None and key in self._by_key:
+            self._by_key[key].cancel()  # Результат устаревшей загрузки уже не нужен
+
+        task = Task(function, *args, with_task=with_task, **kwargs)
+        if on_done is not None:
+            task.signals.finished.connect(on_done)
+        if on_error is not None:
+            task.signals.failed.connect(on_error)
+        if on_progress is not None:
+            task.signals.progress.connect(on_progress)
+        task.signals.done.connect(lambda: self._forget(task, key))
+
+        self._tasks[id(task)] = task
+        if key is not None:
+            self._by_key[key] = task
+        self.pool.start(task)
+        return task
+
+    def _forget(self, task, key):
+        self._tasks.pop(id(task), None)
+        if key is not None and self._by_key.get(key) is task:
+            del self._by_key[key]
+
+    def cancel_all(self):
+        """Отменяет загрузки; задачи записи без ключа доводятся до конца"""
+        for task in list(self._by_key.values()):
+            task.cancel()